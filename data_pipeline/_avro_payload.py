@@ -166,6 +166,30 @@ class _AvroPayload(object):
             writer_id_key=self.schema_id
         )
 
+    @property
+    def raw_payload_and_payload_data(self):
+        """Returns a (payload, payload_data) tuple with only one of them set,
+        preferring whichever is already available so nothing gets encoded or
+        decoded.
+        """
+        if self._payload is not None:
+            return self._payload, None
+        return None, self._payload_data
+
+    @property
+    def decode_args(self):
+        """Returns a (schema_id, reader_schema_id, payload) tuple with what's
+        needed to decode the payload elsewhere, e.g. in another process.
+        """
+        return self.schema_id, self.reader_schema_id, self.payload
+
+    def set_decoded_payload_data(self, payload_data):
+        """Sets the payload data decoded from the payload returned by
+        `decode_args`.  Unlike setting the payload data, this keeps the
+        payload.
+        """
+        self._payload_data = payload_data
+
     def reload_data(self):
         """Populate the payload data or the payload if it hasn't done so.
         """
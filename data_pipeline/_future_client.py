@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+from concurrent.futures import ThreadPoolExecutor
+
+
+class FutureClient(object):
+    """Base class of the clients which return futures instead of blocking.
+
+    Every call is run by a single thread which owns the wrapped client, so
+    calls are run in the order they were made, and the wrapped client is never
+    used concurrently.  Like the wrapped clients, these are context managers,
+    and entering or exiting them blocks until the wrapped client is started or
+    stopped.
+
+    Args:
+        client (data_pipeline.client.Client): the wrapped client.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def __enter__(self):
+        self._submit(self.client.__enter__).result()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            return self._submit(
+                self.client.__exit__,
+                exc_type,
+                exc_value,
+                traceback
+            ).result()
+        finally:
+            self._executor.shutdown(wait=True)
+
+    def _submit(self, func, *args, **kwargs):
+        return self._executor.submit(func, *args, **kwargs)
@@ -16,6 +16,7 @@
 from __future__ import absolute_import
 from __future__ import unicode_literals
 
+import threading
 import time
 from collections import defaultdict
 from collections import namedtuple
@@ -27,6 +28,7 @@ from kafka import KafkaClient
 from kafka.common import ProduceRequest
 
 from data_pipeline._position_data_tracker import PositionDataTracker
+from data_pipeline._produce_request_dispatcher import ProduceRequestDispatcher
 from data_pipeline._producer_retry import RetryHandler
 from data_pipeline._retry_util import ExpBackoffPolicy
 from data_pipeline._retry_util import MaxRetryError
@@ -35,6 +37,9 @@ from data_pipeline._retry_util import retry_on_condition
 from data_pipeline._retry_util import RetryPolicy
 from data_pipeline.config import get_config
 from data_pipeline.envelope import Envelope
+from data_pipeline.flush_policy import FlushPolicy
+from data_pipeline.message_type import _ProtectedMessageType
+from data_pipeline.schematizer_clientlib.schematizer import get_schematizer
 
 
 _EnvelopeAndMessage = namedtuple("_EnvelopeAndMessage", ["envelope", "message"])
@@ -57,6 +62,35 @@ def _prepare(envelope_and_message):
         raise
 
 
+class _FlushLane(object):
+    """Buffer bookkeeping for the topics sharing a
+    :class:`data_pipeline.flush_policy.FlushPolicy`.  The messages themselves
+    are kept in the producer's message buffer.
+    """
+
+    def __init__(self, policy):
+        self.policy = policy
+        self.topics = set()
+        self.reset()
+
+    @property
+    def priority(self):
+        return self.policy.priority
+
+    def reset(self):
+        self.start_time = time.time()
+        self.message_buffer_size = 0
+
+    def is_ready_to_flush(self):
+        return (
+            (time.time() - self.start_time) >= self.policy.effective_time_limit_seconds or
+            self.message_buffer_size >= self.policy.effective_buffer_size
+        )
+
+    def seconds_until_flush_due(self):
+        return self.start_time + self.policy.effective_time_limit_seconds - time.time()
+
+
 class KafkaProducer(object):
     """The KafkaProducer deals with buffering messages that need to be published
     into Kafka, preparing them for publication, and ultimately publishing them.
@@ -68,23 +102,71 @@ class KafkaProducer(object):
             information of successfully published messages.
         dry_run (Optional[bool]): When dry_run mode is on, the producer won't
             talk to real KafKa topic, nor to real Schematizer.  Default to False.
+        auto_flush (Optional[bool]): When auto_flush is on, a background
+            thread flushes the buffer once it has been holding messages for
+            `kafka_producer_flush_time_limit_seconds`, so callers don't need
+            to call :meth:`wake`.  The error of a failed automatic flush is
+            raised from the next call to :meth:`publish`, which still buffers
+            its message.  Default to False.
+        flush_policies (Optional[list[data_pipeline.flush_policy.FlushPolicy]]):
+            Policies of the topics that are buffered and flushed in lanes of
+            their own.  Other topics use a default lane following
+            `kafka_producer_buffer_size` and
+            `kafka_producer_flush_time_limit_seconds`.  Since the position
+            data can only be checkpointed once every lane is flushed, every
+            lane is flushed along with the next lane due once the
+            `producer_position_callback` has been held back for
+            `kafka_producer_position_callback_max_delay_seconds`.
+
+    Note:
+        All access to the message buffer is serialized with an internal lock.
+        The `producer_position_callback` is always invoked while that lock is
+        held, so callbacks never run concurrently.  It is invoked on the thread
+        that performed the flush: the caller's thread for :meth:`publish`,
+        :meth:`wake`, :meth:`flush_buffered_messages`, and :meth:`close`, or
+        the auto flush thread for time-triggered flushes.
     """
+
+    # Lower bound on how long the auto flush thread sleeps between checks, so
+    # it won't spin when automatic flushing is temporarily disabled.
+    _AUTO_FLUSH_MIN_INTERVAL_SECONDS = 0.01
+
     @cached_property
     def envelope(self):
         return Envelope()
 
-    def __init__(self, producer_position_callback, dry_run=False):
+    def __init__(
+        self,
+        producer_position_callback,
+        dry_run=False,
+        auto_flush=False,
+        flush_policies=None
+    ):
         self.producer_position_callback = producer_position_callback
         self.dry_run = dry_run
+        self._setup_flush_lanes(flush_policies or [])
+        self._lock = threading.RLock()
         self.kafka_client = KafkaClient(get_config().cluster_config.broker_list)
+        self._dispatcher = ProduceRequestDispatcher(
+            self.kafka_client,
+            get_config().kafka_producer_dispatch_thread_count
+        )
         self.position_data_tracker = PositionDataTracker()
-        self._reset_message_buffer()
+        self.message_buffer = defaultdict(list)
+        self.message_buffer_size = 0
+        self.producer_position_callback(self.position_data_tracker.get_position_data())
+        self._position_callback_time = time.time()
         self.skip_messages_with_pii = get_config().skip_messages_with_pii
         self._publish_retry_policy = RetryPolicy(
             ExpBackoffPolicy(with_jitter=True),
             max_retry_count=get_config().producer_max_publish_retry_count
         )
         self._automatic_flush_enabled = True
+        self._auto_flush_error = None
+        self._auto_flush_stopped = threading.Event()
+        self._auto_flush_thread = None
+        if auto_flush:
+            self._start_auto_flush_thread()
 
     @contextmanager
     def disable_automatic_flushing(self):
@@ -92,19 +174,38 @@ class KafkaProducer(object):
         or batch size) while the context manager is open.
         """
         try:
-            self._automatic_flush_enabled = False
+            with self._lock:
+                self._automatic_flush_enabled = False
             yield
         finally:
-            self._automatic_flush_enabled = True
+            with self._lock:
+                self._automatic_flush_enabled = True
 
     def wake(self):
         """Should be called periodically if we're not otherwise waking up by
         publishing, to ensure that messages are actually published.
         """
         # if we haven't woken up in a while, we may need to flush messages
-        self._flush_if_necessary()
+        with self._lock:
+            self._raise_auto_flush_error_if_any()
+            self._flush_if_necessary()
 
     def publish(self, message):
+        with self._lock:
+            if self._auto_flush_error is None:
+                self._publish(message)
+                return
+            # The message is buffered before the error of the failed automatic
+            # flush is raised, so that the caller doesn't need to publish it
+            # again.
+            self._buffer_message(message)
+            self._raise_auto_flush_error_if_any()
+
+    def _publish(self, message):
+        self._buffer_message(message)
+        self._flush_if_necessary()
+
+    def _buffer_message(self, message):
         if message.contains_pii and self.skip_messages_with_pii:
             logger.info(
                 "Skipping a PII message - "
@@ -121,17 +222,79 @@ class KafkaProducer(object):
             return
         self._add_message_to_buffer(message)
         self.position_data_tracker.record_message_buffered(message)
-        self._flush_if_necessary()
 
     def flush_buffered_messages(self):
+        with self._lock:
+            self._raise_auto_flush_error_if_any()
+            self._flush_lanes(self._lanes)
+
+    def _flush_lanes(self, lanes):
+        topics = [topic for lane in lanes for topic in lane.topics]
         produce_method = (self._publish_produce_requests_dry_run
                           if self.dry_run else self._publish_produce_requests)
-        produce_method(self._generate_produce_requests())
-        self._reset_message_buffer()
+        produce_method(self._generate_produce_requests(topics))
+        self._reset_message_buffer(lanes)
 
     def close(self):
-        self.flush_buffered_messages()
-        self.kafka_client.close()
+        try:
+            self._stop_auto_flush_thread()
+            self.flush_buffered_messages()
+        finally:
+            # The connections are closed even if the error of a failed flush
+            # is raised.
+            self._dispatcher.close()
+            self.kafka_client.close()
+
+    def _start_auto_flush_thread(self):
+        self._auto_flush_thread = threading.Thread(
+            target=self._auto_flush,
+            name='data_pipeline_producer_auto_flush'
+        )
+        # The producer may be garbage collected without being closed, in which
+        # case the thread shouldn't keep the interpreter alive.
+        self._auto_flush_thread.daemon = True
+        self._auto_flush_thread.start()
+
+    def _stop_auto_flush_thread(self):
+        self._auto_flush_stopped.set()
+        if (self._auto_flush_thread and
+                self._auto_flush_thread is not threading.current_thread()):
+            self._auto_flush_thread.join()
+        self._auto_flush_thread = None
+
+    def _auto_flush(self):
+        """Body of the auto flush thread.  It sleeps until the oldest buffered
+        message is due, then flushes under the lock.  An error is re-raised on
+        the caller's thread by the next producer call, and the thread resumes
+        flushing once it has been.
+        """
+        while not self._auto_flush_stopped.wait(self._seconds_until_flush_due()):
+            try:
+                with self._lock:
+                    if (self._auto_flush_error is None and
+                            self.message_buffer_size > 0):
+                        self._flush_if_necessary()
+            except Exception as e:
+                logger.exception(
+                    "Auto flush failed, pausing it until the error is raised."
+                )
+                self._auto_flush_error = e
+
+    def _seconds_until_flush_due(self):
+        if self._auto_flush_error is not None:
+            return get_config().kafka_producer_flush_time_limit_seconds
+        busy_lanes = [lane for lane in self._lanes if lane.message_buffer_size > 0]
+        if not busy_lanes:
+            return get_config().kafka_producer_flush_time_limit_seconds
+        return max(
+            min(lane.seconds_until_flush_due() for lane in busy_lanes),
+            self._AUTO_FLUSH_MIN_INTERVAL_SECONDS
+        )
+
+    def _raise_auto_flush_error_if_any(self):
+        if self._auto_flush_error is not None:
+            error, self._auto_flush_error = self._auto_flush_error, None
+            raise error
 
     def _publish_produce_requests(self, requests):
         """It will try to publish all the produce requests for topics, and
@@ -182,8 +345,14 @@ class KafkaProducer(object):
 
     def _try_send_produce_requests(self, requests):
         # Either it throws exceptions and none of them succeeds, or it returns
-        # responses of all the requests (success or fail response).
+        # responses of the requests that were sent (success or fail response).
+        # Requests without a response are treated as failed.
         try:
+            if self._dispatcher.thread_count > 1:
+                return self._dispatcher.send_produce_requests(
+                    requests,
+                    acks=get_config().kafka_client_ack_count
+                )
             return self.kafka_client.send_produce_request(
                 payloads=requests,
                 acks=get_config().kafka_client_ack_count,
@@ -222,42 +391,105 @@ class KafkaProducer(object):
             message_count
         )
 
-    def _is_ready_to_flush(self):
-        time_limit = get_config().kafka_producer_flush_time_limit_seconds
-        return (self._automatic_flush_enabled and (
-            (time.time() - self.start_time) >= time_limit or
-            self.message_buffer_size >= get_config().kafka_producer_buffer_size
-        ))
+    def _get_lanes_ready_to_flush(self):
+        """Returns the lanes that are due, along with every lane of the same
+        or a higher priority.
+        """
+        if not self._automatic_flush_enabled:
+            return []
+        ready_lanes = [lane for lane in self._lanes if lane.is_ready_to_flush()]
+        if not ready_lanes:
+            return []
+        if self._is_position_callback_overdue():
+            return self._lanes
+        lowest_priority = min(lane.priority for lane in ready_lanes)
+        return [lane for lane in self._lanes if lane.priority >= lowest_priority]
+
+    def _is_position_callback_overdue(self):
+        return (
+            time.time() - self._position_callback_time >=
+            get_config().kafka_producer_position_callback_max_delay_seconds
+        )
 
     def _flush_if_necessary(self):
-        if self._is_ready_to_flush():
-            self.flush_buffered_messages()
+        lanes = self._get_lanes_ready_to_flush()
+        if lanes:
+            self._flush_lanes(lanes)
+
+    def _setup_flush_lanes(self, flush_policies):
+        self._default_lane = _FlushLane(FlushPolicy())
+        self._policy_lanes = [_FlushLane(policy) for policy in flush_policies]
+        # Internal messages (e.g. monitoring) are flushed whenever any other
+        # lane is, in addition to their own schedule.
+        self._internal_lane = _FlushLane(FlushPolicy(
+            priority=max([policy.priority for policy in flush_policies] + [0]) + 1
+        ))
+        self._lanes = [self._default_lane, self._internal_lane] + self._policy_lanes
+        self._topic_to_lane = {}
+
+    def _get_lane(self, message):
+        # Every topic belongs to a single lane, the one of its first message
+        lane = self._topic_to_lane.get(message.topic)
+        if lane is None:
+            lane = self._choose_lane(message)
+            lane.topics.add(message.topic)
+            self._topic_to_lane[message.topic] = lane
+        return lane
+
+    def _choose_lane(self, message):
+        if isinstance(message.message_type, _ProtectedMessageType):
+            return self._internal_lane
+        for lane in self._policy_lanes:
+            if message.topic in lane.policy.topics:
+                return lane
+        if any(lane.policy.namespaces for lane in self._policy_lanes):
+            namespace = get_schematizer().get_schema_by_id(
+                message.schema_id
+            ).topic.source.namespace.name
+            for lane in self._policy_lanes:
+                if namespace in lane.policy.namespaces:
+                    return lane
+        return self._default_lane
 
     def _add_message_to_buffer(self, message):
         topic = message.topic
+        lane = self._get_lane(message)
         message = self._prepare_message(message)
 
         self.message_buffer[topic].append(message)
         self.message_buffer_size += 1
+        lane.message_buffer_size += 1
 
-    def _generate_produce_requests(self):
+    def _generate_produce_requests(self, topics):
         return [
             ProduceRequest(topic=topic, partition=0, messages=messages)
-            for topic, messages in self._generate_prepared_topic_and_messages()
+            for topic, messages in self._generate_prepared_topic_and_messages(topics)
         ]
 
-    def _generate_prepared_topic_and_messages(self):
-        return self.message_buffer.iteritems()
+    def _generate_prepared_topic_and_messages(self, topics):
+        return self._get_buffered_topics_and_messages(topics)
+
+    def _get_buffered_topics_and_messages(self, topics):
+        return [
+            (topic, self.message_buffer[topic])
+            for topic in topics if self.message_buffer.get(topic)
+        ]
 
     def _prepare_message(self, message):
         return _prepare(_EnvelopeAndMessage(envelope=self.envelope, message=message))
 
-    def _reset_message_buffer(self):
-        if not hasattr(self, 'message_buffer_size') or self.message_buffer_size > 0:
+    def _reset_message_buffer(self, lanes):
+        flushed_message_count = 0
+        for lane in lanes:
+            for topic in lane.topics:
+                self.message_buffer.pop(topic, None)
+            flushed_message_count += lane.message_buffer_size
+            lane.reset()
+        self.message_buffer_size -= flushed_message_count
+        # Position data can only be checkpointed once every lane is flushed
+        if flushed_message_count > 0 and self.message_buffer_size == 0:
             self.producer_position_callback(self.position_data_tracker.get_position_data())
-        self.start_time = time.time()
-        self.message_buffer = defaultdict(list)
-        self.message_buffer_size = 0
+            self._position_callback_time = time.time()
 
 
 class LoggingKafkaProducer(KafkaProducer):
@@ -276,9 +508,9 @@ class LoggingKafkaProducer(KafkaProducer):
             )
             raise
 
-    def _reset_message_buffer(self):
+    def _reset_message_buffer(self, lanes):
         logger.info("Resetting message buffer for success requests.")
-        super(LoggingKafkaProducer, self)._reset_message_buffer()
+        super(LoggingKafkaProducer, self)._reset_message_buffer(lanes)
 
     def _publish_single_request_dry_run(self, request):
         super(LoggingKafkaProducer, self)._publish_single_request_dry_run(request)
@@ -16,8 +16,13 @@
 from __future__ import absolute_import
 from __future__ import unicode_literals
 
+from kafka.common import ConsumerFetchSizeTooSmall
+from kafka.common import FetchRequest
+from kafka.util import kafka_bytestring
 from kafka_utils.util.offsets import get_topics_watermarks
 
+from data_pipeline.envelope import Envelope
+
 
 def get_actual_published_messages_count(
     kafka_client,
@@ -62,3 +67,216 @@ def get_actual_published_messages_count(
         topic_to_published_msgs_count[topic] = high_watermark - offset
 
     return topic_to_published_msgs_count
+
+
+def get_first_offsets_at_or_after_timestamps(
+    kafka_client,
+    topic_to_timestamp,
+    envelope=None,
+    fetch_size_bytes=4096,
+    timestamp_offset_index=None
+):
+    """Get the offset of the first message published at or after a timestamp
+    in each partition of the specified topics.
+
+    The offsets are binary searched, probing all the partitions in a single
+    fetch request per step, so the search takes as many requests as the
+    largest partition needs, rather than a request per probe.  Every message
+    fetched by a probe narrows the search down, and only their envelopes are
+    unpacked, to read their timestamps.
+
+    When a `timestamp_offset_index` is given, the search starts from the
+    range of offsets it knows of, and probes the start of that range first,
+    so partitions sampled often enough are resolved with a single fetch.
+
+    Args:
+        kafka_client (kafka.client.KafkaClient): kafka client
+        topic_to_timestamp (dict(str, int)): dictionary which contains each
+            topic and the epoch timestamp to search for in it.
+        envelope (Optional[data_pipeline.envelope.Envelope]): envelope
+            used to unpack the probed messages.
+        fetch_size_bytes (Optional[int]): initial number of bytes fetched per
+            probe, doubled for a partition whenever a message doesn't fit.
+        timestamp_offset_index
+            (Optional[data_pipeline.timestamp_offset_index.TimestampOffsetIndex]):
+            index of sampled offsets to start the search from.
+
+    Returns:
+        dict(str, dict(int, int)): Each topic and the offset of each of its
+            partitions.  The offset is the high watermark of a partition
+            which has no message at or after the timestamp.  Topics which are
+            missing are not in the returned dict.
+    """
+    envelope = envelope or Envelope()
+    watermarks = get_topics_watermarks(
+        kafka_client,
+        topic_to_timestamp.keys(),
+        raise_on_error=False
+    )
+    # The offset of each partition is in its [low, high] range, the search
+    # is done when the range is down to a single offset.
+    topic_partition_to_range = {
+        (topic, partition): [marks.lowmark, marks.highmark]
+        for topic, partition_to_marks in watermarks.iteritems()
+        for partition, marks in partition_to_marks.iteritems()
+    }
+    topic_partitions_to_probe_low = set()
+    if timestamp_offset_index is not None:
+        for (topic, partition), offset_range in topic_partition_to_range.iteritems():
+            low, high = timestamp_offset_index.get_offset_range(
+                topic,
+                partition,
+                topic_to_timestamp[topic]
+            )
+            _narrow_offset_range_to_index(offset_range, low, high)
+            topic_partitions_to_probe_low.add((topic, partition))
+    topic_partition_to_fetch_size = {
+        topic_partition: fetch_size_bytes
+        for topic_partition in topic_partition_to_range
+    }
+    while True:
+        probes = {
+            topic_partition: (
+                low if topic_partition in topic_partitions_to_probe_low
+                else (low + high) // 2
+            )
+            for topic_partition, (low, high) in topic_partition_to_range.iteritems()
+            if low < high
+        }
+        if not probes:
+            break
+        responses = kafka_client.send_fetch_request(
+            payloads=[
+                FetchRequest(
+                    kafka_bytestring(topic),
+                    partition,
+                    offset,
+                    topic_partition_to_fetch_size[(topic, partition)]
+                ) for (topic, partition), offset in probes.iteritems()
+            ],
+            max_wait_time=0,
+            min_bytes=0
+        )
+        for response in responses:
+            topic_partition = (response.topic, response.partition)
+            try:
+                _narrow_offset_range_to_messages(
+                    topic_partition_to_range[topic_partition],
+                    probes[topic_partition],
+                    response.messages,
+                    topic_to_timestamp[response.topic],
+                    envelope
+                )
+            except ConsumerFetchSizeTooSmall:
+                topic_partition_to_fetch_size[topic_partition] *= 2
+                continue
+            topic_partitions_to_probe_low.discard(topic_partition)
+
+    topic_to_partition_offset_map = {}
+    for (topic, partition), (offset, _) in topic_partition_to_range.iteritems():
+        topic_to_partition_offset_map.setdefault(topic, {})[partition] = offset
+    return topic_to_partition_offset_map
+
+
+def _narrow_offset_range_to_index(offset_range, low, high):
+    # Sampled offsets may have been removed from the topic since, so the
+    # range is only narrowed within the watermarks.
+    if high is not None:
+        offset_range[1] = max(min(high, offset_range[1]), offset_range[0])
+    if low is not None:
+        offset_range[0] = min(max(low, offset_range[0]), offset_range[1])
+
+
+def _narrow_offset_range_to_messages(
+    offset_range,
+    probe_offset,
+    messages,
+    timestamp,
+    envelope
+):
+    for offset_and_message in messages:
+        if offset_and_message.offset < probe_offset:
+            # Fetching from the middle of a compressed message set returns
+            # the messages of the whole set, including those before the
+            # probed offset.
+            continue
+        if (offset_and_message.offset >= offset_range[1] or
+                envelope.unpack(offset_and_message.message.value)['timestamp'] >= timestamp):
+            break
+        offset_range[0] = offset_and_message.offset + 1
+    else:
+        if offset_range[0] > probe_offset:
+            # The fetched messages all precede the timestamp.
+            return
+    # There's no message between the probed offset, or the last message
+    # preceding the timestamp, and this one, so starting from either of them
+    # is equivalent.
+    offset_range[1] = max(offset_range[0], probe_offset)
+
+
+def get_last_message_timestamps(
+    kafka_client,
+    topics,
+    envelope=None,
+    fetch_size_bytes=4096
+):
+    """Get the offset and timestamp of the last message in each partition of
+    the specified topics, fetched with a single request.
+
+    Args:
+        kafka_client (kafka.client.KafkaClient): kafka client
+        topics ([str]): List of topic names
+        envelope (Optional[data_pipeline.envelope.Envelope]): envelope
+            used to unpack the fetched messages.
+        fetch_size_bytes (Optional[int]): number of bytes fetched per
+            partition.  Partitions whose last message doesn't fit are skipped.
+
+    Returns:
+        dict(str, dict(int, (int, int))): Each topic and the (offset,
+            timestamp) of the last message of each of its partitions.  Empty
+            partitions, and missing topics, are not in the returned dict.
+    """
+    envelope = envelope or Envelope()
+    watermarks = get_topics_watermarks(
+        kafka_client,
+        topics,
+        raise_on_error=False
+    )
+    last_offsets = {
+        (topic, partition): marks.highmark - 1
+        for topic, partition_to_marks in watermarks.iteritems()
+        for partition, marks in partition_to_marks.iteritems()
+        if marks.highmark > marks.lowmark
+    }
+    if not last_offsets:
+        return {}
+    responses = kafka_client.send_fetch_request(
+        payloads=[
+            FetchRequest(kafka_bytestring(topic), partition, offset, fetch_size_bytes)
+            for (topic, partition), offset in last_offsets.iteritems()
+        ],
+        max_wait_time=0,
+        min_bytes=0
+    )
+    topic_to_last_message_timestamps = {}
+    for response in responses:
+        last_offset = last_offsets[(response.topic, response.partition)]
+        try:
+            offset_and_message = next(
+                (
+                    offset_and_message for offset_and_message in response.messages
+                    if offset_and_message.offset >= last_offset
+                ),
+                None
+            )
+        except ConsumerFetchSizeTooSmall:
+            continue
+        if offset_and_message is None:
+            continue
+        topic_to_last_message_timestamps.setdefault(response.topic, {})[
+            response.partition
+        ] = (
+            offset_and_message.offset,
+            envelope.unpack(offset_and_message.message.value)['timestamp']
+        )
+    return topic_to_last_message_timestamps
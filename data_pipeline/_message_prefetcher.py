@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""
+This module contains the class that fetches the messages of a consumer from a
+background thread.
+"""
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import threading
+from collections import namedtuple
+from Queue import Empty
+from Queue import Full
+from Queue import Queue
+from time import time
+
+from kafka.common import ConsumerTimeout
+
+from data_pipeline.config import get_config
+
+
+logger = get_config().logger
+
+
+_PrefetchedBatch = namedtuple(
+    '_PrefetchedBatch',
+    ['generation', 'messages', 'error']
+)
+
+
+class MessagePrefetcher(object):
+    """Fetches the messages of a :class:`data_pipeline.consumer.Consumer` from
+    a background thread into a bounded queue, so that fetching the next
+    batches overlaps with the processing of the current one.
+
+    The background thread is the only one using the consumer group once the
+    prefetcher is started, and the rebalance callbacks are therefore invoked
+    from it, holding the rebalance lock of the consumer so that they don't
+    update its state while the caller's thread commits offsets.  Prefetched messages are discarded when the partitions are
+    rebalanced, or when the prefetcher is stopped: they haven't been returned,
+    so their offsets can't have been committed, and they're fetched again
+    from the committed offsets by whichever consumer acquires the partitions.
+
+    Args:
+        consumer (data_pipeline.consumer.Consumer): consumer to fetch the
+            messages of.
+        queue_size (int): maximum number of prefetched batches.
+        batch_size (int): maximum number of messages in a prefetched batch.
+        unpack_messages (bool): whether the background thread also unpacks
+            the envelopes (and decodes the payloads if `force_payload_decode`
+            is set), rather than the thread the messages are returned to.
+    """
+
+    poll_interval_seconds = 0.1
+
+    def __init__(self, consumer, queue_size, batch_size, unpack_messages=True):
+        self.consumer = consumer
+        self.batch_size = batch_size
+        self.unpack_messages = unpack_messages
+        self._queue = Queue(maxsize=queue_size)
+        self._generation = 0
+        self._pending_generation = 0
+        self._pending_messages = []
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run,
+            name='{0}_prefetcher'.format(self.consumer.client_name)
+        )
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.discard_prefetched_messages()
+
+    def discard_prefetched_messages(self):
+        """Discards the prefetched messages which haven't been returned yet.
+        Batches still being fetched are discarded as well, since they're
+        tagged with the generation they were fetched in.
+        """
+        self._generation += 1
+        while True:
+            try:
+                self._queue.get_nowait()
+            except Empty:
+                break
+
+    def get_messages(self, count, blocking, max_time, create_messages=None):
+        """Returns up to `count` prefetched messages, waiting for them until
+        `max_time` (or indefinitely if it's None) if `blocking` is set.
+
+        Unless `unpack_messages` is set, the kafka messages are turned into
+        the returned messages by `create_messages`, which defaults to the
+        `_create_messages` method of the consumer.
+        """
+        create_messages = create_messages or self.consumer._create_messages
+        messages = []
+        while len(messages) < count:
+            if (not self._pending_messages or
+                    self._pending_generation != self._generation):
+                if not self._get_next_batch(blocking, max_time):
+                    break
+            missing_count = count - len(messages)
+            pending_messages = self._pending_messages[:missing_count]
+            messages.extend(
+                pending_messages if self.unpack_messages
+                else create_messages(pending_messages)
+            )
+            self._pending_messages = self._pending_messages[missing_count:]
+        return messages
+
+    def _get_next_batch(self, blocking, max_time):
+        self._pending_messages = []
+        while True:
+            try:
+                batch = self._get_from_queue(blocking, max_time)
+            except Empty:
+                return False
+            if batch.error is not None:
+                raise batch.error
+            if batch.generation != self._generation:
+                continue
+            self._pending_generation = batch.generation
+            self._pending_messages = batch.messages
+            return True
+
+    def _get_from_queue(self, blocking, max_time):
+        if not blocking:
+            return self._queue.get_nowait()
+        if max_time is None:
+            return self._queue.get()
+        return self._queue.get(timeout=max(max_time - time(), 0))
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                messages = self._fetch_messages()
+            except Exception as e:
+                # The error is raised once by `get_messages`, like the fetch
+                # would have raised it, and fetching is retried afterwards.
+                logger.exception("Failed to prefetch messages of Consumer '{0}'.".format(
+                    self.consumer.client_name
+                ))
+                self._put(_PrefetchedBatch(self._generation, [], e))
+                self._stop_event.wait(self.poll_interval_seconds)
+                continue
+            if messages:
+                # The generation is read after fetching, since a rebalance
+                # happens while waiting for the first message of the batch.
+                self._put(_PrefetchedBatch(self._generation, messages, None))
+
+    def _fetch_messages(self):
+        try:
+            kafka_messages = self.consumer._get_next_kafka_messages(
+                self.batch_size,
+                blocking=True,
+                has_timeout=True,
+                max_time=time() + self.poll_interval_seconds,
+                timeout=self.poll_interval_seconds
+            )
+        except ConsumerTimeout:
+            return []
+        if self.unpack_messages:
+            return self.consumer._create_messages(kafka_messages)
+        return kafka_messages
+
+    def _put(self, batch):
+        while not self._stop_event.is_set():
+            try:
+                self._queue.put(batch, timeout=self.poll_interval_seconds)
+                return
+            except Full:
+                continue
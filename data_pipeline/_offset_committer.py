@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""
+This module contains the class that commits the offsets of a consumer from a
+background thread.
+"""
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import threading
+from collections import defaultdict
+
+from kafka import KafkaClient
+
+from data_pipeline.config import get_config
+
+
+logger = get_config().logger
+
+
+class OffsetCommitter(object):
+    """Coalesces the offsets committed by a
+    :class:`data_pipeline.base_consumer.BaseConsumer` and sends them to Kafka
+    from a background thread, so that committing doesn't block the thread
+    processing the messages.
+
+    Offsets are coalesced per topic and partition, the highest offset winning,
+    and sent once `flush_count` offsets have been committed, or
+    `flush_interval_seconds` after the previous flush, whichever happens
+    first.  The offsets are sent with a Kafka client of its own, since the
+    consumer's client isn't thread-safe.
+
+    If sending the offsets fails, they're kept to be sent with the next flush,
+    and the error is raised by the next call to :meth:`commit_offsets` or
+    :meth:`flush`.
+
+    Args:
+        consumer (data_pipeline.base_consumer.BaseConsumer): consumer to
+            commit the offsets of.
+        flush_interval_seconds (float): maximum time in seconds offsets are
+            held before being sent.
+        flush_count (int): number of committed offsets which triggers a flush.
+    """
+
+    def __init__(self, consumer, flush_interval_seconds, flush_count):
+        self.consumer = consumer
+        self.flush_interval_seconds = flush_interval_seconds
+        self.flush_count = flush_count
+        self._pending_offsets = defaultdict(dict)
+        self._pending_count = 0
+        self._error = None
+        # Guards the pending offsets and the error, while the flush lock
+        # serializes the requests sent with the Kafka client.
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flush_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._kafka_client = None
+        self._thread = None
+
+    def start(self):
+        self._kafka_client = KafkaClient(
+            self.consumer._region_cluster_config.broker_list
+        )
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run,
+            name='{0}_offset_committer'.format(self.consumer.client_name)
+        )
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stops the background thread, and sends the pending offsets."""
+        self._stop_event.set()
+        self._flush_event.set()
+        try:
+            if self._thread is not None:
+                self._thread.join()
+                self._thread = None
+            self._flush()
+        finally:
+            if self._kafka_client is not None:
+                self._kafka_client.close()
+                self._kafka_client = None
+
+    def commit_offsets(self, topic_to_partition_offset_map):
+        self._raise_error()
+        with self._lock:
+            for topic, partition_offset_map in topic_to_partition_offset_map.iteritems():
+                self._merge_offsets(topic, partition_offset_map)
+                self._pending_count += len(partition_offset_map)
+            should_flush = self._pending_count >= self.flush_count
+        if should_flush:
+            self._flush_event.set()
+
+    def flush(self):
+        """Blocks until every offset committed so far has been sent.  The
+        offsets are sent even if a background flush failed, whose error is
+        raised once they are, so that the offsets of partitions being released
+        are still committed.
+        """
+        self._flush()
+        self._raise_error()
+
+    def _flush(self):
+        with self._flush_lock:
+            with self._lock:
+                topic_to_partition_offset_map = self._pending_offsets
+                self._pending_offsets = defaultdict(dict)
+                self._pending_count = 0
+            if not topic_to_partition_offset_map:
+                return
+            try:
+                self.consumer._send_offsets(
+                    topic_to_partition_offset_map,
+                    kafka_client=self._kafka_client
+                )
+            except Exception:
+                # The offsets are sent again by the next flush, which their
+                # count keeps triggering once enough offsets are committed.
+                with self._lock:
+                    for topic, partition_offset_map in topic_to_partition_offset_map.iteritems():
+                        self._merge_offsets(topic, partition_offset_map)
+                        self._pending_count += len(partition_offset_map)
+                raise
+
+    def _merge_offsets(self, topic, partition_offset_map):
+        pending_partition_offset_map = self._pending_offsets[topic]
+        for partition, offset in partition_offset_map.iteritems():
+            pending_partition_offset_map[partition] = max(
+                offset,
+                pending_partition_offset_map.get(partition, offset)
+            )
+
+    def _raise_error(self):
+        with self._lock:
+            error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self._flush_event.wait(self.flush_interval_seconds)
+            self._flush_event.clear()
+            try:
+                self._flush()
+            except Exception as e:
+                logger.exception("Failed to commit offsets of Consumer '{0}'.".format(
+                    self.consumer.client_name
+                ))
+                with self._lock:
+                    self._error = e
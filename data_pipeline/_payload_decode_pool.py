@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""
+This module contains the pool of subprocesses that decodes the payloads of
+consumed messages.
+"""
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+from multiprocessing import Pool
+
+from data_pipeline.config import get_config
+from data_pipeline.helpers.lists import split_into_pool_chunks
+from data_pipeline.helpers.yelp_avro_store import _AvroStringStore
+from data_pipeline.helpers.yelp_avro_store import preload_schemas
+
+
+logger = get_config().logger
+
+
+# The initializer and the decode function need to be in the module top level
+# so they can be serialized for multiprocessing
+def _initialize_pool_worker(reader_and_writer_schema_ids):
+    preload_schemas(
+        reader_and_writer_schema_ids=reader_and_writer_schema_ids,
+        save_cache_snapshot=False
+    )
+
+
+def _decode_payloads(decode_args_list):
+    return [
+        _AvroStringStore().get_reader(
+            reader_id_key=reader_schema_id,
+            writer_id_key=schema_id
+        ).decode(encoded_message=payload)
+        for schema_id, reader_schema_id, payload in decode_args_list
+    ]
+
+
+class PayloadDecodePool(object):
+    """Decodes the avro payloads of messages in a pool of subprocesses, since
+    decoding is CPU bound and would otherwise be limited to a single core.
+
+    Messages are decoded in place, so their order is unchanged.  Only the
+    encoded payloads are shipped to the workers, in chunks of at least
+    `MIN_CHUNK_SIZE` payloads, and only the decoded payload data is shipped
+    back.  Batches smaller than a chunk are decoded in-process, since the
+    round trip to the pool would cost more than it saves.
+
+    Args:
+        processes (int): number of worker processes.
+        reader_and_writer_schema_ids ([(int, int)]): (reader schema id, writer
+            schema id) pairs whose avro readers are created in the workers
+            before they start decoding.
+    """
+
+    MIN_CHUNK_SIZE = 50
+
+    def __init__(self, processes, reader_and_writer_schema_ids=()):
+        reader_and_writer_schema_ids = list(reader_and_writer_schema_ids)
+        # Warming the caches before the pool forks lets the workers inherit
+        # them, the initializer covers platforms that don't fork.
+        preload_schemas(
+            reader_and_writer_schema_ids=reader_and_writer_schema_ids
+        )
+        self.pool_size = processes
+        self.pool = Pool(
+            processes=processes,
+            initializer=_initialize_pool_worker,
+            initargs=(reader_and_writer_schema_ids,)
+        )
+
+    def decode_messages(self, messages):
+        """Decodes the payloads of the messages, which must not have been
+        decoded yet.
+        """
+        avro_payloads = [
+            avro_payload
+            for message in messages
+            for avro_payload in message._avro_payloads
+        ]
+        payload_count = len(avro_payloads)
+        if payload_count <= self.MIN_CHUNK_SIZE:
+            for message in messages:
+                message.reload_data()
+            return
+
+        decode_args_list = [
+            avro_payload.decode_args for avro_payload in avro_payloads
+        ]
+        chunks_result = self.pool.map_async(
+            _decode_payloads,
+            split_into_pool_chunks(
+                decode_args_list,
+                self.pool_size,
+                self.MIN_CHUNK_SIZE
+            ),
+            chunksize=1
+        )
+        payloads_data = (
+            payload_data
+            for chunk in chunks_result.get()
+            for payload_data in chunk
+        )
+        for avro_payload, payload_data in zip(avro_payloads, payloads_data):
+            avro_payload.set_decoded_payload_data(payload_data)
+
+    def close(self):
+        self.pool.close()
+        self.pool.terminate()
+        self.pool.join()
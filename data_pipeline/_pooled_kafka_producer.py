@@ -16,17 +16,47 @@
 from __future__ import absolute_import
 from __future__ import unicode_literals
 
+from multiprocessing import cpu_count
 from multiprocessing import Pool
 
 from data_pipeline._kafka_producer import _EnvelopeAndMessage
 from data_pipeline._kafka_producer import _prepare
 from data_pipeline._kafka_producer import LoggingKafkaProducer
 from data_pipeline.config import get_config
+from data_pipeline.envelope import Envelope
+from data_pipeline.helpers.lists import split_into_pool_chunks
+from data_pipeline.helpers.yelp_avro_store import preload_schemas
+from data_pipeline.message import _create_from_pack_state
 
 
 logger = get_config().logger
 
 
+# Envelope shared by every message prepared in a pool worker, so it isn't
+# shipped to (and its schema parsed by) the worker for each message.
+_worker_envelope = None
+
+
+# The initializer and the prepare function need to be in the module top level
+# so they can be serialized for multiprocessing
+def _initialize_pool_worker(schema_ids):
+    global _worker_envelope
+    _worker_envelope = Envelope()
+    preload_schemas(schema_ids, save_cache_snapshot=False)
+
+
+def _prepare_pack_states(pack_states):
+    global _worker_envelope
+    if _worker_envelope is None:
+        _worker_envelope = Envelope()
+    return [
+        _prepare(_EnvelopeAndMessage(
+            envelope=_worker_envelope,
+            message=_create_from_pack_state(pack_state)
+        )) for pack_state in pack_states
+    ]
+
+
 class PooledKafkaProducer(LoggingKafkaProducer):
     """PooledKafkaProducer extends KafkaProducer to use a pool of subprocesses
     to schematize and pack envelopes, instead of performing those operations
@@ -37,10 +67,29 @@ class PooledKafkaProducer(LoggingKafkaProducer):
     producer.
 
     TODO(DATAPIPE-171|justinc): Actually write a Quick Start
+
+    The pool lives as long as the producer.  Its workers are pre-warmed with
+    the schemas and avro writers of `schema_id_list`, and messages are shipped
+    to them as compact pack states (see
+    :meth:`data_pipeline.message.Message._get_pack_state`) in chunks of at
+    least `MIN_CHUNK_SIZE` messages.  Flushes smaller than a chunk are
+    prepared in-process, since the round trip to the pool would cost more
+    than it saves.
     """
 
+    MIN_CHUNK_SIZE = 50
+
     def __init__(self, *args, **kwargs):
-        self.pool = Pool()
+        schema_id_list = kwargs.pop('schema_id_list', None) or []
+        # Warming the caches before the pool forks lets the workers inherit
+        # them, the initializer covers platforms that don't fork.
+        preload_schemas(schema_id_list)
+        self.pool_size = cpu_count()
+        self.pool = Pool(
+            processes=self.pool_size,
+            initializer=_initialize_pool_worker,
+            initargs=(schema_id_list,)
+        )
         super(PooledKafkaProducer, self).__init__(*args, **kwargs)
 
     def close(self):
@@ -68,7 +117,7 @@ class PooledKafkaProducer(LoggingKafkaProducer):
         """This happens in the pool, so this is a noop"""
         return message
 
-    def _generate_prepared_topic_and_messages(self):
+    def _generate_prepared_topic_and_messages(self, topics):
         # The setup here isn't great, it's probably worth switching this to
         # keep the buffer in an array, then map it here.  It'd also be worth
         # looking at pipelining this, so there would be a regular buffer, and a
@@ -95,14 +144,40 @@ class PooledKafkaProducer(LoggingKafkaProducer):
         # free workers). The send-requests workers can then send the messages
         # in bulk or every certain amount of time. The down side is this is a
         # more complicated approach.
-        topics_and_messages_result = [
-            (topic, self.pool.map_async(
-                _prepare,
-                [
-                    _EnvelopeAndMessage(envelope=self.envelope, message=message)
+        topics_and_messages = self._get_buffered_topics_and_messages(topics)
+        message_count = sum(len(messages) for _, messages in topics_and_messages)
+        if message_count <= self.MIN_CHUNK_SIZE:
+            return [
+                (topic, [
+                    _prepare(_EnvelopeAndMessage(envelope=self.envelope, message=message))
                     for message in messages
-                ]
-            )) for topic, messages in self.message_buffer.iteritems()
+                ]) for topic, messages in topics_and_messages
+            ]
+
+        pack_states = [
+            message._get_pack_state()
+            for _, messages in topics_and_messages
+            for message in messages
+        ]
+        chunks_result = self.pool.map_async(
+            _prepare_pack_states,
+            split_into_pool_chunks(
+                pack_states,
+                self.pool_size,
+                self.MIN_CHUNK_SIZE
+            ),
+            chunksize=1
+        )
+        prepared_messages = [
+            prepared_message
+            for chunk in chunks_result.get()
+            for prepared_message in chunk
         ]
 
-        return [(topic, messages_result.get()) for topic, messages_result in topics_and_messages_result]
+        result = []
+        start = 0
+        for topic, messages in topics_and_messages:
+            end = start + len(messages)
+            result.append((topic, prepared_messages[start:end]))
+            start = end
+        return result
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+"""
+This module contains the class that sends produce requests to their leader
+brokers concurrently.
+"""
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+from collections import defaultdict
+from multiprocessing.pool import ThreadPool
+
+from kafka.common import ConnectionError
+from kafka.common import FailedPayloadsError
+from kafka.common import KafkaError
+from kafka.conn import KafkaConnection
+from kafka.protocol import KafkaProtocol
+
+from data_pipeline.config import get_config
+
+
+logger = get_config().logger
+
+
+class ProduceRequestDispatcher(object):
+    """Sends produce requests grouped by leader broker, with the request for
+    each broker sent from its own thread.  A slow broker then only delays the
+    requests it leads, and a broker that can't be reached, or a partition
+    without a leader, only fails the requests concerned instead of the whole
+    batch.
+
+    Leaders are looked up with the producer's kafka client, which remains the
+    only owner of the topic metadata.  Each broker gets a dedicated
+    connection, which is only used by one thread at a time.
+
+    Args:
+        kafka_client (kafka.client.KafkaClient): client used to look up the
+            leader of each topic partition.
+        thread_count (int): maximum number of brokers contacted concurrently.
+    """
+
+    def __init__(self, kafka_client, thread_count):
+        self.kafka_client = kafka_client
+        self.thread_count = thread_count
+        self._pool = None
+        self._broker_connections = {}
+        self._correlation_id = 0
+
+    def send_produce_requests(self, requests, acks, timeout=1000):
+        """Sends the produce requests, and returns the responses of the ones
+        that reached their leader broker, which are either ProduceResponse or
+        FailedPayloadsError.  Requests without a response weren't sent, and
+        should be retried.
+        """
+        requests_by_leader = self._group_requests_by_leader(requests)
+        broker_tasks = [
+            (leader, leader_requests, self._next_correlation_id(), acks, timeout)
+            for leader, leader_requests in requests_by_leader.iteritems()
+        ]
+        if len(broker_tasks) <= 1 or self.thread_count <= 1:
+            broker_responses = map(self._send_to_broker, broker_tasks)
+        else:
+            broker_responses = self._get_pool().map(self._send_to_broker, broker_tasks)
+
+        responses = []
+        for (leader, _, _, _, _), leader_responses in zip(broker_tasks, broker_responses):
+            if any(isinstance(r, FailedPayloadsError) for r in leader_responses):
+                # Connection errors generally mean the metadata is stale
+                self.kafka_client.reset_topic_metadata(
+                    *[request.topic for request in requests_by_leader[leader]]
+                )
+            responses.extend(leader_responses)
+        return responses
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+        for connection in self._broker_connections.itervalues():
+            connection.close()
+        self._broker_connections = {}
+
+    def _group_requests_by_leader(self, requests):
+        requests_by_leader = defaultdict(list)
+        for request in requests:
+            try:
+                leader = self.kafka_client._get_leader_for_partition(
+                    request.topic,
+                    request.partition
+                )
+            except KafkaError:
+                # e.g. LeaderNotAvailableError or UnknownTopicOrPartitionError.
+                # The request is left out, and will be verified and retried.
+                logger.debug(
+                    "Cannot find the leader of topic {0} partition {1}.".format(
+                        request.topic,
+                        request.partition
+                    ),
+                    exc_info=1
+                )
+                continue
+            requests_by_leader[leader].append(request)
+        return requests_by_leader
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = ThreadPool(self.thread_count)
+        return self._pool
+
+    def _next_correlation_id(self):
+        # Correlation ids only need to be unique per connection, they're
+        # generated here so the threads don't share any state.
+        self._correlation_id = (self._correlation_id + 1) % 2 ** 31
+        return self._correlation_id
+
+    def _send_to_broker(self, broker_task):
+        leader, requests, request_id, acks, timeout = broker_task
+        encoded_request = KafkaProtocol.encode_produce_request(
+            client_id=self.kafka_client.client_id,
+            correlation_id=request_id,
+            payloads=requests,
+            acks=acks,
+            timeout=timeout
+        )
+        try:
+            connection = self._get_broker_connection(leader)
+            connection.send(request_id, encoded_request)
+            if acks == 0:
+                return []
+            return list(KafkaProtocol.decode_produce_response(
+                connection.recv(request_id)
+            ))
+        except ConnectionError:
+            logger.warning(
+                "Failed to send produce request {0} to broker {1}.".format(
+                    request_id,
+                    leader
+                ),
+                exc_info=1
+            )
+            self._close_broker_connection(leader)
+            return [FailedPayloadsError(request) for request in requests]
+
+    def _get_broker_connection(self, leader):
+        host_key = (leader.host.decode('utf-8'), leader.port)
+        connection = self._broker_connections.get(host_key)
+        if connection is None:
+            connection = KafkaConnection(
+                host_key[0],
+                host_key[1],
+                timeout=self.kafka_client.timeout
+            )
+            self._broker_connections[host_key] = connection
+        return connection
+
+    def _close_broker_connection(self, leader):
+        host_key = (leader.host.decode('utf-8'), leader.port)
+        connection = self._broker_connections.pop(host_key, None)
+        if connection is not None:
+            connection.close()
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+from data_pipeline._future_client import FutureClient
+from data_pipeline.config import get_config
+from data_pipeline.consumer import Consumer
+
+
+class AsyncConsumer(FutureClient):
+    """Consumer whose methods return :class:`concurrent.futures.Future`
+    instances instead of blocking, for applications built around an event
+    loop or callbacks.
+
+    It wraps a :class:`data_pipeline.consumer.Consumer`, which is only used by
+    a dedicated thread, so fetching messages, decoding them (and the
+    schematizer lookups this requires) and committing offsets happen without
+    blocking the caller.  Calls are run in order, so a commit requested while
+    messages are being fetched runs once the fetch is done.
+
+    **Example**::
+
+        def process_messages(future):
+            messages = future.result()
+            ... do stuff with messages ...
+            consumer.commit_messages(messages)
+            consumer.get_messages(count=100).add_done_callback(process_messages)
+
+        with AsyncConsumer(
+            consumer_name='my_consumer',
+            team_name='bam',
+            expected_frequency_seconds=12345,
+            topic_to_consumer_topic_state_map={'topic_a': None}
+        ) as consumer:
+            consumer.get_messages(count=100).add_done_callback(process_messages)
+            ...
+
+    Args:
+        See :class:`data_pipeline.consumer.Consumer`, which is passed all
+        arguments.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(AsyncConsumer, self).__init__(Consumer(*args, **kwargs))
+
+    @property
+    def consumer(self):
+        return self.client
+
+    def get_messages(
+        self,
+        count,
+        timeout=get_config().consumer_get_messages_timeout_default
+    ):
+        """Returns a future of the list of at most `count` messages retrieved
+        within `timeout` seconds, see
+        :meth:`data_pipeline.consumer.Consumer.get_messages`.  Since it doesn't
+        block the caller, the wrapped consumer always waits for the messages.
+        """
+        return self._submit(
+            self.consumer.get_messages,
+            count,
+            blocking=True,
+            timeout=timeout
+        )
+
+    def get_raw_messages(
+        self,
+        count,
+        timeout=get_config().consumer_get_messages_timeout_default,
+        unpack_header=False
+    ):
+        """Returns a future of the list of at most `count` raw messages
+        retrieved within `timeout` seconds, see
+        :meth:`data_pipeline.consumer.Consumer.get_raw_messages`.
+        """
+        return self._submit(
+            self.consumer.get_raw_messages,
+            count,
+            blocking=True,
+            timeout=timeout,
+            unpack_header=unpack_header
+        )
+
+    def get_message(
+        self,
+        timeout=get_config().consumer_get_messages_timeout_default
+    ):
+        """Returns a future of the next message, or None if no message was
+        retrieved within `timeout` seconds.
+        """
+        return self._submit(
+            self.consumer.get_message,
+            blocking=True,
+            timeout=timeout
+        )
+
+    def commit_messages(self, messages):
+        """Returns a future of
+        :meth:`data_pipeline.consumer.Consumer.commit_messages`.
+        """
+        return self._submit(self.consumer.commit_messages, messages)
+
+    def commit_message(self, message):
+        """Returns a future of
+        :meth:`data_pipeline.consumer.Consumer.commit_message`.
+        """
+        return self._submit(self.consumer.commit_message, message)
+
+    def commit_offsets(self, topic_to_partition_offset_map):
+        """Returns a future of
+        :meth:`data_pipeline.consumer.Consumer.commit_offsets`.
+        """
+        return self._submit(
+            self.consumer.commit_offsets,
+            topic_to_partition_offset_map
+        )
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+from data_pipeline._future_client import FutureClient
+from data_pipeline.producer import Producer
+
+
+class AsyncProducer(FutureClient):
+    """Producer whose methods return :class:`concurrent.futures.Future`
+    instances instead of blocking, for applications built around an event
+    loop or callbacks.
+
+    It wraps a :class:`data_pipeline.producer.Producer`, which is only used by
+    a dedicated thread, so the schematizer lookups needed to publish messages,
+    and the flushes to Kafka, happen without blocking the caller.  Messages are
+    published in the order :meth:`publish` is called.
+
+    **Example**::
+
+        with AsyncProducer(
+            producer_name='my_producer',
+            team_name='bam',
+            expected_frequency_seconds=ExpectedFrequency.constantly
+        ) as producer:
+            producer.publish_messages(messages)
+            producer.flush().add_done_callback(on_messages_published)
+
+    Args:
+        See :class:`data_pipeline.producer.Producer`, which is passed all
+        arguments.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(AsyncProducer, self).__init__(Producer(*args, **kwargs))
+
+    @property
+    def producer(self):
+        return self.client
+
+    def publish(self, message, timestamp=None):
+        """Returns a future of :meth:`data_pipeline.producer.Producer.publish`.
+        """
+        return self._submit(self.producer.publish, message, timestamp=timestamp)
+
+    def publish_messages(self, messages):
+        """Publishes the messages in order, and returns a single future for
+        all of them, which is cheaper than a future per message.
+        """
+        return self._submit(self._publish_messages, messages)
+
+    def _publish_messages(self, messages):
+        for message in messages:
+            self.producer.publish(message)
+
+    def flush(self):
+        """Returns a future which is done once the messages published before
+        the call have been published into Kafka.
+        """
+        return self._submit(self.producer.flush)
+
+    def wake(self):
+        """Returns a future of :meth:`data_pipeline.producer.Producer.wake`."""
+        return self._submit(self.producer.wake)
+
+    def get_checkpoint_position_data(self):
+        """Returns a future of the `PositionData` of the messages published
+        before the call.
+        """
+        return self._submit(self.producer.get_checkpoint_position_data)
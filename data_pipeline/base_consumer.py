@@ -16,18 +16,25 @@
 from __future__ import absolute_import
 from __future__ import unicode_literals
 
+import threading
 from collections import defaultdict
 from contextlib import contextmanager
+from functools import partial
 
 from cached_property import cached_property
+from concurrent.futures import ThreadPoolExecutor
 from kafka import KafkaClient
 from kafka.common import FailedPayloadsError
+from kafka.common import LeaderNotAvailableError
 from kafka.common import OffsetCommitRequest
+from kafka.common import UnknownTopicOrPartitionError
 from kafka.util import kafka_bytestring
 from yelp_kafka import discovery
 from yelp_kafka.config import KafkaConsumerConfig
 
 from data_pipeline._consumer_tick import _ConsumerTick
+from data_pipeline._kafka_util import get_first_offsets_at_or_after_timestamps
+from data_pipeline._offset_committer import OffsetCommitter
 from data_pipeline._retry_util import ExpBackoffPolicy
 from data_pipeline._retry_util import retry_on_exception
 from data_pipeline._retry_util import RetryPolicy
@@ -167,6 +174,16 @@ class BaseConsumer(Client):
             Consumer will connect to Kafka cluster in the corresponding region.
             All topics should belong to the same kafka cluster name.
             Defaults to None.
+        async_commit (Optional[boolean]): If true, `commit_messages` and
+            `commit_offsets` don't block on Kafka: the offsets are coalesced
+            per topic and partition, the highest offset winning, and sent from
+            a background thread (see `flush_commits`).  Default is false.
+        commit_flush_interval_seconds (Optional[float]): Maximum time in
+            seconds offsets are held before being sent when `async_commit` is
+            set.  Defaults to `consumer_commit_flush_interval_seconds`.
+        commit_flush_count (Optional[int]): Number of committed offsets which
+            triggers sending the pending offsets when `async_commit` is set.
+            Defaults to `consumer_commit_flush_count`.
     """
 
     def __init__(
@@ -185,7 +202,10 @@ class BaseConsumer(Client):
         post_rebalance_callback=None,
         fetch_offsets_for_topics=None,
         pre_topic_refresh_callback=None,
-        cluster_name=None
+        cluster_name=None,
+        async_commit=False,
+        commit_flush_interval_seconds=None,
+        commit_flush_count=None
     ):
         super(BaseConsumer, self).__init__(
             consumer_name,
@@ -212,6 +232,21 @@ class BaseConsumer(Client):
         self.fetch_offsets_for_topics = fetch_offsets_for_topics
         self.pre_topic_refresh_callback = pre_topic_refresh_callback
         self.cluster_name = self._set_cluster_name(cluster_name)
+        self.async_commit = async_commit
+        self.commit_flush_interval_seconds = (
+            commit_flush_interval_seconds or
+            get_config().consumer_commit_flush_interval_seconds
+        )
+        self.commit_flush_count = (
+            commit_flush_count or get_config().consumer_commit_flush_count
+        )
+        self._offset_committer = None
+        # Held by the rebalance callbacks, which may be invoked from another
+        # thread than the one calling into the consumer, so that they don't
+        # update the state of the consumer while offsets are being committed.
+        self._rebalance_lock = threading.RLock()
+        self._region_topic_names = None
+        self._is_region_topic_names_cached = False
         self._refresh_timer = _ConsumerTick(
             refresh_time_seconds=topic_refresh_frequency_seconds
         )
@@ -244,8 +279,7 @@ class BaseConsumer(Client):
         :return: cluster_type
         """
         cluster_type = None
-        for topic_name in topic_names:
-            topic = self._schematizer.get_topic_by_name(topic_name)
+        for topic in self._get_topics_by_names(topic_names):
             if cluster_type is None:
                 cluster_type = topic.cluster_type
             elif cluster_type != topic.cluster_type:
@@ -255,6 +289,30 @@ class BaseConsumer(Client):
                 )
         return cluster_type
 
+    def _get_topics_by_names(self, topic_names):
+        """Looks the topics up in the schematizer concurrently, so starting
+        a consumer of many topics takes about as long as the slowest lookups
+        rather than all of them.  The schematizer client caches the topics, so
+        they are only looked up once.  It's shared by the threads of the
+        process: its cache is guarded by a lock and concurrent misses of the
+        same topic share a single request.
+        """
+        topic_names = list(topic_names)
+        pool_size = min(
+            len(topic_names),
+            get_config().consumer_topic_lookup_pool_size
+        )
+        if pool_size <= 1:
+            return [
+                self._schematizer.get_topic_by_name(topic_name)
+                for topic_name in topic_names
+            ]
+        with ThreadPoolExecutor(max_workers=pool_size) as executor:
+            return list(executor.map(
+                self._schematizer.get_topic_by_name,
+                topic_names
+            ))
+
     def _get_refreshed_topic_to_consumer_topic_state_map(
         self,
         topic_to_consumer_state_map,
@@ -321,15 +379,18 @@ class BaseConsumer(Client):
             topic_to_consumer_topic_state_map.keys()
         )
         self.topic_to_partition_map = {}
-        for (
-            topic_name, consumer_topic_state
-        ) in topic_to_consumer_topic_state_map.iteritems():
-            topics = self._get_topics_in_region_from_topic_name(topic_name)
-            for topic in topics:
-                self.topic_to_partition_map[topic] = (
-                    consumer_topic_state.partition_offset_map.keys()
-                    if consumer_topic_state else None
-                )
+        # The topics of the region are discovered once for all the topics,
+        # instead of loading the metadata of each of them.
+        with self._cache_region_topic_names():
+            for (
+                topic_name, consumer_topic_state
+            ) in topic_to_consumer_topic_state_map.iteritems():
+                topics = self._get_topics_in_region_from_topic_name(topic_name)
+                for topic in topics:
+                    self.topic_to_partition_map[topic] = (
+                        consumer_topic_state.partition_offset_map.keys()
+                        if consumer_topic_state else None
+                    )
         self._set_registrar_tracked_schema_ids(topic_to_consumer_topic_state_map)
 
     def _get_topics_in_region_from_topic_name(self, topic_name):
@@ -366,22 +427,51 @@ class BaseConsumer(Client):
         return topics
 
     def _get_kafka_topics_from_topic_name(self, topic_name):
-        """yelp_kafka.discovery.search_topic returns a list of (topic, cluster)
-        tuple. However if the region is specified we should have 0 or 1 tuple
-        of (topic, cluster) returned
-        http://servicedocs.yelpcorp.com/docs/yelp_kafka/discovery.html#yelp_kafka.discovery.search_topic
+        """Looks the topic up in the topics of the region cluster when they
+        were discovered for all the topics of the consumer (see
+        `_set_topic_to_partition_map`), or in the metadata of the topic alone
+        otherwise.
         """
-        topics_in_region = discovery.search_topic(
-            topic=topic_name,
-            clusters=[self._region_cluster_config]
-        )
-        if not topics_in_region:
+        if self._is_region_topic_names_cached:
+            if self._region_topic_names is None:
+                self._region_topic_names = self._discover_region_topic_names()
+            is_in_region = topic_name in self._region_topic_names
+        else:
+            is_in_region = self._is_topic_in_region(topic_name)
+        if not is_in_region:
             raise TopicNotFoundInRegionError(
                 topic_name,
                 self.cluster_type,
                 self._region_cluster_config.name
             )
-        return [topic for topic, _ in topics_in_region]
+        return [topic_name]
+
+    def _is_topic_in_region(self, topic_name):
+        """Loads the metadata of the topic only, rather than of all the topics
+        of the cluster.
+        """
+        try:
+            self.kafka_client.load_metadata_for_topics(topic_name)
+            return True
+        except (UnknownTopicOrPartitionError, LeaderNotAvailableError):
+            return False
+
+    @contextmanager
+    def _cache_region_topic_names(self):
+        self._is_region_topic_names_cached = True
+        try:
+            yield
+        finally:
+            self._is_region_topic_names_cached = False
+            self._region_topic_names = None
+
+    def _discover_region_topic_names(self):
+        """yelp_kafka.discovery.discover_topics fetches the metadata of all the
+        topics of the cluster with a single request, it returns a dict of topic
+        to partitions.
+        http://servicedocs.yelpcorp.com/docs/yelp_kafka/discovery.html#yelp_kafka.discovery.discover_topics
+        """
+        return set(discovery.discover_topics(self._region_cluster_config))
 
     def _set_registrar_tracked_schema_ids(self, topic_to_consumer_topic_state_map):
         """
@@ -393,7 +483,9 @@ class BaseConsumer(Client):
             for consumer_topic_state in topic_to_consumer_topic_state_map.itervalues()
             if consumer_topic_state and consumer_topic_state.last_seen_schema_id
         ]
-        self.registrar.register_tracked_schema_ids(schema_id_list)
+        # Publishing the registration messages registers their schema first,
+        # which would otherwise hold up starting the consumer.
+        self.registrar.register_tracked_schema_ids(schema_id_list, blocking=False)
 
     @cached_property
     def kafka_client(self):
@@ -459,6 +551,13 @@ class BaseConsumer(Client):
             raise RuntimeError("Consumer '{0}' is already running".format(
                 self.client_name
             ))
+        if self.async_commit:
+            self._offset_committer = OffsetCommitter(
+                self,
+                flush_interval_seconds=self.commit_flush_interval_seconds,
+                flush_count=self.commit_flush_count
+            )
+            self._offset_committer.start()
         self._start()
         self.running = True
         logger.info("Consumer '{0}' started".format(self.client_name))
@@ -472,14 +571,27 @@ class BaseConsumer(Client):
             The derived class must implement _stop().
         """
         logger.info("Stopping Consumer '{0}'...".format(self.client_name))
-        if self.running:
-            self._stop()
-        self.registrar.stop()
-        self.kafka_client.close()
-        self.reset_topic_to_partition_offset_cache()
-        self.running = False
+        try:
+            if self.running:
+                self._stop_offset_committer()
+        finally:
+            # The consumer is torn down even if its last offsets can't be
+            # committed, whose error is raised once it is.
+            try:
+                if self.running:
+                    self._stop()
+            finally:
+                self.registrar.stop()
+                self.kafka_client.close()
+                self.reset_topic_to_partition_offset_cache()
+                self.running = False
         logger.info("Consumer '{0}' stopped".format(self.client_name))
 
+    def _stop_offset_committer(self):
+        if self._offset_committer is not None:
+            offset_committer, self._offset_committer = self._offset_committer, None
+            offset_committer.stop()
+
     def __iter__(self):
         while True:
             yield self.get_message(
@@ -622,10 +734,30 @@ class BaseConsumer(Client):
             topic_to_partition_offset_map (Dict[str, Dict[int, int]]): Maps from
                 topics to a partition and offset map for each topic.
         """
-        topic_to_partition_offset_map = self._get_offsets_map_to_be_committed(
-            topic_to_partition_offset_map
-        )
+        with self._rebalance_lock:
+            topic_to_partition_offset_map = self._get_offsets_map_to_be_committed(
+                topic_to_partition_offset_map
+            )
+            if self._offset_committer is not None:
+                return self._offset_committer.commit_offsets(
+                    topic_to_partition_offset_map
+                )
+            return self._send_offsets(topic_to_partition_offset_map)
+
+    def flush_commits(self):
+        """Blocks until the offsets committed so far have been sent to Kafka.
+        This is only needed when the consumer is created with `async_commit`,
+        for instance before handing the processed messages off to a system
+        which relies on the committed offsets.  The pending offsets are always
+        sent before the consumer stops and before its partitions are
+        rebalanced.
+        """
+        if self._offset_committer is not None:
+            self._offset_committer.flush()
+
+    def _send_offsets(self, topic_to_partition_offset_map, kafka_client=None):
         return self._send_offset_commit_requests(
+            kafka_client=kafka_client or self.kafka_client,
             offset_commit_request_list=[
                 OffsetCommitRequest(
                     topic=kafka_bytestring(topic),
@@ -682,7 +814,7 @@ class BaseConsumer(Client):
             self.commit_messages(messages=messages)
 
     def reset_topics(self, topic_to_consumer_topic_state_map):
-        """ Stop and restart the Consumer with a new
+        """ Resets the topics of the Consumer with a new
         topic_to_consumer_topic_state_map. This can be used to change topics
         which are being consumed and/or modifying the offsets of the topics
         already being consumed.
@@ -715,8 +847,9 @@ class BaseConsumer(Client):
                     consumer.reset_topics(topic_map)
 
         Note:
-            This is an expensive operation, roughly equivalent to destroying
-            and recreating the Consumer, so make sure you only are calling this
+            This is an expensive operation, which makes the consumer group
+            rebalance (see :class:`data_pipeline.consumer.Consumer` for how
+            long consumption pauses), so make sure you only are calling this
             when absolutely necessary.
 
             It's also important to note that you should probably be calling
@@ -732,9 +865,70 @@ class BaseConsumer(Client):
                 for the consumer_name the Consumer will begin from the
                 `auto_offset_reset` offset in the topic.
         """
+        def update_topic_to_partition_map():
+            self._commit_topic_offsets(topic_to_consumer_topic_state_map)
+            self._set_topic_to_partition_map(topic_to_consumer_topic_state_map)
+
+        self._update_topics(update_topic_to_partition_map)
+
+    def seek_to_timestamp(self, topic_to_timestamp, timestamp_offset_index=None):
+        """ Moves the Consumer to the first message published at or after a
+        timestamp in each partition of the given topics, consuming from the
+        topics which aren't consumed yet.  The other topics are consumed from
+        their committed offsets, as with :meth:`reset_topics`, so you should
+        probably be calling `commit_messages` just prior to calling this.
+
+        The offsets are searched with fetch requests sent directly with the
+        `kafka_client`, all the partitions being searched at once.  See
+        :func:`data_pipeline._kafka_util.get_first_offsets_at_or_after_timestamps`.
+
+        **Example**::
+
+            with Consumer(
+                consumer_name='example',
+                team_name='bam',
+                expected_frequency_seconds=12345,
+                topic_to_consumer_topic_state_map={'topic1': None}
+            ) as consumer:
+                consumer.seek_to_timestamp({'topic1': 1463086536})
+
+        Args:
+            topic_to_timestamp ({str:int}): A map of topic names to the epoch
+                timestamps to start from.
+            timestamp_offset_index
+                (Optional[data_pipeline.timestamp_offset_index.TimestampOffsetIndex]):
+                Index of sampled offsets narrowing down the search.
+
+        Returns:
+            {str:ConsumerTopicState}: The `ConsumerTopicState` of each topic
+            which has been found, with the offsets it starts from.
+        """
+        topic_to_partition_offset_map = get_first_offsets_at_or_after_timestamps(
+            self.kafka_client,
+            topic_to_timestamp,
+            envelope=self._envelope,
+            timestamp_offset_index=timestamp_offset_index
+        )
+        topic_to_consumer_topic_state_map = {
+            topic: ConsumerTopicState(partition_offset_map, last_seen_schema_id=None)
+            for topic, partition_offset_map in topic_to_partition_offset_map.iteritems()
+        }
+        topic_map = {topic: None for topic in self.topic_to_partition_map}
+        topic_map.update(topic_to_consumer_topic_state_map)
+        self.reset_topics(topic_map)
+        return topic_to_consumer_topic_state_map
+
+    def _update_topics(self, update_topic_to_partition_map):
+        """ Makes the consumer consume the topics of `topic_to_partition_map`
+        once updated by the `update_topic_to_partition_map` callable, which
+        should also commit the offsets the topics should start from.
+
+        Note:
+            The consumer is restarted here, the derived class may override
+            this to update the topics of the running consumer.
+        """
         self.stop()
-        self._commit_topic_offsets(topic_to_consumer_topic_state_map)
-        self._set_topic_to_partition_map(topic_to_consumer_topic_state_map)
+        update_topic_to_partition_map()
         self._start_consumer()
 
     def _commit_topic_offsets(self, topic_to_consumer_topic_state_map):
@@ -747,17 +941,22 @@ class BaseConsumer(Client):
                 if consumer_topic_state is None:
                     continue
                 topic_to_partition_offset_map[topic] = consumer_topic_state.partition_offset_map
-            self.commit_offsets(topic_to_partition_offset_map)
+            # These offsets may rewind the topics, so rather than being
+            # coalesced with the pending offsets, they're sent after them.
+            self.flush_commits()
+            self._send_offsets(
+                self._get_offsets_map_to_be_committed(topic_to_partition_offset_map)
+            )
             logger.info("Offsets committed for Consumer '{0}'...".format(
                 self.client_name
             ))
 
-    def _send_offset_commit_requests(self, offset_commit_request_list):
+    def _send_offset_commit_requests(self, kafka_client, offset_commit_request_list):
         if len(offset_commit_request_list) > 0:
             retry_on_exception(
                 self._consumer_retry_policy,
                 (FailedPayloadsError),
-                self.kafka_client.send_offset_commit_request,
+                kafka_client.send_offset_commit_request,
                 group=kafka_bytestring(self.client_name),
                 payloads=offset_commit_request_list
             )
@@ -794,10 +993,25 @@ class BaseConsumer(Client):
             auto_commit=False,
             partitioner_cooldown=self.partitioner_cooldown,
             use_group_sha=self.use_group_sha,
-            pre_rebalance_callback=self.pre_rebalance_callback,
+            pre_rebalance_callback=self._apply_pre_rebalance_callback_to_partition,
             post_rebalance_callback=self._apply_post_rebalance_callback_to_partition
         )
 
+    def _apply_pre_rebalance_callback_to_partition(self, partitions):
+        # The offsets of the released partitions are sent before another
+        # consumer can acquire them.  An error is logged rather than raised
+        # into the partitioner, which would abort the rebalance.
+        with self._rebalance_lock:
+            try:
+                self.flush_commits()
+            except Exception:
+                logger.exception(
+                    "Failed to flush the offsets of Consumer '{0}' before "
+                    "rebalancing.".format(self.client_name)
+                )
+            if self.pre_rebalance_callback:
+                return self.pre_rebalance_callback(partitions)
+
     def _apply_post_rebalance_callback_to_partition(self, partitions):
         """
         Removes the topics not present in the partitions list
@@ -807,11 +1021,12 @@ class BaseConsumer(Client):
             partitions: List of current partitions the kafka
             broker holds
         """
-        self.topic_to_partition_map = dict(partitions)
-        self.reset_topic_to_partition_offset_cache()
+        with self._rebalance_lock:
+            self.topic_to_partition_map = dict(partitions)
+            self.reset_topic_to_partition_offset_cache()
 
-        if self.post_rebalance_callback:
-            return self.post_rebalance_callback(partitions)
+            if self.post_rebalance_callback:
+                return self.post_rebalance_callback(partitions)
 
     def refresh_new_topics(
         self,
@@ -884,9 +1099,9 @@ class BaseConsumer(Client):
             old_topic_names = self.topic_to_partition_map.keys()
             if pre_topic_refresh_callback:
                 pre_topic_refresh_callback(old_topic_names, new_topic_names)
-            self.stop()
-            self._update_topic_to_partition_map(new_topic_names)
-            self._start_consumer()
+            self._update_topics(
+                partial(self._update_topic_to_partition_map, new_topic_names)
+            )
 
         return new_topics
 
@@ -921,9 +1136,9 @@ class BaseConsumer(Client):
                       if topic not in self.topic_to_partition_map]
 
         if new_topics:
-            self.stop()
-            self._update_topic_to_partition_map(new_topics)
-            self._start_consumer()
+            self._update_topics(
+                partial(self._update_topic_to_partition_map, new_topics)
+            )
 
             # If a new topic doesn't exist, when the consumer restarts, it will
             # be removed from the topic state map after the re-balance callback.
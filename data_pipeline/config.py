@@ -19,10 +19,13 @@ from __future__ import unicode_literals
 import logging
 import os
 
+import simplejson
 import staticconf
 from bravado.client import SwaggerClient
+from bravado.requests_client import RequestsClient
 from cached_property import cached_property
 from kafka_utils.util.config import ClusterConfig
+from requests.adapters import HTTPAdapter
 
 
 namespace = 'data_pipeline'
@@ -131,9 +134,73 @@ class Config(object):
 
         By default, this will connect to a schematizer instance running in the
         included docker-compose file.
+
+        The requests are sent through a pool of up to
+        :meth:`schematizer_client_connection_pool_size` kept-alive
+        connections.  If :meth:`schematizer_client_swagger_spec_path` is set,
+        the api spec is loaded from that file instead of being downloaded from
+        the schematizer.
         """
-        return SwaggerClient.from_url(
-            'http://{0}/swagger.json'.format(self.schematizer_host_and_port)
+        http_client = RequestsClient()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.schematizer_client_connection_pool_size
+        )
+        http_client.session.mount('http://', adapter)
+        http_client.session.mount('https://', adapter)
+        spec_url = 'http://{0}/swagger.json'.format(
+            self.schematizer_host_and_port
+        )
+        if self.schematizer_client_swagger_spec_path is None:
+            return SwaggerClient.from_url(spec_url, http_client=http_client)
+        spec_dict = self._load_schematizer_swagger_spec(spec_url, http_client)
+        # The spec may have been saved from another schematizer instance.
+        spec_dict['host'] = self.schematizer_host_and_port
+        return SwaggerClient.from_spec(
+            spec_dict,
+            origin_url=spec_url,
+            http_client=http_client
+        )
+
+    def _load_schematizer_swagger_spec(self, spec_url, http_client):
+        spec_path = self.schematizer_client_swagger_spec_path
+        if os.path.exists(spec_path):
+            with open(spec_path) as spec_file:
+                return simplejson.load(spec_file)
+        response = http_client.session.get(spec_url)
+        response.raise_for_status()
+        spec_dict = response.json()
+        # The spec is written to a temporary file first, so that processes
+        # starting at the same time never load a partially written spec.
+        tmp_spec_path = '{0}.{1}.tmp'.format(spec_path, os.getpid())
+        with open(tmp_spec_path, 'w') as spec_file:
+            simplejson.dump(spec_dict, spec_file)
+        os.rename(tmp_spec_path, spec_path)
+        return spec_dict
+
+    @property
+    def schematizer_client_connection_pool_size(self):
+        """Maximum number of kept-alive connections to the schematizer in the
+        connection pool of :meth:`schematizer_client`.  It should be at least
+        :meth:`schematizer_client_max_concurrent_requests`, otherwise the
+        connections of concurrent requests are closed after each request.
+        """
+        return data_pipeline_conf.read_int(
+            'schematizer_client_connection_pool_size',
+            default=10
+        )
+
+    @property
+    def schematizer_client_swagger_spec_path(self):
+        """Path of a local copy of the schematizer swagger spec, so that
+        :meth:`schematizer_client` doesn't download it at every process start.
+        If the file doesn't exist, the spec is downloaded and saved to it.
+        The spec should be removed whenever the schematizer api changes.
+        Defaults to None, which always downloads the spec.
+        """
+        return data_pipeline_conf.read_string(
+            'schematizer_client_swagger_spec_path',
+            default=None
         )
 
     @property
@@ -146,6 +213,91 @@ class Config(object):
             default=5
         )
 
+    @property
+    def schematizer_client_max_concurrent_requests(self):
+        """Maximum number of concurrent requests schematizer_clientlib makes
+        to look up many entities at once, see
+        :meth:`data_pipeline.schematizer_clientlib.schematizer.SchematizerClient.get_schemas_by_ids`,
+        which is also the number of pages paginated lookups request ahead.
+        Set it to 1 to make the requests one after another.
+        """
+        return data_pipeline_conf.read_int(
+            'schematizer_client_max_concurrent_requests',
+            default=8
+        )
+
+    @property
+    def schematizer_client_not_found_cache_ttl_seconds(self):
+        """Number of seconds schematizer_clientlib remembers that the
+        schematizer doesn't have an entity, such as a topic, before requesting
+        it again, see
+        :class:`data_pipeline.schematizer_clientlib.schematizer._NotFoundCache`.
+        """
+        return data_pipeline_conf.read_float(
+            'schematizer_client_not_found_cache_ttl_seconds',
+            default=60
+        )
+
+    @property
+    def schematizer_client_not_found_cache_max_size(self):
+        """Maximum number of entities schematizer_clientlib remembers the
+        schematizer doesn't have.
+        """
+        return data_pipeline_conf.read_int(
+            'schematizer_client_not_found_cache_max_size',
+            default=10000
+        )
+
+    @property
+    def schematizer_client_cache_snapshot_path(self):
+        """Path of the local file the schemas, topics and sources cached by
+        schematizer_clientlib are saved to by
+        :func:`data_pipeline.helpers.yelp_avro_store.preload_schemas`.  When
+        set, the schematizer client of a process starting later on the host
+        loads its cache from the file, instead of requesting the schemas
+        again.  Defaults to None, which doesn't save the cache.
+        """
+        return data_pipeline_conf.read_string(
+            'schematizer_client_cache_snapshot_path',
+            default=None
+        )
+
+    @property
+    def avro_string_store_cache_max_size(self):
+        """Maximum number of avro writers, and of avro readers, kept by
+        :class:`data_pipeline.helpers.yelp_avro_store._AvroStringStore`.  The
+        least recently used ones are evicted beyond it.  It should be at least
+        the number of schemas, or of (reader, writer) schema pairs, a process
+        uses at a time, otherwise they're parsed again and again.
+        """
+        return data_pipeline_conf.read_int(
+            'avro_string_store_cache_max_size',
+            default=5000
+        )
+
+    @property
+    def catalog_mirror_path(self):
+        """Path of the local file the catalog mirror of the host is stored in,
+        see :class:`data_pipeline.schematizer_clientlib.catalog_mirror.CatalogMirror`.
+        When set, the consumer sources and the introspector look the topics up
+        in the mirror instead of querying the schematizer.  Defaults to None,
+        which doesn't use a mirror.
+        """
+        return data_pipeline_conf.read_string(
+            'catalog_mirror_path',
+            default=None
+        )
+
+    @property
+    def catalog_mirror_sync_interval_seconds(self):
+        """Minimum number of seconds between two syncs of the catalog mirror
+        with the schematizer, across all the processes sharing the mirror.
+        """
+        return data_pipeline_conf.read_float(
+            'catalog_mirror_sync_interval_seconds',
+            default=60
+        )
+
     @property
     def cluster_config(self):
         """Returns a yelp_kafka.config.ClusterConfig.
@@ -240,6 +392,47 @@ class Config(object):
             default=0.1,
         )
 
+    @property
+    def consumer_prefetch_batch_size(self):
+        """ Maximum number of messages in a batch prefetched by a ``Consumer``
+        created with a ``prefetch_queue_size``.
+        """
+        return data_pipeline_conf.read_int(
+            'consumer_prefetch_batch_size',
+            default=500,
+        )
+
+    @property
+    def consumer_commit_flush_interval_seconds(self):
+        """ Maximum time in seconds offsets committed by a consumer created
+        with ``async_commit`` are held before being sent to Kafka.
+        """
+        return data_pipeline_conf.read_float(
+            'consumer_commit_flush_interval_seconds',
+            default=1.0,
+        )
+
+    @property
+    def consumer_commit_flush_count(self):
+        """ Number of offsets committed by a consumer created with
+        ``async_commit`` which triggers sending the pending offsets to Kafka
+        before ``consumer_commit_flush_interval_seconds`` elapses.
+        """
+        return data_pipeline_conf.read_int(
+            'consumer_commit_flush_count',
+            default=1000,
+        )
+
+    @property
+    def consumer_topic_lookup_pool_size(self):
+        """ Maximum number of topics a starting consumer concurrently looks
+        up in the schematizer, when they aren't cached yet.
+        """
+        return data_pipeline_conf.read_int(
+            'consumer_topic_lookup_pool_size',
+            default=8,
+        )
+
     @property
     def consumer_partitioner_cooldown_default(self):
         """ Default partitioner cooldown time. See ``yelp_kafka.partitioner`` for
@@ -366,6 +559,30 @@ class Config(object):
             default=0.1
         )
 
+    @property
+    def kafka_producer_position_callback_max_delay_seconds(self):
+        """The maximum amount of time in seconds that the flush lanes of the
+        clientlib can hold back the producer position callback, which is only
+        invoked once every lane is flushed.  Once it's exceeded, every lane is
+        flushed along with the next lane that is due.
+        """
+        return data_pipeline_conf.read_float(
+            'kafka_producer_position_callback_max_delay_seconds',
+            default=10.0
+        )
+
+    @property
+    def kafka_producer_dispatch_thread_count(self):
+        """The maximum number of threads the clientlib uses to send produce
+        requests to their leader brokers concurrently.  When set to 1, the
+        default, all the requests are sent through a single kafka client call
+        instead.
+        """
+        return data_pipeline_conf.read_int(
+            'kafka_producer_dispatch_thread_count',
+            default=1
+        )
+
     @property
     def skip_position_info_update_when_not_set(self):
         """By default, the clientlib will replace upstream position info in the
@@ -17,14 +17,20 @@ from __future__ import absolute_import
 from __future__ import unicode_literals
 
 import errno
+from functools import partial
+from itertools import islice
 from time import time
 
 from kafka.common import ConsumerTimeout
 from yelp_kafka.consumer_group import KafkaConsumerGroup
+from yelp_kafka.partitioner import build_zk_group_path
 
+from data_pipeline._message_prefetcher import MessagePrefetcher
+from data_pipeline._payload_decode_pool import PayloadDecodePool
 from data_pipeline.base_consumer import BaseConsumer
 from data_pipeline.config import get_config
 from data_pipeline.message import create_from_kafka_message
+from data_pipeline.message import create_raw_from_kafka_message
 
 logger = get_config().logger
 
@@ -101,10 +107,40 @@ class Consumer(BaseConsumer):
             from (current_topics) and a set of topic names Consumer will be
             consuming from (refreshed_topics). The return value of the
             function is ignored.
+        prefetch_queue_size (Optional[int]): Maximum number of message batches
+            fetched ahead of time by a background thread.  Messages are fetched
+            synchronously by `get_messages` if it is 0, which is the default.
+            When prefetching, the rebalance callbacks are invoked from the
+            background thread, and may run while the previously returned
+            messages are being processed, though never while offsets are
+            being committed.  Prefetched messages which haven't
+            been returned yet are discarded by rebalances, and are consumed
+            again from the committed offsets.
+        prefetch_batch_size (Optional[int]): Maximum number of messages in a
+            prefetched batch.  Defaults to `consumer_prefetch_batch_size`.
+        prefetch_unpack_messages (Optional[boolean]): If true, which is the
+            default, the background thread also unpacks the envelopes of the
+            prefetched messages (and decodes their payloads with
+            `force_payload_decode`).  Otherwise `get_messages` does it.
+        decode_pool_size (Optional[int]): Number of subprocesses decoding the
+            payloads of the messages when `force_payload_decode` is set.
+            Payloads are decoded by the fetching thread if it is 0, which is
+            the default.  The workers are pre-warmed with the avro readers of
+            the schemas of the consumed topics.
 
     Note:
         The Consumer leverages the yelp_kafka `KafkaConsumerGroup`.
 
+    Note:
+        Changing the topics of a running Consumer, with `reset_topics`,
+        `refresh_new_topics`, `refresh_topics` or a `consumer_source`, doesn't
+        restart it.  The partitions of the consumer group are reassigned
+        instead, and consumption pauses while they are.  In the worst case,
+        the pause lasts `partitioner_cooldown`, during which the partitioner
+        waits for the group membership to settle, plus a Kafka metadata
+        request and a committed offsets request.  Other members of the
+        consumer group pause as well, since they rebalance too.
+
     **Examples**:
 
     A simple example can be a consumer with name 'my_consumer' that
@@ -159,15 +195,118 @@ class Consumer(BaseConsumer):
         a group with a single call to `commit_messages(..)`
     """
 
+    def __init__(self, *args, **kwargs):
+        self.prefetch_queue_size = kwargs.pop('prefetch_queue_size', 0)
+        self.prefetch_batch_size = kwargs.pop(
+            'prefetch_batch_size',
+            get_config().consumer_prefetch_batch_size
+        )
+        self.prefetch_unpack_messages = kwargs.pop(
+            'prefetch_unpack_messages',
+            True
+        )
+        self.decode_pool_size = kwargs.pop('decode_pool_size', 0)
+        self._prefetcher = None
+        self._decode_pool = None
+        self._known_schema_ids = set()
+        super(Consumer, self).__init__(*args, **kwargs)
+
     def _start(self):
+        if self.decode_pool_size > 0 and self.force_payload_decode:
+            # The pool is created before the consumer group starts its
+            # threads, so they aren't running when the workers are forked.
+            self._decode_pool = PayloadDecodePool(
+                processes=self.decode_pool_size,
+                reader_and_writer_schema_ids=self._get_reader_and_writer_schema_ids()
+            )
         self.consumer_group = KafkaConsumerGroup(
             topics=self.topic_to_partition_map.keys(),
             config=self._kafka_consumer_config
         )
         self.consumer_group.start()
+        self._start_prefetcher()
 
     def _stop(self):
+        self._stop_prefetcher()
         self.consumer_group.stop()
+        if self._decode_pool is not None:
+            self._decode_pool.close()
+            self._decode_pool = None
+
+    def _start_prefetcher(self):
+        if self.prefetch_queue_size > 0:
+            self._prefetcher = MessagePrefetcher(
+                self,
+                queue_size=self.prefetch_queue_size,
+                batch_size=self.prefetch_batch_size,
+                unpack_messages=self.prefetch_unpack_messages
+            )
+            self._prefetcher.start()
+
+    def _stop_prefetcher(self):
+        if self._prefetcher is not None:
+            self._prefetcher.stop()
+            self._prefetcher = None
+
+    def _update_topics(self, update_topic_to_partition_map):
+        """ Updates the topics of the running consumer group instead of
+        restarting the Consumer: the connections to Zookeeper and Kafka, the
+        underlying kafka consumer and the decode pool are kept, and only the
+        partitions are reassigned.
+        """
+        if not self.running:
+            return super(Consumer, self)._update_topics(
+                update_topic_to_partition_map
+            )
+        self._stop_prefetcher()
+        self.reset_topic_to_partition_offset_cache()
+        update_topic_to_partition_map()
+        self._repartition_consumer_group(self.topic_to_partition_map.keys())
+        self._start_prefetcher()
+
+    def _repartition_consumer_group(self, topics):
+        partitioner = self.consumer_group.partitioner
+        self.consumer_group.topics = topics
+        partitioner.topics = topics
+        if partitioner.config.use_group_sha:
+            # The group path depends on the topics, so the group is joined
+            # again, like a restarted Consumer would.
+            partitioner.zk_group_path = build_zk_group_path(
+                partitioner.config.group_path,
+                topics
+            )
+        # Releasing the partitions, and forgetting the partitions set, forces
+        # the partitioner to be recreated, which reassigns the partitions and
+        # makes the kafka consumer fetch from the committed offsets, even when
+        # the partitions haven't changed.
+        partitioner.release_and_finish()
+        partitioner.partitions_set = set()
+        partitioner.force_partitions_refresh = True
+        partitioner.refresh()
+
+    def _get_reader_and_writer_schema_ids(self):
+        reader_and_writer_schema_ids = set()
+        for topic, schemas in self._get_topic_to_schemas_map().iteritems():
+            reader_schema_id = self._topic_to_reader_schema_map.get(topic)
+            reader_and_writer_schema_ids.update(
+                (reader_schema_id or schema.schema_id, schema.schema_id)
+                for schema in schemas
+            )
+        return reader_and_writer_schema_ids
+
+    def _get_topic_to_schemas_map(self):
+        # The topics failing are logged and left out, the others are kept.
+        return self._schematizer.get_schemas_by_topics(
+            self.topic_to_partition_map,
+            skip_failed_topics=True
+        )
+
+    def _apply_pre_rebalance_callback_to_partition(self, partitions):
+        if self._prefetcher is not None:
+            self._prefetcher.discard_prefetched_messages()
+        return super(Consumer, self)._apply_pre_rebalance_callback_to_partition(
+            partitions
+        )
 
     def get_messages(
             self,
@@ -197,55 +336,242 @@ class Consumer(BaseConsumer):
             maximum size `count`, but may be smaller or empty depending on
             how many messages were retrieved within the timeout.
         """
+        messages = self._get_messages(
+            count,
+            blocking,
+            timeout,
+            self._create_messages
+        )
+        self._update_schemas_last_used_timestamp(
+            {message.reader_schema_id for message in messages}
+        )
+        return messages
+
+    def get_raw_messages(
+            self,
+            count,
+            blocking=False,
+            timeout=get_config().consumer_get_messages_timeout_default,
+            unpack_header=False
+    ):
+        """ Retrieve a list of messages without unpacking their envelopes,
+        for consumers which pass the messages through, like mirroring or
+        archiving ones.  The messages are otherwise retrieved like with
+        `get_messages`, and can be committed with `commit_messages`.
+
+        Args:
+            count (int): Number of messages to retrieve
+            blocking (boolean): Set to True to block while waiting for messages
+                if the buffer has been depleted. Otherwise returns immediately
+                if the buffer reaches depletion. Default is False.
+            timeout (double): Maximum time (in seconds) to wait if blocking is
+                set to True. Set to None to wait indefinitely.
+            unpack_header (boolean): Set to True to unpack the header of the
+                envelopes (see `data_pipeline.envelope.Envelope.unpack_header`),
+                which skips the payloads. Default is False.
+
+        Returns:
+            ([data_pipeline.message.RawMessage]): List of RawMessage objects
+            with maximum size `count`, but may be smaller or empty depending
+            on how many messages were retrieved within the timeout.
+
+        Raises:
+            ValueError: if the messages are prefetched with
+                `prefetch_unpack_messages`, since the prefetched messages are
+                already unpacked then.
+        """
+        if self.prefetch_queue_size > 0 and self.prefetch_unpack_messages:
+            raise ValueError(
+                "Raw messages can't be retrieved by a Consumer whose "
+                "prefetched messages are unpacked, set "
+                "prefetch_unpack_messages to False."
+            )
+        messages = self._get_messages(
+            count,
+            blocking,
+            timeout,
+            partial(self._create_raw_messages, unpack_header=unpack_header)
+        )
+        if unpack_header:
+            self._update_schemas_last_used_timestamp(
+                {message.header['schema_id'] for message in messages}
+            )
+        return messages
+
+    def _get_messages(self, count, blocking, timeout, create_messages):
         # TODO(tajinder|DATAPIPE-1231): Consumer should refresh topics
         # periodically even if NO timeout is provided and there are no
         # messages to consume.
-        messages = []
         has_timeout = timeout is not None
-        if has_timeout:
-            max_time = time() + timeout
-        while len(messages) < count:
-            # Consumer refreshes the topics periodically only if consumer_source
-            # is specified and would use the `fetch_offsets_for_topics` callback
-            # to get the partition offsets corresponding to the topics.
-            if self.consumer_source:
-                self._refresh_source_topics_if_necessary()
-            try:
-                default_iter_timeout = self.consumer_group.iter_timeout
-                # Converting seconds to milliseconds
-                self.consumer_group.iter_timeout = timeout * 1000
-                kafka_message = self._get_next_kafka_message(
+        max_time = time() + timeout if has_timeout else None
+        if self.prefetch_queue_size > 0:
+            return self._get_prefetched_messages(
+                count,
+                blocking,
+                max_time,
+                create_messages
+            )
+
+        messages = []
+        try:
+            while len(messages) < count:
+                # Consumer refreshes the topics periodically only if consumer_source
+                # is specified and would use the `fetch_offsets_for_topics` callback
+                # to get the partition offsets corresponding to the topics.
+                if self.consumer_source:
+                    self._refresh_source_topics_if_necessary()
+                kafka_messages = self._get_next_kafka_messages(
+                    count - len(messages),
                     blocking,
                     has_timeout,
-                    max_time
+                    max_time,
+                    timeout
                 )
-
-                # It's possible kafka_message is None if we used all our time
-                # stuck getting EINTR IOErrors
-                if kafka_message:
-                    message = create_from_kafka_message(
-                        kafka_message,
-                        self._envelope,
-                        self.force_payload_decode,
-                        reader_schema_id=self._topic_to_reader_schema_map.get(
-                            kafka_message.topic
-                        )
-                    )
-                    messages.append(message)
-                    # Update state in registrar for Producer/Consumer
-                    # registration in milliseconds
-                    self.registrar.update_schema_last_used_timestamp(
-                        message.reader_schema_id,
-                        timestamp_in_milliseconds=long(1000 * time())
-                    )
+                messages.extend(create_messages(kafka_messages))
                 if self._break_consume_loop(blocking, has_timeout, max_time):
                     break
-            except ConsumerTimeout:
-                break
-            finally:
-                self.consumer_group.iter_timeout = default_iter_timeout
+        except ConsumerTimeout:
+            pass
         return messages
 
+    def _get_prefetched_messages(self, count, blocking, max_time, create_messages):
+        # The topics are refreshed from this thread, and the refresh restarts
+        # the prefetcher.
+        if self.consumer_source:
+            self._refresh_source_topics_if_necessary()
+        return self._prefetcher.get_messages(
+            count,
+            blocking,
+            max_time,
+            create_messages
+        )
+
+    def _get_next_kafka_messages(
+            self,
+            max_count,
+            blocking,
+            has_timeout,
+            max_time,
+            timeout
+    ):
+        """ Waits for the next kafka message, and returns it along with the
+        messages already fetched by the same fetch request, up to `max_count`
+        messages in total.
+        """
+        consumer_group = self.consumer_group
+        default_iter_timeout = consumer_group.iter_timeout
+        if has_timeout:
+            # Converting seconds to milliseconds
+            consumer_group.iter_timeout = timeout * 1000
+        try:
+            kafka_message = self._get_next_kafka_message(
+                blocking,
+                has_timeout,
+                max_time
+            )
+        finally:
+            consumer_group.iter_timeout = default_iter_timeout
+
+        # It's possible kafka_message is None if we used all our time
+        # stuck getting EINTR IOErrors
+        if not kafka_message:
+            return []
+        return [kafka_message] + self._get_fetched_kafka_messages(max_count - 1)
+
+    def _get_fetched_kafka_messages(self, max_count):
+        """ Drains up to `max_count` messages from the message set the
+        underlying kafka consumer is iterating over.  The whole message set is
+        received with the fetch response, so this doesn't make any request,
+        and skips the partition refresh and timeout checks done for every
+        message by `KafkaConsumerGroup.next`.
+        """
+        kafka_consumer = self.consumer_group.consumer
+        # kafka-python doesn't expose the fetched message set, `_msg_iter` is
+        # the generator `KafkaConsumer.next` reads from.
+        message_iterator = getattr(kafka_consumer, '_msg_iter', None)
+        if max_count <= 0 or message_iterator is None:
+            return []
+        kafka_messages = list(islice(message_iterator, max_count))
+        if len(kafka_messages) < max_count:
+            # The message set is exhausted, the next call fetches a new one.
+            kafka_consumer._reset_message_iterator()
+        return kafka_messages
+
+    def _create_messages(self, kafka_messages):
+        envelope = self._envelope
+        decode_pool = self._decode_pool
+        force_payload_decode = self.force_payload_decode and decode_pool is None
+        topic_to_reader_schema_map = self._topic_to_reader_schema_map
+        messages = [
+            create_from_kafka_message(
+                kafka_message,
+                envelope,
+                force_payload_decoding=False,
+                reader_schema_id=topic_to_reader_schema_map.get(
+                    kafka_message.topic
+                )
+            )
+            for kafka_message in kafka_messages
+        ]
+        self._cache_new_schemas(kafka_messages, messages)
+        if force_payload_decode:
+            for message in messages:
+                message.reload_data()
+        if decode_pool is not None:
+            decode_pool.decode_messages(messages)
+        return messages
+
+    def _cache_new_schemas(self, kafka_messages, messages):
+        """ Looks up the schemas the consumer hasn't seen yet all at once,
+        rather than one after another while decoding the messages.
+        """
+        new_schema_ids = set()
+        new_schema_topics = set()
+        for kafka_message, message in zip(kafka_messages, messages):
+            for schema_id in (message.schema_id, message.reader_schema_id):
+                if (schema_id is not None and
+                        schema_id not in self._known_schema_ids):
+                    new_schema_ids.add(schema_id)
+                    new_schema_topics.add(kafka_message.topic)
+        if not new_schema_ids:
+            return
+        try:
+            self._schematizer.get_schemas_by_ids(
+                new_schema_ids,
+                topic_names=new_schema_topics
+            )
+        except Exception:
+            # The schemas are looked up again, or fail, when decoding.
+            logger.warning(
+                "Failed to look up the schemas {0}".format(sorted(new_schema_ids))
+            )
+            return
+        self._known_schema_ids.update(new_schema_ids)
+
+    def _create_raw_messages(self, kafka_messages, unpack_header=False):
+        envelope = self._envelope
+        return [
+            create_raw_from_kafka_message(
+                kafka_message,
+                envelope,
+                unpack_header=unpack_header
+            )
+            for kafka_message in kafka_messages
+        ]
+
+    def _update_schemas_last_used_timestamp(self, reader_schema_ids):
+        """ Updates state in registrar for Producer/Consumer registration,
+        once per reader schema of the consumed messages.
+        """
+        if not reader_schema_ids:
+            return
+        timestamp_in_milliseconds = long(1000 * time())
+        for reader_schema_id in reader_schema_ids:
+            self.registrar.update_schema_last_used_timestamp(
+                reader_schema_id,
+                timestamp_in_milliseconds=timestamp_in_milliseconds
+            )
+
     def _get_next_kafka_message(
             self,
             blocking,
@@ -288,7 +614,8 @@ class Consumer(BaseConsumer):
         if self.pre_topic_refresh_callback:
             self.pre_topic_refresh_callback(current_topics, refreshed_topics)
 
-        self.stop()
-        self._commit_topic_offsets(all_topics_to_state_map)
-        self._set_topic_to_partition_map(refreshed_topics_to_state_map)
-        self._start_consumer()
+        def update_topic_to_partition_map():
+            self._commit_topic_offsets(all_topics_to_state_map)
+            self._set_topic_to_partition_map(refreshed_topics_to_state_map)
+
+        self._update_topics(update_topic_to_partition_map)
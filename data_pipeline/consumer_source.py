@@ -21,12 +21,17 @@ from datetime import datetime
 
 from cached_property import cached_property
 
+from data_pipeline.schematizer_clientlib.catalog_mirror import get_catalog_mirror
 from data_pipeline.schematizer_clientlib.schematizer import get_schematizer
 
 
 class ConsumerSource(object):
     """Base class to specify the Kafka topics where the consumer would like to
     fetch messages from.
+
+    When a `catalog_mirror_path` is configured, the topics are looked up in
+    the catalog mirror of the host, rather than in the Schematizer, see
+    :class:`data_pipeline.schematizer_clientlib.catalog_mirror.CatalogMirror`.
     """
 
     def get_topics(self):
@@ -44,6 +49,53 @@ class ConsumerSource(object):
     def schematizer(self):
         return get_schematizer()
 
+    @cached_property
+    def catalog_mirror(self):
+        return get_catalog_mirror()
+
+    def _get_topics_by_criteria(self, **criteria):
+        if self.catalog_mirror is None:
+            return self.schematizer.get_topics_by_criteria(**criteria)
+        self.catalog_mirror.sync()
+        return self.catalog_mirror.get_topics(**criteria)
+
+    def _get_new_topic_names_by_criteria(
+        self,
+        created_after,
+        returned_topic_names,
+        **criteria
+    ):
+        """Returns the names of the topics matching `criteria`, created at or
+        after `created_after`, which are not in `returned_topic_names`, along
+        with the names of all the topics matching, and the timestamp the
+        topics should be queried from the next time.
+
+        The next query starts from the time of this one, or, when the topics
+        are looked up in the catalog mirror, from its sync watermark, since
+        the topics created after its last sync are missing from it until the
+        next sync.  The topics returned by a query may then match the next
+        one as well, which is why they're excluded.
+        """
+        if self.catalog_mirror is None:
+            next_created_after = long(time.time())
+            topics = self.schematizer.get_topics_by_criteria(
+                created_after=created_after,
+                **criteria
+            )
+        else:
+            self.catalog_mirror.sync()
+            next_created_after = self.catalog_mirror.get_sync_watermark()
+            topics = self.catalog_mirror.get_topics(
+                created_after=created_after,
+                **criteria
+            )
+        topic_names = [topic.name for topic in topics]
+        new_topic_names = [
+            topic_name for topic_name in topic_names
+            if topic_name not in returned_topic_names
+        ]
+        return new_topic_names, set(topic_names), next_created_after
+
 
 class FixedTopics(ConsumerSource):
     """Consumer tails one or a fixed set of topics.
@@ -80,7 +132,7 @@ class TopicsInFixedNamespaces(ConsumerSource):
         for namespace_name in self.namespace_names:
             topic_names.extend(
                 topic.name
-                for topic in self.schematizer.get_topics_by_criteria(
+                for topic in self._get_topics_by_criteria(
                     namespace_name=namespace_name
                 )
             )
@@ -110,7 +162,7 @@ class TopicInSource(ConsumerSource):
         self.source_name = source_name
 
     def get_topics(self):
-        topics = self.schematizer.get_topics_by_criteria(
+        topics = self._get_topics_by_criteria(
             namespace_name=self.namespace_name,
             source_name=self.source_name
         )
@@ -133,17 +185,22 @@ class FixedSchemas(ConsumerSource):
         self.schema_ids = schema_ids
 
     def get_topics(self):
-        topics = {
-            self.schematizer.get_schema_by_id(schema_id).topic.name
-            for schema_id in self.schema_ids
-        }
-        return list(topics)
+        return list(set(self.get_schema_to_topic_map().values()))
 
     def get_schema_to_topic_map(self):
-        schema_to_topic_map = {
-            schema_id: self.schematizer.get_schema_by_id(schema_id).topic.name
-            for schema_id in self.schema_ids
-        }
+        schema_to_topic_map = {}
+        if self.catalog_mirror is not None:
+            self.catalog_mirror.sync()
+            schema_to_topic_map = self.catalog_mirror.get_topic_names_by_schema_ids(
+                self.schema_ids
+            )
+        # The schemas missing from the mirror, such as disabled ones, are
+        # looked up in the Schematizer.
+        for schema_id in self.schema_ids:
+            if schema_id not in schema_to_topic_map:
+                schema_to_topic_map[schema_id] = self.schematizer.get_schema_by_id(
+                    schema_id
+                ).topic.name
         return schema_to_topic_map
 
 
@@ -169,8 +226,7 @@ class NewTopicsOnlyInFixedNamespaces(TopicsInFixedNamespaces):
     it internally keeps track of the previous query timestamp for each
     namespace and only returns the topics created after the last query
     timestamp, including the topics created at the last query timestamp for
-    the namespace. It means the same topics returned previously may be included
-    again if their created_at timestamp is right at previous query timestamp.
+    the namespace, but excluding the topics returned by the last query.
 
     Args:
         namespace_names (tuple(str)): Variable number of namespace names in which all the
@@ -180,19 +236,24 @@ class NewTopicsOnlyInFixedNamespaces(TopicsInFixedNamespaces):
     def __init__(self, *namespace_names):
         super(NewTopicsOnlyInFixedNamespaces, self).__init__(*namespace_names)
         self.last_query_timestamp = {}
+        self._last_query_topic_names = {}
 
     def get_topics(self):
         topic_names = []
         for namespace_name in self.namespace_names:
-            created_after_timestamp = long(time.time())
-            topic_names.extend(
-                topic.name
-                for topic in self.schematizer.get_topics_by_criteria(
-                    namespace_name=namespace_name,
-                    created_after=self.last_query_timestamp.get(namespace_name)
+            new_topic_names, query_topic_names, next_query_timestamp = (
+                self._get_new_topic_names_by_criteria(
+                    created_after=self.last_query_timestamp.get(namespace_name),
+                    returned_topic_names=self._last_query_topic_names.get(
+                        namespace_name,
+                        set()
+                    ),
+                    namespace_name=namespace_name
                 )
             )
-            self.last_query_timestamp[namespace_name] = created_after_timestamp
+            topic_names.extend(new_topic_names)
+            self.last_query_timestamp[namespace_name] = next_query_timestamp
+            self._last_query_topic_names[namespace_name] = query_topic_names
         return topic_names
 
 
@@ -200,9 +261,7 @@ class NewTopicOnlyInSource(TopicInSource):
     """Consumer tails the topics of the specified source, but it internally
     keeps track of the previous query timestamp and only returns the topics
     created after the last query timestamp, including the topics created at the
-    last query timestamp.  It means the same topics returned previously may be
-    included again if their created_at timestamp is right at previous query
-    timestamp.
+    last query timestamp, but excluding the topics returned by the last query.
 
     Args:
         namespace_name (str): Namespace name of the specified source in which
@@ -217,15 +276,18 @@ class NewTopicOnlyInSource(TopicInSource):
             source_name
         )
         self.last_query_timestamp = None
+        self._last_query_topic_names = set()
 
     def get_topics(self):
-        topics = self.schematizer.get_topics_by_criteria(
-            namespace_name=self.namespace_name,
-            source_name=self.source_name,
-            created_after=self.last_query_timestamp
+        new_topic_names, self._last_query_topic_names, self.last_query_timestamp = (
+            self._get_new_topic_names_by_criteria(
+                created_after=self.last_query_timestamp,
+                returned_topic_names=self._last_query_topic_names,
+                namespace_name=self.namespace_name,
+                source_name=self.source_name
+            )
         )
-        self.last_query_timestamp = long(time.time())
-        return [topic.name for topic in topics]
+        return new_topic_names
 
 
 class NewTopicOnlyInDataTarget(TopicInDataTarget):
@@ -21,6 +21,7 @@ import os
 
 import avro.io
 import avro.schema
+import simplejson
 from cached_property import cached_property
 from data_pipeline_avro_util.avro_string_reader import AvroStringReader
 from data_pipeline_avro_util.avro_string_writer import AvroStringWriter
@@ -52,15 +53,34 @@ class Envelope(object):
     # This value was chosen because it is valid ASCII
     ASCII_MAGIC_BYTE = bytes('a')
 
+    # Fields decoded by :func:`unpack_header`, the others are skipped.
+    HEADER_FIELDS = ('uuid', 'message_type', 'schema_id', 'timestamp')
+
     @cached_property
-    def _schema(self):
+    def _schema_json(self):
         # Keeping this as an instance method because of issues with sharing
         # this data across processes.
         schema_path = os.path.join(
             os.path.dirname(__file__),
             'schemas/envelope_v1.avsc'
         )
-        return avro.schema.parse(open(schema_path).read())
+        with open(schema_path) as schema_file:
+            return simplejson.load(schema_file)
+
+    @cached_property
+    def _schema(self):
+        return avro.schema.parse(simplejson.dumps(self._schema_json))
+
+    @cached_property
+    def _header_schema(self):
+        header_schema_json = dict(
+            self._schema_json,
+            fields=[
+                field for field in self._schema_json['fields']
+                if field['name'] in self.HEADER_FIELDS
+            ]
+        )
+        return avro.schema.parse(simplejson.dumps(header_schema_json))
 
     @cached_property
     def _avro_string_writer(self):
@@ -70,6 +90,10 @@ class Envelope(object):
     def _avro_string_reader(self):
         return AvroStringReader(self._schema, self._schema)
 
+    @cached_property
+    def _header_avro_string_reader(self):
+        return AvroStringReader(self._header_schema, self._schema)
+
     def pack(self, message, ascii_encoded=False):
         """Packs a message for transport as described in y/cep342.
 
@@ -114,8 +138,27 @@ class Envelope(object):
             dict: A dictionary with the decoded Avro representation.
         """
 
+        return self._avro_string_reader.decode(
+            self._get_avro_string(packed_message)
+        )
+
+    def unpack_header(self, packed_message):
+        """Decodes the `HEADER_FIELDS` of a message packed with :func:`pack`.
+        The payloads, and meta attributes, are skipped rather than decoded, so
+        this is cheaper than :func:`unpack` when only the header is needed.
+
+        Args:
+            packed_message (bytes): The previously packed message
+
+        Returns:
+            dict: A dictionary with the decoded header fields.
+        """
+        return self._header_avro_string_reader.decode(
+            self._get_avro_string(packed_message)
+        )
+
+    def _get_avro_string(self, packed_message):
         # If the magic byte is ASCII_MAGIC_BYTE, decode it from base64 to ASCII
         if packed_message[0] == self.ASCII_MAGIC_BYTE:
             packed_message = base64.urlsafe_b64decode(packed_message[1:])
-
-        return self._avro_string_reader.decode(packed_message[1:])
+        return packed_message[1:]
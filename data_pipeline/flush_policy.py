@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+from collections import namedtuple
+
+from data_pipeline.config import get_config
+
+
+class FlushPolicy(namedtuple("FlushPolicy", [
+    "topics",
+    "namespaces",
+    "buffer_size",
+    "time_limit_seconds",
+    "priority"
+])):
+    """Describes when the producer flushes the messages of a group of topics.
+
+    Each flush policy passed to :class:`data_pipeline.producer.Producer` gets
+    a buffer (a lane) of its own, which is flushed independently of the other
+    lanes once it holds `buffer_size` messages, or once `time_limit_seconds`
+    have elapsed since it was last flushed.  Topics without a matching policy
+    share a default lane, and the clientlib's internal monitoring messages
+    always use a lane of their own.
+
+    Flushing a lane also flushes every lane with the same or a higher
+    priority, so latency-sensitive messages are never held back behind bulk
+    traffic.  Flushing the lanes with the lowest priority therefore flushes
+    everything, and only then is the position data callback invoked, since
+    position data can only be checkpointed when no message is buffered.
+
+    **Example**::
+
+        Producer(
+            producer_name='replication_handler',
+            team_name='bam',
+            expected_frequency_seconds=ExpectedFrequency.constantly,
+            flush_policies=[
+                # Real-time topics flush small batches quickly
+                FlushPolicy(namespaces=['realtime'], time_limit_seconds=0.01, priority=1),
+                # Backfill topics flush large batches
+                FlushPolicy(topics=[backfill_topic], buffer_size=50000, time_limit_seconds=5),
+            ]
+        )
+
+    Attributes:
+        topics (frozenset[str]): Topics the policy applies to.
+        namespaces (frozenset[str]): Namespaces the policy applies to.  A
+            topic matching both the `topics` of one policy and the `namespaces`
+            of another uses the former.
+        buffer_size (Optional[int]): Maximum number of messages buffered in the
+            lane.  Defaults to `kafka_producer_buffer_size`.
+        time_limit_seconds (Optional[float]): Maximum time in seconds between
+            flushes of the lane.  Defaults to
+            `kafka_producer_flush_time_limit_seconds`.
+        priority (int): Priority of the lane.  The default lane has priority 0.
+    """
+
+    def __new__(
+        cls,
+        topics=None,
+        namespaces=None,
+        buffer_size=None,
+        time_limit_seconds=None,
+        priority=0
+    ):
+        return super(FlushPolicy, cls).__new__(
+            cls,
+            topics=frozenset(topics or []),
+            namespaces=frozenset(namespaces or []),
+            buffer_size=buffer_size,
+            time_limit_seconds=time_limit_seconds,
+            priority=priority
+        )
+
+    @property
+    def effective_buffer_size(self):
+        return self.buffer_size or get_config().kafka_producer_buffer_size
+
+    @property
+    def effective_time_limit_seconds(self):
+        if self.time_limit_seconds is not None:
+            return self.time_limit_seconds
+        return get_config().kafka_producer_flush_time_limit_seconds
@@ -19,6 +19,8 @@ Utility methods for manipulating lists.
 from __future__ import absolute_import
 from __future__ import unicode_literals
 
+import math
+
 
 def unlist(a_list):
     """Convert the (possibly) single item list into a single item"""
@@ -29,3 +31,19 @@ def unlist(a_list):
         return None
     else:
         return a_list[0]
+
+
+def split_into_pool_chunks(a_list, pool_size, min_chunk_size):
+    """Split the list into chunks of at least `min_chunk_size` items to be
+    mapped over a pool of `pool_size` workers.  The items are spread evenly
+    over a few chunks per worker, so that workers stay busy without paying
+    the IPC overhead for tiny chunks.
+    """
+    chunk_size = max(
+        min_chunk_size,
+        int(math.ceil(len(a_list) / float(pool_size * 4)))
+    )
+    return [
+        a_list[i:i + chunk_size]
+        for i in xrange(0, len(a_list), chunk_size)
+    ]
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import threading
+
+
+class _Flight(object):
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """Coalesces the concurrent calls made for the same key, so that only the
+    first one runs, and the others wait for it and share its result (or its
+    exception).  Calls made once it returned run again, so results aren't
+    cached, which is left to the caller.
+
+    It's meant to guard cache misses, for instance when all the threads of a
+    consumer see a new schema at the same time, so a single request is made
+    for it instead of one per thread.
+
+    **Example**::
+
+        single_flight = SingleFlight()
+
+        def get_schema(schema_id):
+            schema = cache.get(schema_id)
+            if schema is None:
+                schema = single_flight.do(schema_id, fetch_schema, schema_id)
+            return schema
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key_to_flight = {}
+
+    def do(self, key, func, *args, **kwargs):
+        """Calls `func(*args, **kwargs)` unless a call for `key` is already
+        running, in which case its result is returned once it's done.
+        """
+        with self._lock:
+            flight = self._key_to_flight.get(key)
+            is_leader = flight is None
+            if is_leader:
+                flight = _Flight()
+                self._key_to_flight[key] = flight
+
+        if not is_leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = func(*args, **kwargs)
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._key_to_flight[key]
+            flight.done.set()
+        return flight.result
@@ -16,13 +16,78 @@
 from __future__ import absolute_import
 from __future__ import unicode_literals
 
+import threading
+from collections import OrderedDict
+from multiprocessing.util import register_after_fork
+
 from data_pipeline_avro_util.avro_string_reader import AvroStringReader
 from data_pipeline_avro_util.avro_string_writer import AvroStringWriter
 
+from data_pipeline.config import get_config
+from data_pipeline.helpers.single_flight import SingleFlight
 from data_pipeline.helpers.singleton import Singleton
 from data_pipeline.schematizer_clientlib.schematizer import get_schematizer
 
 
+logger = get_config().logger
+
+
+class _AvroStringCache(object):
+    """Cache of the writers, or of the readers, of :class:`_AvroStringStore`,
+    from which the least recently used ones are evicted beyond
+    `avro_string_store_cache_max_size` entries.
+
+    Recency is approximated the way the CLOCK algorithm does: a hit only
+    marks the entry as used, and a used entry is given a second chance
+    instead of being evicted, so that hits, which happen for every message
+    encoded or decoded, don't reorder the cache or take its lock.
+
+    The number of lookups answered from the cache, of those which weren't,
+    and of the evicted entries are counted in `hit_count`, `miss_count` and
+    `eviction_count`.  The hits and misses aren't counted under the lock, so
+    the counts of concurrent lookups are approximate.
+    """
+
+    def __init__(self):
+        self._key_to_value = OrderedDict()
+        self._used_keys = set()
+        self._lock = threading.Lock()
+        self.hit_count = 0
+        self.miss_count = 0
+        self.eviction_count = 0
+
+    def get(self, key):
+        value = self._key_to_value.get(key)
+        if value is None:
+            self.miss_count += 1
+        else:
+            self.hit_count += 1
+            self._used_keys.add(key)
+        return value
+
+    def set(self, key, value):
+        max_size = max(get_config().avro_string_store_cache_max_size, 1)
+        with self._lock:
+            self._key_to_value[key] = value
+            while len(self._key_to_value) > max_size:
+                self._evict_one()
+
+    def _evict_one(self):
+        while True:
+            key, value = self._key_to_value.popitem(last=False)
+            if key not in self._used_keys:
+                self.eviction_count += 1
+                return
+            self._used_keys.discard(key)
+            self._key_to_value[key] = value
+
+    def __contains__(self, key):
+        return key in self._key_to_value
+
+    def __len__(self):
+        return len(self._key_to_value)
+
+
 class _AvroStringStore(object):
     """Singleton instance of store that caches
     AvroStringsWriter and AvroStringReader objects perticularly
@@ -31,12 +96,63 @@ class _AvroStringStore(object):
     This class was added for performance enhancements
     w store : pb/199453
     w/o store : pb/199448
+
+    Threads missing the same writer or reader concurrently wait for the
+    first one to create it, rather than all fetching the schemas and
+    parsing them.
+
+    The writers and the readers are each bounded, see
+    :class:`_AvroStringCache`, so that consumers of schemas evolving often
+    don't keep every schema version they ever saw parsed.
+
+    Processes forked by multiprocessing inherit the writers and readers
+    created before the fork, see :meth:`preload` and :func:`preload_schemas`.
     """
     __metaclass__ = Singleton
 
     def __init__(self):
-        self._writer_cache = {}
-        self._reader_cache = {}
+        self._writer_cache = _AvroStringCache()
+        self._reader_cache = _AvroStringCache()
+        self._single_flight = SingleFlight()
+        register_after_fork(self, _AvroStringStore._reset_after_fork)
+
+    def _reset_after_fork(self):
+        # The threads of the parent don't exist in the child, so neither do
+        # the locks they held, or the flights they were running.
+        self._writer_cache._lock = threading.Lock()
+        self._reader_cache._lock = threading.Lock()
+        self._single_flight = SingleFlight()
+
+    def preload(self, schema_ids=(), reader_and_writer_schema_ids=()):
+        """Creates the writers of `schema_ids` and the readers of
+        `reader_and_writer_schema_ids` ahead of their use.  Preloading is
+        best effort, any writer or reader that can't be created now will be
+        created, or fail, when it's used.
+
+        Args:
+            schema_ids (iterable[int]): ids of the schemas whose writers are
+                created.
+            reader_and_writer_schema_ids (iterable[(int, int)]): (reader
+                schema id, writer schema id) pairs whose readers are created.
+        """
+        for schema_id in schema_ids:
+            try:
+                self.get_writer(schema_id)
+            except Exception:
+                logger.warning(
+                    "Failed to preload the avro writer for schema {0}".format(schema_id)
+                )
+        for reader_schema_id, writer_schema_id in reader_and_writer_schema_ids:
+            try:
+                self.get_reader(
+                    reader_id_key=reader_schema_id,
+                    writer_id_key=writer_schema_id
+                )
+            except Exception:
+                logger.warning(
+                    "Failed to preload the avro reader for schema {0} with reader "
+                    "schema {1}".format(writer_schema_id, reader_schema_id)
+                )
 
     @property
     def _schematizer(self):
@@ -53,9 +169,17 @@ class _AvroStringStore(object):
         if avro_string_writer:
             return avro_string_writer
 
+        return self._single_flight.do(
+            ('writer', key),
+            self._create_writer,
+            id_key,
+            avro_schema
+        )
+
+    def _create_writer(self, id_key, avro_schema):
         avro_schema = avro_schema or self._get_avro_schema(id_key)
         avro_string_writer = AvroStringWriter(schema=avro_schema)
-        self._writer_cache[key] = avro_string_writer
+        self._writer_cache.set(id_key, avro_string_writer)
         return avro_string_writer
 
     def get_reader(
@@ -70,6 +194,22 @@ class _AvroStringStore(object):
         if avro_string_reader:
             return avro_string_reader
 
+        return self._single_flight.do(
+            ('reader', key),
+            self._create_reader,
+            reader_id_key,
+            writer_id_key,
+            reader_avro_schema,
+            writer_avro_schema
+        )
+
+    def _create_reader(
+        self,
+        reader_id_key,
+        writer_id_key,
+        reader_avro_schema,
+        writer_avro_schema
+    ):
         reader_schema = (
             reader_avro_schema or self._get_avro_schema(reader_id_key)
         )
@@ -80,5 +220,57 @@ class _AvroStringStore(object):
             reader_schema=reader_schema,
             writer_schema=writer_schema
         )
-        self._reader_cache[key] = avro_string_reader
+        self._reader_cache.set(
+            (reader_id_key, writer_id_key),
+            avro_string_reader
+        )
         return avro_string_reader
+
+
+def preload_schemas(
+    schema_ids=(),
+    reader_and_writer_schema_ids=(),
+    save_cache_snapshot=True
+):
+    """Loads schemas, and creates their avro writers and readers, in the
+    caches of the process.
+
+    It's meant to be called before forking worker processes, which then
+    inherit the caches copy-on-write instead of each requesting the schemas
+    and parsing them again.  When
+    :meth:`data_pipeline.config.Config.schematizer_client_cache_snapshot_path`
+    is set, the schematizer client cache is saved there as well, for the
+    processes started later on the host to load.
+
+    Preloading is best effort, any schema that can't be loaded now will be
+    loaded, or fail, when it's used.
+
+    Args:
+        schema_ids (iterable[int]): ids of the schemas whose avro writers are
+            created.
+        reader_and_writer_schema_ids (iterable[(int, int)]): (reader schema
+            id, writer schema id) pairs whose avro readers are created.
+        save_cache_snapshot (Optional[bool]): whether the schematizer client
+            cache is saved to the configured snapshot path.  Default to True.
+    """
+    schema_ids = set(schema_ids)
+    reader_and_writer_schema_ids = set(reader_and_writer_schema_ids)
+    all_schema_ids = schema_ids.union(
+        schema_id for schema_id_pair in reader_and_writer_schema_ids
+        for schema_id in schema_id_pair
+    )
+    try:
+        get_schematizer().get_schemas_by_ids(all_schema_ids)
+    except Exception:
+        logger.warning(
+            "Failed to preload the schemas {0}".format(sorted(all_schema_ids))
+        )
+    _AvroStringStore().preload(schema_ids, reader_and_writer_schema_ids)
+    snapshot_path = get_config().schematizer_client_cache_snapshot_path
+    if save_cache_snapshot and snapshot_path is not None:
+        try:
+            get_schematizer().save_cache_snapshot(snapshot_path)
+        except Exception:
+            logger.warning(
+                "Failed to save the schematizer cache to {0}".format(snapshot_path)
+            )
@@ -44,12 +44,47 @@ KafkaPositionInfo = namedtuple('KafkaPositionInfo', [
 ])
 
 
+class RawMessage(namedtuple('RawMessage', [
+    'topic',                # Topic the message was from
+    'partition',            # Partition of the topic the message was from
+    'offset',               # Offset of the message in the topic
+    'key',                  # Key of the message, may be `None`
+    'packed_message',       # Packed envelope of the message, as published
+    'header'                # Unpacked envelope header, may be `None`
+])):
+    """Message whose envelope isn't unpacked, returned by
+    :meth:`data_pipeline.consumer.Consumer.get_raw_messages` for consumers
+    which pass the messages through, and only need their position.
+
+    The `header` is only unpacked when requested, see
+    :meth:`data_pipeline.envelope.Envelope.unpack_header`.  Raw messages can
+    be committed with :meth:`data_pipeline.consumer.Consumer.commit_messages`.
+    """
+    __slots__ = ()
+
+    @property
+    def kafka_position_info(self):
+        return KafkaPositionInfo(
+            offset=self.offset,
+            partition=self.partition,
+            key=self.key
+        )
+
+
 PayloadFieldDiff = namedtuple('PayloadFieldDiff', [
     'old_value',            # Value of the field before update
     'current_value'         # Value of the field after update
 ])
 
 
+_PackState = namedtuple('_PackState', [
+    'message_class',        # Message subclass to restore
+    'schema_id',            # Schema id of the payloads
+    'payloads',             # (payload, payload_data) tuple of each payload
+    'metadata'              # (topic, uuid, timestamp, meta, dry_run) tuple
+])
+
+
 class MissingMetaAttributeException(Exception):
     def __init__(self, schema_id, meta_ids, mandatory_meta_ids):
         Exception.__init__(
@@ -565,6 +600,49 @@ class Message(object):
         """
         self._avro_payload.reload_data()
 
+    def _get_pack_state(self):
+        """Returns a compact, picklable representation of the message that
+        holds only what's needed to pack it.  It's much cheaper to ship to
+        another process than the message itself.  Use
+        :func:`_create_from_pack_state` to restore the message.
+        """
+        return _PackState(
+            message_class=type(self),
+            schema_id=self.schema_id,
+            payloads=self._raw_payloads,
+            metadata=(self.topic, self.uuid, self.timestamp, self._meta, self.dry_run)
+        )
+
+    @property
+    def _raw_payloads(self):
+        return (self._avro_payload.raw_payload_and_payload_data,)
+
+    @property
+    def _avro_payloads(self):
+        return (self._avro_payload,)
+
+    def _restore_pack_state(self, pack_state):
+        # The message was validated when it was originally created, so the
+        # validation (and the schematizer calls it requires) is skipped here.
+        topic, uuid, timestamp, meta, dry_run = pack_state.metadata
+        payload, payload_data = pack_state.payloads[0]
+        self._avro_payload = _AvroPayload(
+            schema_id=pack_state.schema_id,
+            payload=payload,
+            payload_data=payload_data,
+            dry_run=dry_run
+        )
+        self._topic = topic
+        self._uuid = uuid
+        self._timestamp = timestamp
+        self._upstream_position_info = None
+        self._kafka_position_info = None
+        self._keys = None
+        self._meta = meta
+        self._should_be_encrypted_state = None
+        self._encryption_type = None
+        self._contains_pii = None
+
     @property
     def _str_repr(self):
         cleaned_payload_data = self.payload_data
@@ -775,6 +853,28 @@ class UpdateMessage(Message):
         super(UpdateMessage, self).reload_data()
         self._previous_avro_payload.reload_data()
 
+    @property
+    def _raw_payloads(self):
+        return super(UpdateMessage, self)._raw_payloads + (
+            self._previous_avro_payload.raw_payload_and_payload_data,
+        )
+
+    @property
+    def _avro_payloads(self):
+        return super(UpdateMessage, self)._avro_payloads + (
+            self._previous_avro_payload,
+        )
+
+    def _restore_pack_state(self, pack_state):
+        super(UpdateMessage, self)._restore_pack_state(pack_state)
+        previous_payload, previous_payload_data = pack_state.payloads[1]
+        self._previous_avro_payload = _AvroPayload(
+            schema_id=pack_state.schema_id,
+            payload=previous_payload,
+            payload_data=previous_payload_data,
+            dry_run=self.dry_run
+        )
+
     def _has_field_changed(self, field):
         return self.payload_data[field] != self.previous_payload_data[field]
 
@@ -812,6 +912,16 @@ _message_type_to_class_map = {
 }
 
 
+def _create_from_pack_state(pack_state):
+    """Restores a message from the compact representation returned by
+    :meth:`Message._get_pack_state`.  The restored message can be packed,
+    but doesn't carry any position info.
+    """
+    message = pack_state.message_class.__new__(pack_state.message_class)
+    message._restore_pack_state(pack_state)
+    return message
+
+
 def create_from_kafka_message(
     kafka_message,
     envelope=None,
@@ -854,6 +964,40 @@ def create_from_kafka_message(
     )
 
 
+def create_raw_from_kafka_message(
+    kafka_message,
+    envelope=None,
+    unpack_header=False
+):
+    """ Build a data_pipeline.message.RawMessage from a yelp_kafka message,
+    without unpacking its envelope.
+
+    Args:
+        kafka_message (kafka.common.KafkaMessage): The message info which
+            has the topic, partition, offset, key, and value(payload) of
+            the received message.
+        envelope (Optional[:class:data_pipeline.envelope.Envelope]): Envelope
+            instance that unpacks the header of the message.
+        unpack_header (Optional[boolean]): If this is set to `True` then the
+            header of the envelope is unpacked into the `header` of the raw
+            message.  Defaults to False.
+
+    Returns (data_pipeline.message.RawMessage):
+        The raw message object
+    """
+    header = None
+    if unpack_header:
+        header = (envelope or Envelope()).unpack_header(kafka_message.value)
+    return RawMessage(
+        topic=kafka_message.topic,
+        partition=kafka_message.partition,
+        offset=kafka_message.offset,
+        key=kafka_message.key,
+        packed_message=kafka_message.value,
+        header=header
+    )
+
+
 def create_from_offset_and_message(
     offset_and_message,
     force_payload_decoding=True,
@@ -56,7 +56,9 @@ class Producer(Client):
         and didn't provide a concrete performance benefit (see
         pb/150070 for benchmark results).  If we ever want to
         revive that producer, a SHA containing the producer just before its removal
-        has been tagged as before-async-producer-removal.
+        has been tagged as before-async-producer-removal.  The current
+        :class:`data_pipeline.async_producer.AsyncProducer` is unrelated, it
+        wraps this producer to return futures instead of blocking.
 
     **Examples**:
 
@@ -77,11 +79,12 @@ class Producer(Client):
                   producer.flush()
                   upstream.all_those_messages_were published()
 
-      The Producer is incapable of flushing its own buffers, which can be
-      problematic if messages aren't published relatively constantly.  The
-      :meth:`wake` should be called periodically to allow the Producer to clear
-      its buffer if necessary, in the absence of messages.  If :meth:`wake`
-      isn't called, messages in the buffer could be delayed indefinitely::
+      By default, the Producer is incapable of flushing its own buffers, which
+      can be problematic if messages aren't published relatively constantly.
+      The :meth:`wake` should be called periodically to allow the Producer to
+      clear its buffer if necessary, in the absence of messages.  If
+      :meth:`wake` isn't called, messages in the buffer could be delayed
+      indefinitely::
 
           with Producer() as producer:
               while True:
@@ -91,6 +94,13 @@ class Producer(Client):
                   except Empty:
                       producer.wake()
 
+      Alternatively, the Producer can be asked to flush its own buffers from a
+      background thread, in which case :meth:`wake` never needs to be called::
+
+          with Producer(auto_flush=True) as producer:
+              while True:
+                  producer.publish(slow_queue.get())
+
     Args:
       producer_name (str): See parameter `client_name` in
         :class:`data_pipeline.client.Client`.
@@ -110,6 +120,24 @@ class Producer(Client):
         to kafka. Default is false.
       monitoring_enabled (Optional[bool]): If true, monitoring will be enabled
         to record client's activities. Default is true.
+      schema_id_list (Optional[list[int]]): Ids of the schemas the producer
+        is expected to publish with.  They're registered with the registrar,
+        and when `use_work_pool` is true the work pool is pre-warmed with
+        them.
+      auto_flush (Optional[bool]): If true, a background thread flushes
+        buffered messages once they have waited
+        `kafka_producer_flush_time_limit_seconds`, so :meth:`wake` doesn't need
+        to be called.  The `position_data_callback` is then invoked either on
+        the thread calling into the producer or on the background thread, but
+        never concurrently.  If a background flush fails, the error is raised
+        from the next call to :meth:`publish`, :meth:`flush`, :meth:`wake`, or
+        :meth:`close`, after which the background flushes resume.  The message
+        passed to :meth:`publish` is buffered nonetheless, and :meth:`close`
+        releases the connections to kafka regardless.  Default is false.
+      flush_policies (Optional[list[data_pipeline.flush_policy.FlushPolicy]]):
+        Per-topic or per-namespace buffer sizes, time limits and priorities.
+        The topics of each policy are buffered and flushed independently of
+        the other topics.  See :class:`data_pipeline.flush_policy.FlushPolicy`.
     """
 
     def __init__(
@@ -121,7 +149,9 @@ class Producer(Client):
         dry_run=False,
         position_data_callback=None,
         monitoring_enabled=True,
-        schema_id_list=None
+        schema_id_list=None,
+        auto_flush=False,
+        flush_policies=None
     ):
         super(Producer, self).__init__(
             producer_name,
@@ -133,8 +163,11 @@ class Producer(Client):
         self.use_work_pool = use_work_pool
         self.dry_run = dry_run
         self.position_data_callback = position_data_callback
+        self.auto_flush = auto_flush
+        self.flush_policies = flush_policies
         if schema_id_list is None:
             schema_id_list = []
+        self.schema_id_list = schema_id_list
         # Send initial producer registration messages
         self.registrar.register_tracked_schema_ids(schema_id_list)
 
@@ -150,12 +183,17 @@ class Producer(Client):
         if self.use_work_pool:
             return PooledKafkaProducer(
                 self._set_kafka_producer_position,
-                dry_run=self.dry_run
+                dry_run=self.dry_run,
+                auto_flush=self.auto_flush,
+                flush_policies=self.flush_policies,
+                schema_id_list=self.schema_id_list
             )
         else:
             return LoggingKafkaProducer(
                 self._set_kafka_producer_position,
-                dry_run=self.dry_run
+                dry_run=self.dry_run,
+                auto_flush=self.auto_flush,
+                flush_policies=self.flush_policies
             )
 
     @property
@@ -452,10 +490,11 @@ class Producer(Client):
         return self.position_data
 
     def wake(self):
-        """The synchronous producer has no mechanism to flush messages on its
-        own, in the absence of other messages being published.  Consequently,
-        if there are gaps where messages aren't published, this method should
-        be called to allow the producer to flush its buffers if it needs to.
+        """Unless `auto_flush` is enabled, the producer has no mechanism to
+        flush messages on its own, in the absence of other messages being
+        published.  Consequently, if there are gaps where messages aren't
+        published, this method should be called to allow the producer to flush
+        its buffers if it needs to.
 
         If messages aren't published at least every 250ms, this method should
         be called about that often, to ensure that messages don't sit in the
@@ -0,0 +1,462 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import multiprocessing
+import time
+import traceback
+from collections import deque
+from collections import namedtuple
+from Queue import Empty
+from Queue import Full
+
+from data_pipeline._position_data_tracker import PositionDataTracker
+from data_pipeline.config import get_config
+from data_pipeline.helpers.yelp_avro_store import preload_schemas
+from data_pipeline.producer import Producer
+
+
+logger = get_config().logger
+
+
+_PublishBatch = namedtuple('_PublishBatch', ['seqs_and_messages'])
+_Flush = namedtuple('_Flush', [])
+_Close = namedtuple('_Close', [])
+
+_WorkerPosition = namedtuple(
+    '_WorkerPosition',
+    ['worker_index', 'published_seq', 'position_data']
+)
+_WorkerFlushed = namedtuple('_WorkerFlushed', ['worker_index'])
+_WorkerError = namedtuple('_WorkerError', ['worker_index', 'formatted_traceback'])
+
+
+class ProducerGroupWorkerError(Exception):
+    def __init__(self, worker_index, formatted_traceback):
+        Exception.__init__(
+            self,
+            "ProducerGroup worker {0} failed:\n{1}".format(
+                worker_index,
+                formatted_traceback
+            )
+        )
+        self.worker_index = worker_index
+
+
+# The worker needs to be in the module top level so it can be serialized for
+# multiprocessing
+def _run_producer_worker(worker_index, producer_kwargs, command_queue, result_queue):
+    # Every message handed to the worker's producer before a flush is
+    # published by that flush, so the last sequence number received is also
+    # the last one published when the position callback fires.
+    state = {'last_seq': -1}
+
+    def position_data_callback(position_data):
+        result_queue.put(_WorkerPosition(
+            worker_index=worker_index,
+            published_seq=state['last_seq'],
+            position_data=position_data
+        ))
+
+    try:
+        with Producer(
+            position_data_callback=position_data_callback,
+            **producer_kwargs
+        ) as producer:
+            wake_interval = get_config().kafka_producer_flush_time_limit_seconds
+            while True:
+                try:
+                    command = command_queue.get(timeout=wake_interval)
+                except Empty:
+                    producer.wake()
+                    continue
+
+                if isinstance(command, _PublishBatch):
+                    for seq, message in command.seqs_and_messages:
+                        state['last_seq'] = seq
+                        producer.publish(message)
+                elif isinstance(command, _Flush):
+                    producer.flush()
+                    result_queue.put(_WorkerFlushed(worker_index=worker_index))
+                elif isinstance(command, _Close):
+                    break
+    except Exception:
+        result_queue.put(_WorkerError(
+            worker_index=worker_index,
+            formatted_traceback=traceback.format_exc()
+        ))
+
+
+class _GroupPositionTracker(object):
+    """Merges the position data reported by each worker of a
+    :class:`ProducerGroup` into one coherent checkpoint.
+
+    Every published message is assigned an increasing sequence number.  A
+    message is only reflected in the checkpoint once it and every message
+    handed to the group before it have been published, regardless of which
+    worker they were sharded to.  Kafka offsets are rolled back accordingly,
+    so the checkpoint never refers to messages beyond that point.
+    """
+
+    def __init__(self, worker_count):
+        self.next_seq = 0
+        self.position_data_tracker = PositionDataTracker()
+        self._pending = deque()
+        self._worker_outstanding_seqs = [deque() for _ in range(worker_count)]
+        self._worker_published_seq = [-1] * worker_count
+        self._topic_to_worker_kafka_offset = {}
+        self._topic_to_worker_index = {}
+
+    def record_message_dispatched(self, message, worker_index):
+        seq = self.next_seq
+        self.next_seq += 1
+        self._pending.append((seq, message))
+        self._worker_outstanding_seqs[worker_index].append(seq)
+        self._topic_to_worker_index[message.topic] = worker_index
+        return seq
+
+    def record_worker_position(self, worker_index, published_seq, position_data):
+        """Returns True if the checkpoint moved forward."""
+        outstanding_seqs = self._worker_outstanding_seqs[worker_index]
+        while outstanding_seqs and outstanding_seqs[0] <= published_seq:
+            outstanding_seqs.popleft()
+        self._worker_published_seq[worker_index] = max(
+            published_seq,
+            self._worker_published_seq[worker_index]
+        )
+        self._topic_to_worker_kafka_offset.update(
+            position_data.topic_to_kafka_offset_map
+        )
+        return self._advance()
+
+    def get_position_data(self):
+        return self.position_data_tracker.get_position_data()
+
+    def _advance(self):
+        low_watermark = self._get_low_watermark()
+        advanced = False
+        while self._pending and self._pending[0][0] <= low_watermark:
+            _, message = self._pending.popleft()
+            self.position_data_tracker.record_message(message)
+            advanced = True
+        self._update_kafka_offsets()
+        return advanced
+
+    def _get_low_watermark(self):
+        return min(
+            [seqs[0] - 1 for seqs in self._worker_outstanding_seqs if seqs] or
+            [self.next_seq - 1]
+        )
+
+    def _update_kafka_offsets(self):
+        # Workers report offsets covering everything they've published, which
+        # may include messages past the low watermark.  Those are subtracted
+        # so that offsets and upstream position info describe the same point.
+        published_past_watermark_counts = {}
+        for seq, message in self._pending:
+            worker_index = self._topic_to_worker_index[message.topic]
+            if seq <= self._worker_published_seq[worker_index]:
+                published_past_watermark_counts[message.topic] = (
+                    published_past_watermark_counts.get(message.topic, 0) + 1
+                )
+        for topic, offset in self._topic_to_worker_kafka_offset.iteritems():
+            self.position_data_tracker.update_high_watermark(
+                topic=topic,
+                offset=offset,
+                message_count=-published_past_watermark_counts.get(topic, 0)
+            )
+
+
+class ProducerGroup(object):
+    """ProducerGroup runs a number of :class:`data_pipeline.producer.Producer`
+    worker processes, so that envelope assembly, serialization, and publishing
+    can use more than a single core.
+
+    Messages are sharded by topic, and every topic is always handled by the
+    same worker, which preserves the ordering of messages within a topic.
+    Messages are not ordered across topics.  Sharding by key isn't supported,
+    since every message of a topic is published into the same partition, and
+    the exactly-once recovery of
+    :meth:`data_pipeline.producer.Producer.ensure_messages_published` relies on
+    a single writer per topic.
+
+    The position data reported by the workers is merged into one checkpoint
+    (see :class:`data_pipeline.position_data.PositionData`) which only
+    advances once a message, and every message published before it, have been
+    published into Kafka.  The checkpoint can be persisted and used for
+    recovery exactly like the checkpoint of a single producer.
+
+    **Example**::
+
+        with ProducerGroup(
+            producer_name='replication_handler',
+            team_name='bam',
+            expected_frequency_seconds=ExpectedFrequency.constantly,
+            worker_count=8
+        ) as producer_group:
+            for message in upstream.get_messages():
+                producer_group.publish(message)
+            producer_group.flush()
+            save(producer_group.get_checkpoint_position_data())
+
+    Note:
+        Messages are pickled to reach the workers, so the same restrictions as
+        :class:`data_pipeline._pooled_kafka_producer.PooledKafkaProducer`
+        apply.  The `position_data_callback` is invoked in the calling
+        process, from within :meth:`publish`, :meth:`wake`, :meth:`flush`, and
+        :meth:`close`.
+
+    Args:
+        producer_name (str): See parameter `producer_name` in
+            :class:`data_pipeline.producer.Producer`.
+        team_name (str): See parameter `team_name` in
+            :class:`data_pipeline.producer.Producer`.
+        expected_frequency_seconds (int, ExpectedFrequency): See parameter
+            `expected_frequency_seconds` in
+            :class:`data_pipeline.producer.Producer`.
+        worker_count (Optional[int]): Number of producer worker processes.
+            Default is the number of cpus.
+        position_data_callback (Optional[function]): If provided, the function
+            will be called with the merged :class:`PositionData` whenever the
+            checkpoint moves forward.
+        dry_run (Optional[bool]): See parameter `dry_run` in
+            :class:`data_pipeline.producer.Producer`.
+        monitoring_enabled (Optional[bool]): See parameter `monitoring_enabled`
+            in :class:`data_pipeline.producer.Producer`.
+        schema_id_list (Optional[list[int]]): See parameter `schema_id_list`
+            in :class:`data_pipeline.producer.Producer`.
+    """
+
+    # Number of messages sent to a worker in one batch, to amortize the cost
+    # of inter-process communication.
+    DISPATCH_BATCH_SIZE = 100
+
+    # Maximum number of batches waiting in each worker's queue before
+    # :meth:`publish` blocks.
+    MAX_QUEUED_BATCHES = 100
+
+    def __init__(
+        self,
+        producer_name,
+        team_name,
+        expected_frequency_seconds,
+        worker_count=None,
+        position_data_callback=None,
+        dry_run=False,
+        monitoring_enabled=True,
+        schema_id_list=None
+    ):
+        self.worker_count = worker_count or multiprocessing.cpu_count()
+        self.position_data_callback = position_data_callback
+        self._producer_kwargs = dict(
+            producer_name=producer_name,
+            team_name=team_name,
+            expected_frequency_seconds=expected_frequency_seconds,
+            dry_run=dry_run,
+            monitoring_enabled=monitoring_enabled,
+            schema_id_list=schema_id_list
+        )
+        self._position_tracker = _GroupPositionTracker(self.worker_count)
+        self._topic_to_worker_index = {}
+        self._batches = [[] for _ in range(self.worker_count)]
+        self._batch_start_time = time.time()
+        self._result_queue = multiprocessing.Queue()
+        self._command_queues = []
+        self._workers = []
+        self.running = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        logger.info("Closing producer group...")
+        try:
+            self.close()
+            logger.info("Producer group closed")
+        except:
+            logger.exception("Failed to close the ProducerGroup.")
+            self._terminate_workers()
+            if exc_type is None:
+                raise
+        return False
+
+    def start(self):
+        """Starts the worker processes.  Normally this should NOT be called
+        directly, rather the ProducerGroup should be used as a context manager.
+        """
+        # Preloading the schemas before the workers fork lets them inherit
+        # the schemas and avro writers, rather than each requesting them.
+        preload_schemas(self._producer_kwargs['schema_id_list'] or [])
+        for worker_index in range(self.worker_count):
+            command_queue = multiprocessing.Queue(maxsize=self.MAX_QUEUED_BATCHES)
+            worker = multiprocessing.Process(
+                target=_run_producer_worker,
+                args=(
+                    worker_index,
+                    self._producer_kwargs,
+                    command_queue,
+                    self._result_queue
+                ),
+                name='data_pipeline_producer_group_worker_{0}'.format(worker_index)
+            )
+            worker.daemon = True
+            worker.start()
+            self._command_queues.append(command_queue)
+            self._workers.append(worker)
+        self.running = True
+
+    def publish(self, message):
+        """Hands the message to the worker responsible for its topic.  See
+        :meth:`data_pipeline.producer.Producer.publish`.
+        """
+        worker_index = self._get_worker_index(message.topic)
+        seq = self._position_tracker.record_message_dispatched(message, worker_index)
+        batch = self._batches[worker_index]
+        batch.append((seq, message))
+        if len(batch) >= self.DISPATCH_BATCH_SIZE:
+            self._send_batch(worker_index)
+        self._send_batches_if_necessary()
+        self._process_results(block_until_flushed=False)
+
+    def wake(self):
+        """See :meth:`data_pipeline.producer.Producer.wake`.  The workers wake
+        themselves, so this is only needed to hand over messages still waiting
+        to be batched and to receive position updates.
+        """
+        self._send_batches_if_necessary()
+        self._process_results(block_until_flushed=False)
+
+    def flush(self):
+        """Block until all messages handed to the group have been successfully
+        published into Kafka.
+        """
+        self._send_all_batches()
+        for worker_index in range(self.worker_count):
+            self._put_command(worker_index, _Flush())
+        self._process_results(block_until_flushed=True)
+
+    def close(self):
+        """Flushes all buffered messages and stops the worker processes."""
+        if not self.running:
+            return
+        self.flush()
+        for worker_index in range(self.worker_count):
+            self._put_command(worker_index, _Close())
+        for worker in self._workers:
+            worker.join()
+        self._process_results(block_until_flushed=False)
+        self.running = False
+
+    def get_checkpoint_position_data(self):
+        """
+        returns:
+            PositionData: merged `PositionData` of all the workers.  See
+                :meth:`data_pipeline.producer.Producer.get_checkpoint_position_data`.
+        """
+        return self._position_tracker.get_position_data()
+
+    def _get_worker_index(self, topic):
+        worker_index = self._topic_to_worker_index.get(topic)
+        if worker_index is None:
+            worker_index = len(self._topic_to_worker_index) % self.worker_count
+            self._topic_to_worker_index[topic] = worker_index
+        return worker_index
+
+    def _send_batch(self, worker_index):
+        batch = self._batches[worker_index]
+        if batch:
+            self._put_command(worker_index, _PublishBatch(batch))
+            self._batches[worker_index] = []
+
+    def _put_command(self, worker_index, command):
+        # A worker which failed stops draining its queue, so rather than
+        # blocking on its full queue forever, the worker is checked on while
+        # waiting, the same way results are waited for.
+        while True:
+            try:
+                self._command_queues[worker_index].put(command, timeout=1)
+                return
+            except Full:
+                self._raise_if_worker_exited(worker_index)
+
+    def _send_all_batches(self):
+        for worker_index in range(self.worker_count):
+            self._send_batch(worker_index)
+        self._batch_start_time = time.time()
+
+    def _send_batches_if_necessary(self):
+        time_limit = get_config().kafka_producer_flush_time_limit_seconds
+        if time.time() - self._batch_start_time >= time_limit:
+            self._send_all_batches()
+
+    def _process_results(self, block_until_flushed):
+        flushed_workers = set()
+        while True:
+            if block_until_flushed and len(flushed_workers) < self.worker_count:
+                result = self._get_result_blocking()
+            else:
+                try:
+                    result = self._result_queue.get_nowait()
+                except Empty:
+                    return
+
+            if isinstance(result, _WorkerPosition):
+                self._handle_worker_position(result)
+            elif isinstance(result, _WorkerFlushed):
+                flushed_workers.add(result.worker_index)
+            elif isinstance(result, _WorkerError):
+                raise ProducerGroupWorkerError(
+                    result.worker_index,
+                    result.formatted_traceback
+                )
+
+    def _get_result_blocking(self):
+        while True:
+            try:
+                return self._result_queue.get(timeout=1)
+            except Empty:
+                for worker_index in range(self.worker_count):
+                    self._raise_if_worker_exited(worker_index)
+
+    def _raise_if_worker_exited(self, worker_index):
+        worker = self._workers[worker_index]
+        if worker.is_alive():
+            return
+        # A worker which failed reports its error before exiting, which is
+        # raised in preference to its exit code.
+        self._process_results(block_until_flushed=False)
+        raise ProducerGroupWorkerError(
+            worker_index,
+            "Worker exited with code {0}".format(worker.exitcode)
+        )
+
+    def _handle_worker_position(self, worker_position):
+        advanced = self._position_tracker.record_worker_position(
+            worker_position.worker_index,
+            worker_position.published_seq,
+            worker_position.position_data
+        )
+        if advanced and self.position_data_callback:
+            self.position_data_callback(self.get_checkpoint_position_data())
+
+    def _terminate_workers(self):
+        for worker in self._workers:
+            if worker.is_alive():
+                worker.terminate()
+            worker.join()
+        self.running = False
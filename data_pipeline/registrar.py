@@ -69,6 +69,7 @@ class Registrar(object):
         self.expected_frequency_seconds = expected_frequency_seconds
         self.clog_writer = ClogWriter()
         self.current_thread = None
+        self._registration_thread = None
 
     def publish_registration_messages(self):
         """
@@ -84,7 +85,9 @@ class Registrar(object):
         """
         registration_messages = [
             self._create_registration_message(schema_id, timestamp)
-            for schema_id, timestamp in self.schema_to_last_seen_time_map.iteritems()
+            # The map is copied, as the timer thread publishes the messages
+            # while the client updates it.
+            for schema_id, timestamp in self.schema_to_last_seen_time_map.items()
         ]
         return registration_messages
 
@@ -130,16 +133,38 @@ class Registrar(object):
             schema_string = f.read()
         return simplejson.loads(schema_string)
 
-    def register_tracked_schema_ids(self, schema_id_list):
+    def register_tracked_schema_ids(self, schema_id_list, blocking=True):
         """This function is used to specify the list of avro schema IDs that this Client
             will use. When called it, it will immediately publish registration messages.
 
         Args:
             schema_id_list (list[int]): List of the schema IDs that the client will use.
+            blocking (Optional[bool]): If false, the registration messages are
+                published from a background thread, and failing to publish them
+                is only logged.  Default is true.
         """
         for schema_id in schema_id_list:
             self.schema_to_last_seen_time_map[schema_id] = None
-        self.publish_registration_messages()
+        if blocking:
+            self.publish_registration_messages()
+        else:
+            self._join_registration_thread()
+            self._registration_thread = threading.Thread(
+                target=self._publish_registration_messages_in_background
+            )
+            self._registration_thread.daemon = True
+            self._registration_thread.start()
+
+    def _publish_registration_messages_in_background(self):
+        try:
+            self.publish_registration_messages()
+        except Exception:
+            logger.exception("Failed to publish the registration messages.")
+
+    def _join_registration_thread(self):
+        if self._registration_thread is not None:
+            self._registration_thread.join()
+            self._registration_thread = None
 
     def update_schema_last_used_timestamp(self, schema_id, timestamp_in_milliseconds):
         """
@@ -171,6 +196,7 @@ class Registrar(object):
         self.send_messages = False
         if self.current_thread:
             self.current_thread.cancel()
+        self._join_registration_thread()
         # Send registration messages when the Registrar is stopped
         self.publish_registration_messages()
 
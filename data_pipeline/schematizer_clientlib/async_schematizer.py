@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import threading
+from multiprocessing.util import register_after_fork
+
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+
+from data_pipeline.config import get_config
+from data_pipeline.helpers.singleton import Singleton
+from data_pipeline.schematizer_clientlib.schematizer import get_schematizer
+
+
+class AsyncSchematizerClient(object):
+    """A non-blocking variant of the read methods of
+    :class:`data_pipeline.schematizer_clientlib.schematizer.SchematizerClient`,
+    which return a :class:`concurrent.futures.Future` of their result instead
+    of waiting for it, for services that can't block on Schematizer requests.
+
+    The client shares the cache of the synchronous client, with the same
+    semantics: the entities cached are resolved right away, in an already
+    done future, and the others are requested in the background by up to
+    `schematizer_client_max_concurrent_requests` threads.  Concurrent misses
+    of the same entity, from either client, share a single request, and
+    failed requests are retried by those threads with the exponential backoff
+    of the synchronous client, so the caller never waits on a retry either.
+
+    **Example**::
+
+        future = get_async_schematizer().get_schema_by_id(schema_id)
+        future.add_done_callback(on_schema)
+    """
+
+    __metaclass__ = Singleton
+
+    def __init__(self):
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        register_after_fork(self, AsyncSchematizerClient._reset_after_fork)
+
+    def _reset_after_fork(self):
+        # The threads of the executor don't exist in the child.
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    @property
+    def _schematizer(self):
+        return get_schematizer()
+
+    def get_schema_by_id(self, schema_id):
+        """Get the avro schema of given schema id, see
+        :meth:`SchematizerClient.get_schema_by_id`.
+
+        Returns:
+            (concurrent.futures.Future): future of the
+                :class:`data_pipeline.schematizer_clientlib.models.avro_schema.AvroSchema`.
+        """
+        return self._submit(
+            self._schematizer._is_schema_cached(schema_id),
+            self._schematizer.get_schema_by_id,
+            schema_id
+        )
+
+    def get_topic_by_name(self, topic_name):
+        """Get the topic of given topic name, see
+        :meth:`SchematizerClient.get_topic_by_name`.
+
+        Returns:
+            (concurrent.futures.Future): future of the
+                :class:`data_pipeline.schematizer_clientlib.models.topic.Topic`.
+        """
+        return self._submit(
+            self._schematizer._is_topic_cached(topic_name),
+            self._schematizer.get_topic_by_name,
+            topic_name
+        )
+
+    def get_latest_schema_by_topic_name(self, topic_name):
+        """Get the latest enabled schema of given topic, see
+        :meth:`SchematizerClient.get_latest_schema_by_topic_name`.  The
+        latest schema may change, so it's always requested.
+
+        Returns:
+            (concurrent.futures.Future): future of the
+                :class:`data_pipeline.schematizer_clientlib.models.avro_schema.AvroSchema`.
+        """
+        return self._submit(
+            False,
+            self._schematizer.get_latest_schema_by_topic_name,
+            topic_name
+        )
+
+    def get_topics_by_criteria(self, **criteria):
+        """Get all the topics that match specified criteria, see
+        :meth:`SchematizerClient.get_topics_by_criteria` for the criteria.
+        The topics are always requested, and cached for the lookups by name.
+
+        Returns:
+            (concurrent.futures.Future): future of the list of
+                :class:`data_pipeline.schematizer_clientlib.models.topic.Topic`.
+        """
+        return self._submit(
+            False,
+            self._schematizer.get_topics_by_criteria,
+            **criteria
+        )
+
+    def _submit(self, is_cached, func, *args, **kwargs):
+        if not is_cached:
+            return self._get_executor().submit(func, *args, **kwargs)
+        # Cache hits don't make any request, so they're resolved right away
+        # rather than handed to a thread.
+        future = Future()
+        try:
+            future.set_result(func(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def _get_executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=max(
+                    get_config().schematizer_client_max_concurrent_requests,
+                    1
+                ))
+            return self._executor
+
+
+def get_async_schematizer():
+    return AsyncSchematizerClient()
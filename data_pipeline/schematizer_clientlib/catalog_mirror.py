@@ -0,0 +1,338 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import calendar
+import cPickle as pickle
+import sqlite3
+import threading
+import time
+from multiprocessing.util import register_after_fork
+
+from data_pipeline.config import get_config
+from data_pipeline.schematizer_clientlib.schematizer import get_schematizer
+
+
+logger = get_config().logger
+
+
+class CatalogMirror(object):
+    """Local mirror of the topics, with their sources, and of the schemas
+    registered in the Schematizer, so that the processes of a host look them
+    up locally instead of each querying the Schematizer.
+
+    The mirror is stored in a SQLite database, which the processes of the host
+    share through a local file, and is kept up to date by polling the topics
+    and schemas created since the last sync.  A single process syncs the
+    mirror per `sync_interval_seconds`, the others read what it synced,
+    though the processes starting a sync at the same time each download the
+    new entities before one of them writes them.
+
+    The topics are mirrored as they were when created, so changes to existing
+    topics, such as their primary keys, aren't picked up, and the topics
+    created since the last sync are missing from the mirror until the next.
+
+    **Example**::
+
+        with CatalogMirror('/var/lib/data_pipeline/catalog.db') as mirror:
+            mirror.sync()
+            topics = mirror.get_topics(namespace_name='yelp')
+
+    Args:
+        path (str): path of the SQLite database, created if it doesn't exist.
+        sync_interval_seconds (Optional[float]): minimum time between two
+            syncs of the mirror.  Defaults to
+            :meth:`data_pipeline.config.Config.catalog_mirror_sync_interval_seconds`.
+    """
+
+    # The entities created up to this many seconds before the last sync are
+    # polled again, in case their creation wasn't visible yet at the time.
+    SYNC_OVERLAP_SECONDS = 60
+
+    def __init__(self, path, sync_interval_seconds=None):
+        self.path = path
+        self.sync_interval_seconds = (
+            sync_interval_seconds if sync_interval_seconds is not None
+            else get_config().catalog_mirror_sync_interval_seconds
+        )
+        self._lock = threading.Lock()
+        self._connection = self._connect()
+        register_after_fork(self, CatalogMirror._reset_after_fork)
+        with self._lock:
+            self._connection.executescript(
+                'CREATE TABLE IF NOT EXISTS topics ('
+                'topic_id INTEGER PRIMARY KEY, '
+                'name TEXT NOT NULL UNIQUE, '
+                'namespace_name TEXT NOT NULL, '
+                'source_name TEXT NOT NULL, '
+                'created_at INTEGER NOT NULL, '
+                'topic BLOB NOT NULL);'
+                'CREATE INDEX IF NOT EXISTS topics_source '
+                'ON topics (namespace_name, source_name);'
+                'CREATE TABLE IF NOT EXISTS schemas ('
+                'schema_id INTEGER PRIMARY KEY, '
+                'topic_name TEXT NOT NULL);'
+                'CREATE TABLE IF NOT EXISTS sync_state ('
+                'id INTEGER PRIMARY KEY CHECK (id = 0), '
+                'synced_at REAL NOT NULL, '
+                'created_after INTEGER NOT NULL);'
+            )
+
+    def _connect(self):
+        # Transactions are handled explicitly, see `sync`.
+        return sqlite3.connect(
+            self.path,
+            timeout=60,
+            isolation_level=None,
+            check_same_thread=False
+        )
+
+    def _reset_after_fork(self):
+        # A SQLite connection must not be used across a fork, so the child
+        # opens its own, and the lock may have been held by a thread of the
+        # parent which doesn't exist in the child.
+        self._lock = threading.Lock()
+        self._connection = self._connect()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def close(self):
+        self._connection.close()
+
+    def sync(self, force=False):
+        """Adds the topics and schemas created since the last sync to the
+        mirror, unless it has been synced less than `sync_interval_seconds`
+        ago, by this or another process.
+
+        Args:
+            force (Optional[bool]): syncs the mirror regardless of the time
+                of the last sync.
+
+        Returns:
+            bool: whether the mirror has been synced by this call.
+        """
+        sync_state = self._get_sync_state()
+        synced_at = time.time()
+        if (not force and sync_state is not None and
+                synced_at - sync_state[0] < self.sync_interval_seconds):
+            return False
+        created_after = sync_state[1] if sync_state is not None else None
+        # The entities are downloaded before the write lock of the database
+        # is taken, so that the other processes sharing the mirror aren't
+        # locked out of it meanwhile.
+        topic_rows, schema_rows = self._download(created_after)
+        with self._lock:
+            self._connection.execute('BEGIN IMMEDIATE')
+            committed = False
+            try:
+                # Another process may have synced the mirror meanwhile, in
+                # which case it's already up to date.
+                synced = force or self._select_sync_state() == sync_state
+                if synced:
+                    self._write(topic_rows, schema_rows, synced_at)
+                self._connection.execute('COMMIT')
+                committed = True
+            finally:
+                if not committed:
+                    self._connection.execute('ROLLBACK')
+        if synced:
+            logger.info("Synced the catalog mirror {0}".format(self.path))
+        return synced
+
+    def _get_sync_state(self):
+        with self._lock:
+            return self._select_sync_state()
+
+    def _select_sync_state(self):
+        return self._connection.execute(
+            'SELECT synced_at, created_after FROM sync_state'
+        ).fetchone()
+
+    def _download(self, created_after):
+        schematizer = get_schematizer()
+        topic_rows = [
+            (
+                topic.topic_id,
+                topic.name,
+                topic.source.namespace.name,
+                topic.source.name,
+                _to_timestamp(topic.created_at),
+                buffer(pickle.dumps(topic, pickle.HIGHEST_PROTOCOL))
+            ) for topic in schematizer.iter_topics_by_criteria(
+                created_after=created_after
+            )
+        ]
+        schema_rows = [
+            (schema.schema_id, schema.topic.name)
+            for schema in schematizer.iter_schemas_created_after_date(
+                created_after or 0
+            )
+        ]
+        return topic_rows, schema_rows
+
+    def _write(self, topic_rows, schema_rows, synced_at):
+        self._connection.executemany(
+            'INSERT OR REPLACE INTO topics (topic_id, name, namespace_name, '
+            'source_name, created_at, topic) VALUES (?, ?, ?, ?, ?, ?)',
+            topic_rows
+        )
+        self._connection.executemany(
+            'INSERT OR REPLACE INTO schemas (schema_id, topic_name) '
+            'VALUES (?, ?)',
+            schema_rows
+        )
+        self._connection.execute(
+            'INSERT OR REPLACE INTO sync_state (id, synced_at, created_after) '
+            'VALUES (0, ?, ?)',
+            (synced_at, long(synced_at) - self.SYNC_OVERLAP_SECONDS)
+        )
+
+    def get_sync_watermark(self):
+        """Returns the epoch timestamp the mirror is complete up to: the topics
+        and schemas created before it have been synced, while those created
+        since may be missing from it until the next sync.  It lags the last
+        sync by `SYNC_OVERLAP_SECONDS`.  It's None if the mirror has never
+        been synced.
+        """
+        with self._lock:
+            sync_state = self._connection.execute(
+                'SELECT created_after FROM sync_state'
+            ).fetchone()
+        return sync_state[0] if sync_state is not None else None
+
+    def get_topics(
+        self,
+        namespace_name=None,
+        source_name=None,
+        created_after=None
+    ):
+        """Get the mirrored topics that match specified criteria, like
+        :meth:`data_pipeline.schematizer_clientlib.schematizer.SchematizerClient.get_topics_by_criteria`.
+
+        Args:
+            namespace_name (Optional[str]): namespace the topics belong to
+            source_name (Optional[str]): name of the source topics belong to
+            created_after (Optional[int]): Epoch timestamp the topics should be
+                created after.  The topics created at the same timestamp are
+                also included.
+
+        Returns:
+            List[data_pipeline.schematizer_clientlib.models.topic.Topic]:
+                list of topics that match given criteria, ordered by their
+                topic id.
+        """
+        conditions = []
+        params = []
+        if namespace_name is not None:
+            conditions.append('namespace_name = ?')
+            params.append(namespace_name)
+        if source_name is not None:
+            conditions.append('source_name = ?')
+            params.append(source_name)
+        if created_after is not None:
+            conditions.append('created_at >= ?')
+            params.append(created_after)
+        with self._lock:
+            return self._select_topics(
+                ' AND '.join(conditions) if conditions else '1',
+                params
+            )
+
+    def get_topics_by_names(self, topic_names):
+        """Get the mirrored topics of given names.
+
+        Returns:
+            dict(str, data_pipeline.schematizer_clientlib.models.topic.Topic):
+                Each topic name and its topic.  The names of the topics missing
+                from the mirror are not in the returned dict.
+        """
+        with self._lock:
+            self._set_lookup_keys(topic_names)
+            return {
+                topic.name: topic
+                for topic in self._select_topics(
+                    'name IN (SELECT lookup_key FROM lookup_keys)',
+                    []
+                )
+            }
+
+    def get_topic_names_by_schema_ids(self, schema_ids):
+        """Get the names of the topics of given schema ids.
+
+        Returns:
+            dict(int, str): Each schema id and the name of its topic.  The ids
+                of the schemas missing from the mirror are not in the returned
+                dict.
+        """
+        with self._lock:
+            self._set_lookup_keys(schema_ids)
+            return dict(self._connection.execute(
+                'SELECT schema_id, topic_name FROM schemas '
+                'WHERE schema_id IN (SELECT lookup_key FROM lookup_keys)'
+            ).fetchall())
+
+    def _select_topics(self, condition, params):
+        rows = self._connection.execute(
+            'SELECT topic FROM topics WHERE {0} ORDER BY topic_id'.format(
+                condition
+            ),
+            params
+        ).fetchall()
+        return [pickle.loads(str(topic)) for topic, in rows]
+
+    def _set_lookup_keys(self, keys):
+        # The looked up keys are joined from a temporary table, since there
+        # may be more of them than the number of parameters a query can have.
+        self._connection.execute(
+            'CREATE TEMP TABLE IF NOT EXISTS lookup_keys '
+            '(lookup_key PRIMARY KEY)'
+        )
+        self._connection.execute('DELETE FROM lookup_keys')
+        self._connection.executemany(
+            'INSERT OR IGNORE INTO lookup_keys (lookup_key) VALUES (?)',
+            ((key,) for key in keys)
+        )
+
+
+def _to_timestamp(created_at):
+    return calendar.timegm(created_at.utctimetuple())
+
+
+_path_to_catalog_mirror = {}
+_catalog_mirrors_lock = threading.Lock()
+
+
+def get_catalog_mirror():
+    """Get the catalog mirror of the process, stored at
+    :meth:`data_pipeline.config.Config.catalog_mirror_path`.
+
+    Returns:
+        Optional[CatalogMirror]: the catalog mirror, or None if no
+            `catalog_mirror_path` is configured.
+    """
+    path = get_config().catalog_mirror_path
+    if path is None:
+        return None
+    with _catalog_mirrors_lock:
+        if path not in _path_to_catalog_mirror:
+            _path_to_catalog_mirror[path] = CatalogMirror(path)
+        return _path_to_catalog_mirror[path]
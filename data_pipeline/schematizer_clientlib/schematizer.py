@@ -16,8 +16,18 @@
 from __future__ import absolute_import
 from __future__ import unicode_literals
 
+import cPickle as pickle
+import fcntl
+import os
+import threading
+import time
+from collections import deque
+from collections import OrderedDict
+from multiprocessing.util import register_after_fork
+
 import simplejson
 from bravado.exception import HTTPNotFound
+from concurrent.futures import ThreadPoolExecutor
 from requests.exceptions import RequestException
 from swagger_zipkin.zipkin_decorator import ZipkinClientDecorator
 
@@ -25,6 +35,7 @@ from data_pipeline._retry_util import ExpBackoffPolicy
 from data_pipeline._retry_util import retry_on_exception
 from data_pipeline._retry_util import RetryPolicy
 from data_pipeline.config import get_config
+from data_pipeline.helpers.single_flight import SingleFlight
 from data_pipeline.helpers.singleton import Singleton
 from data_pipeline.schematizer_clientlib.models.avro_schema import _AvroSchema
 from data_pipeline.schematizer_clientlib.models.avro_schema_element import (
@@ -49,6 +60,22 @@ from data_pipeline.schematizer_clientlib.models.source import _Source
 from data_pipeline.schematizer_clientlib.models.topic import _Topic
 
 
+logger = get_config().logger
+
+
+# Cache key type of the lookups of the latest schema of a topic in the
+# :class:`_NotFoundCache`.
+_LATEST_SCHEMA_OF_TOPIC = 'latest_schema_of_topic'
+
+# Types of the cached entities saved in cache snapshots, the ones needed to
+# look schemas up.
+_SNAPSHOT_ENTITY_TYPE_NAMES = {
+    _AvroSchema.__name__,
+    _Topic.__name__,
+    _Source.__name__
+}
+
+
 class _Cache(object):
     """Cache used by Schematizer client.  This cache stores the schematizer
     entities, such as avro schemas, topics, sources, etc.
@@ -56,25 +83,101 @@ class _Cache(object):
     This cache is currently limited to used by SchematizerClient only.  The
     cached value is expected to have `to_cache_value` and `from_cache_value`
     functions.  This limitation could be relaxed later if necessary.
+
+    The cache is shared by all the threads using the client, so it's guarded
+    by a lock.
     """
 
     def __init__(self):
         self._cache = {}
+        self._lock = threading.Lock()
 
     def get_value(self, entity_type, entity_key):
         cache_key = self._get_cache_key(entity_type.__name__, entity_key)
-        cache_value = self._cache.get(cache_key)
+        with self._lock:
+            cache_value = self._cache.get(cache_key)
         return entity_type.from_cache_value(cache_value) if cache_value else None
 
     def set_value(self, entity_key, new_value):
         value_type_name = new_value.__class__.__name__
         cache_key = self._get_cache_key(value_type_name, entity_key)
-        self._cache[cache_key] = new_value.to_cache_value()
+        cache_value = new_value.to_cache_value()
+        with self._lock:
+            self._cache[cache_key] = cache_value
+
+    def get_cache_values(self, entity_type_names):
+        """Returns the cache values of the entities of the given types, keyed
+        by their cache keys.
+        """
+        with self._lock:
+            return {
+                cache_key: cache_value
+                for cache_key, cache_value in self._cache.iteritems()
+                if cache_key[0] in entity_type_names
+            }
+
+    def set_cache_values(self, cache_key_to_value):
+        with self._lock:
+            self._cache.update(cache_key_to_value)
 
     def _get_cache_key(self, entity_type_name, entity_key):
         return entity_type_name, entity_key
 
 
+class _NotFoundCache(object):
+    """Cache of the lookups the Schematizer answered with a 404, so that
+    entities it doesn't know, such as kafka topics not registered in it, are
+    not requested again and again.  The lookups are cached for
+    `schematizer_client_not_found_cache_ttl_seconds` only, since the entities
+    may be registered in the meantime, and the least recently cached ones are
+    evicted beyond `schematizer_client_not_found_cache_max_size` entries.
+
+    The number of lookups answered from the cache, and of those which weren't,
+    are counted in `hit_count` and `miss_count`.
+    """
+
+    def __init__(self):
+        self._key_to_error_and_expiry = OrderedDict()
+        self._lock = threading.Lock()
+        self.hit_count = 0
+        self.miss_count = 0
+
+    def get_error(self, cache_key):
+        """Returns the error of the lookup if it's cached, or None."""
+        with self._lock:
+            error, expiry = self._key_to_error_and_expiry.get(
+                cache_key,
+                (None, None)
+            )
+            if error is not None and expiry <= time.time():
+                del self._key_to_error_and_expiry[cache_key]
+                error = None
+            if error is None:
+                self.miss_count += 1
+            else:
+                self.hit_count += 1
+            return error
+
+    def set_error(self, cache_key, error):
+        ttl_seconds = get_config().schematizer_client_not_found_cache_ttl_seconds
+        max_size = get_config().schematizer_client_not_found_cache_max_size
+        with self._lock:
+            self._key_to_error_and_expiry.pop(cache_key, None)
+            self._key_to_error_and_expiry[cache_key] = (
+                error,
+                time.time() + ttl_seconds
+            )
+            while len(self._key_to_error_and_expiry) > max_size:
+                self._key_to_error_and_expiry.popitem(last=False)
+
+    def discard(self, cache_key):
+        with self._lock:
+            self._key_to_error_and_expiry.pop(cache_key, None)
+
+    def __len__(self):
+        return len(self._key_to_error_and_expiry)
+
+
 class SchematizerClient(object):
     """A client that interacts with Schematizer APIs.  It has built-in caching
     feature which caches avro schemas, topics, and etc.  Right now the cache is
@@ -86,6 +189,18 @@ class SchematizerClient(object):
     Currently the client will throw the HTTPError returned from the Schematizer
     service if an error occurs.  It could be nice to return more straight forward
     errors instead of HTTPError.  The work is tracked in DATAPIPE-352.
+
+    The client is shared by the threads of the process.  Concurrent cache
+    misses for the same entity are coalesced into a single request, so a new
+    schema seen by all the threads at once is only requested once.
+
+    Lookups of entities the Schematizer doesn't have are cached for a short
+    time as well, see :class:`_NotFoundCache`.
+
+    Processes forked by multiprocessing inherit the cache, but not the
+    connections to the Schematizer.  The cached schemas, topics and sources
+    can also be saved to a file, see :meth:`save_cache_snapshot`, which the
+    processes starting later load.
     """
 
     # This class potentially could grow relatively huge.  There may be a need to
@@ -112,6 +227,63 @@ class SchematizerClient(object):
         self._bravado_client = get_config().schematizer_client
         self._client = ZipkinClientDecorator(self._bravado_client)
         self._cache = _Cache()
+        self._not_found_cache = _NotFoundCache()
+        self._single_flight = SingleFlight()
+        register_after_fork(self, SchematizerClient._reset_after_fork)
+        snapshot_path = get_config().schematizer_client_cache_snapshot_path
+        if snapshot_path is not None and os.path.exists(snapshot_path):
+            self._load_cache_snapshot(snapshot_path)
+
+    def _reset_after_fork(self):
+        # The threads of the parent don't exist in the child, so neither do
+        # the locks they held, and the kept-alive connections of the parent
+        # must not be used by both processes.
+        self._cache._lock = threading.Lock()
+        self._not_found_cache._lock = threading.Lock()
+        self._single_flight = SingleFlight()
+        self._bravado_client.swagger_spec.http_client.session.close()
+
+    def save_cache_snapshot(self, path):
+        """Saves the cached schemas, topics and sources to a file, which the
+        client of a process starting later loads when
+        :meth:`data_pipeline.config.Config.schematizer_client_cache_snapshot_path`
+        is set to it.
+
+        Args:
+            path (str): path of the snapshot file.  If it exists, the entities
+                it holds are kept in it, so that the processes of the host
+                caching different schemas share the same snapshot.
+        """
+        # Processes saving the snapshot at the same time are serialized, so
+        # that none of them misses the entities the others add to it.
+        with open('{0}.lock'.format(path), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            snapshot = (
+                self._read_cache_snapshot(path) if os.path.exists(path) else {}
+            )
+            snapshot.update(
+                self._cache.get_cache_values(_SNAPSHOT_ENTITY_TYPE_NAMES)
+            )
+            # The snapshot is written to a temporary file first, so that
+            # processes starting meanwhile never load a partially written one.
+            tmp_path = '{0}.{1}.tmp'.format(path, os.getpid())
+            with open(tmp_path, 'wb') as snapshot_file:
+                pickle.dump(snapshot, snapshot_file, pickle.HIGHEST_PROTOCOL)
+            os.rename(tmp_path, path)
+
+    def _load_cache_snapshot(self, path):
+        self._cache.set_cache_values(self._read_cache_snapshot(path))
+
+    def _read_cache_snapshot(self, path):
+        # The snapshot only saves requests, so the client works without it.
+        try:
+            with open(path, 'rb') as snapshot_file:
+                return pickle.load(snapshot_file)
+        except Exception:
+            logger.warning(
+                "Failed to load the schematizer cache from {0}".format(path)
+            )
+            return {}
 
     def get_schema_by_id(self, schema_id):
         """Get the avro schema of given schema id.
@@ -130,13 +302,79 @@ class SchematizerClient(object):
         if _schema:
             return _schema
 
-        response = self._call_api(
+        return self._fetch_cache_miss(
+            entity_type=_AvroSchema,
+            entity_key=schema_id,
             api=self._client.schemas.get_schema_by_id,
-            params={'schema_id': schema_id}
+            params={'schema_id': schema_id},
+            set_cache=self._set_cache_by_schema
         )
-        _schema = _AvroSchema.from_response(response)
-        self._set_cache_by_schema(_schema)
-        return _schema
+
+    def get_schemas_by_ids(self, schema_ids, topic_names=None):
+        """Get the avro schemas of given schema ids, filling the cache for all
+        of them at once instead of looking them up one after another.
+
+        The schemas missing from the cache are looked up with the bulk apis
+        first: a single range request when their ids are close to each other,
+        which is the case of recently registered schemas, and a request per
+        topic of `topic_names`.  The remaining ones are requested
+        concurrently, by up to `schematizer_client_max_concurrent_requests`
+        threads.
+
+        Args:
+            schema_ids (iterable[int]): The ids of requested avro schemas.
+            topic_names (Optional[iterable[str]]): The names of the topics the
+                schemas are expected to be in, whose schemas are requested in
+                bulk if some are missing.
+
+        Returns:
+            (dict(int, data_pipeline.schematizer_clientlib.models.avro_schema.AvroSchema)):
+                Each requested schema id and its avro schema.
+        """
+        schema_ids = set(schema_ids)
+        self._cache_schemas_by_id_range(self._get_uncached_schema_ids(schema_ids))
+        if topic_names and self._get_uncached_schema_ids(schema_ids):
+            self._map_concurrently(self._cache_schemas_by_topic, topic_names)
+        schema_ids = list(schema_ids)
+        return dict(zip(
+            schema_ids,
+            self._map_concurrently(self.get_schema_by_id, schema_ids)
+        ))
+
+    def _get_uncached_schema_ids(self, schema_ids):
+        return {
+            schema_id for schema_id in schema_ids
+            if not self._cache.get_value(_AvroSchema, schema_id)
+        }
+
+    def _cache_schemas_by_id_range(self, schema_ids):
+        if len(schema_ids) < 2:
+            return
+        min_id = min(schema_ids)
+        id_range_size = max(schema_ids) - min_id + 1
+        # The range is only requested if most of the schemas in it are needed
+        if id_range_size > 2 * len(schema_ids):
+            return
+        self.get_schemas_by_criteria(min_id=min_id, count=id_range_size)
+
+    def _cache_schemas_by_topic(self, topic_name):
+        # The topics are only hints, such as the names of kafka topics which
+        # may not be registered in the Schematizer.
+        try:
+            self.get_schemas_by_topic(topic_name)
+        except HTTPNotFound:
+            pass
+
+    def _map_concurrently(self, func, items):
+        items = list(items)
+        pool_size = min(
+            len(items),
+            get_config().schematizer_client_max_concurrent_requests
+        )
+        if pool_size <= 1:
+            return [func(item) for item in items]
+        with ThreadPoolExecutor(max_workers=pool_size) as executor:
+            return list(executor.map(func, items))
 
     def get_schema_elements_by_schema_id(self, schema_id):
         """Get the avro schema elements of given schema id.
@@ -186,11 +424,32 @@ class SchematizerClient(object):
             (List of data_pipeline.schematizer_clientlib.models.avro_schema.AvroSchema):
                 The list of avro schemas created after (inclusive) specified date.
         """
-        return self._get_schemas_created_after_date(
+        return list(self.iter_schemas_created_after_date(
             created_after,
             min_id,
             page_size
-        )
+        ))
+
+    def iter_schemas_created_after_date(
+        self,
+        created_after,
+        min_id=0,
+        page_size=10
+    ):
+        """Same as :meth:`get_schemas_created_after_date`, but yields the
+        avro schemas as their pages are received instead of returning them
+        all at once, see :meth:`_iter_pages`.
+        """
+        for resp_item in self._iter_pages(
+            api=self._client.schemas.get_schemas_created_after,
+            params={'created_after': created_after},
+            id_attr='schema_id',
+            min_id=min_id,
+            page_size=page_size
+        ):
+            _schema = _AvroSchema.from_response(resp_item)
+            self._set_cache_by_schema(_schema)
+            yield _schema.to_result()
 
     def get_schemas_by_criteria(
         self,
@@ -229,30 +488,6 @@ class SchematizerClient(object):
             self._set_cache_by_schema(_schema)
         return results
 
-    def _get_schemas_created_after_date(self, created_after, min_id, page_size):
-        last_page_size = page_size
-        result = []
-        # Exit the loop when the number of schemas returned are not equal to
-        # page_size. Denoting there are no more schemas to fetch from the
-        # Schematizer.
-        while last_page_size == page_size:
-            response = self._call_api(
-                api=self._client.schemas.get_schemas_created_after,
-                params={
-                    'created_after': created_after,
-                    'count': page_size,
-                    'min_id': min_id
-                }
-            )
-
-            for resp_item in response:
-                _schema = _AvroSchema.from_response(resp_item)
-                result.append(_schema.to_result())
-                self._set_cache_by_schema(_schema)
-                min_id = _schema.schema_id + 1
-            last_page_size = len(response)
-        return result
-
     def get_schemas_by_topic(self, topic_name):
         """Get the list of schemas in the specified topic.
 
@@ -274,6 +509,42 @@ class SchematizerClient(object):
             self._set_cache_by_schema(_schema)
         return result
 
+    def get_schemas_by_topics(self, topic_names, skip_failed_topics=False):
+        """Get the lists of schemas in the specified topics, requested
+        concurrently by up to `schematizer_client_max_concurrent_requests`
+        threads.
+
+        Args:
+            topic_names (iterable[str]): names of the topics to look up
+            skip_failed_topics (Optional[bool]): if True, the topics whose
+                schemas fail to be looked up are logged and left out of the
+                result instead of the error being raised.
+
+        Returns:
+            (dict(str, List[data_pipeline.schematizer_clientlib.models.avro_schema.AvroSchema])):
+                Each topic name and the list of schemas in the topic.
+        """
+        topic_names = list(topic_names)
+        get_schemas = self.get_schemas_by_topic
+        if skip_failed_topics:
+            get_schemas = self._get_schemas_by_topic_or_none
+        return {
+            topic_name: schemas
+            for topic_name, schemas in zip(
+                topic_names,
+                self._map_concurrently(get_schemas, topic_names)
+            ) if schemas is not None
+        }
+
+    def _get_schemas_by_topic_or_none(self, topic_name):
+        try:
+            return self.get_schemas_by_topic(topic_name)
+        except Exception:
+            logger.exception(
+                "Failed to get the schemas of topic {0}".format(topic_name)
+            )
+            return None
+
     def get_topic_by_name(self, topic_name):
         """Get the topic of given topic name.
 
@@ -291,13 +562,13 @@ class SchematizerClient(object):
         if _topic:
             return _topic
 
-        response = self._call_api(
+        return self._fetch_cache_miss(
+            entity_type=_Topic,
+            entity_key=topic_name,
             api=self._client.topics.get_topic_by_topic_name,
-            params={'topic_name': topic_name}
+            params={'topic_name': topic_name},
+            set_cache=self._set_cache_by_topic
         )
-        _topic = _Topic.from_response(response)
-        self._set_cache_by_topic(_topic)
-        return _topic
 
     def get_source_by_id(self, source_id):
         """Get the schema source of given source id.
@@ -316,13 +587,13 @@ class SchematizerClient(object):
         if _source:
             return _source
 
-        response = self._call_api(
+        return self._fetch_cache_miss(
+            entity_type=_Source,
+            entity_key=source_id,
             api=self._client.sources.get_source_by_id,
-            params={'source_id': source_id}
+            params={'source_id': source_id},
+            set_cache=self._set_cache_by_source
         )
-        _source = _Source.from_response(response)
-        self._set_cache_by_source(_source)
-        return _source
 
     def get_namespaces(self):
         """Get the list of namespaces registered in the schematizer
@@ -358,24 +629,27 @@ class SchematizerClient(object):
             (List[data_pipeline.schematizer_clientlib.models.source.Source]):
                 The list of schema sources in the given namespace.
         """
-        last_page_size = page_size
-        result = []
-        while last_page_size == page_size:
-            response = self._call_api(
-                api=self._client.namespaces.list_sources_by_namespace,
-                params={
-                    'namespace': namespace_name,
-                    'min_id': min_id,
-                    'count': page_size
-                }
-            )
-            for resp_item in response:
-                _source = _Source.from_response(resp_item)
-                result.append(_source.to_result())
-                self._set_cache_by_source(_source)
-                min_id = _source.source_id + 1
-            last_page_size = len(response)
-        return result
+        return list(self.iter_sources_by_namespace(
+            namespace_name,
+            min_id,
+            page_size
+        ))
+
+    def iter_sources_by_namespace(
+        self,
+        namespace_name,
+        min_id=0,
+        page_size=10
+    ):
+        """Same as :meth:`get_sources_by_namespace`, but yields the sources
+        as their pages are received, see :meth:`_iter_pages`.
+        """
+        return self._iter_sources(
+            api=self._client.namespaces.list_sources_by_namespace,
+            params={'namespace': namespace_name},
+            min_id=min_id,
+            page_size=page_size
+        )
 
     def get_sources(
         self,
@@ -395,23 +669,30 @@ class SchematizerClient(object):
             (List[data_pipeline.schematizer_clientlib.models.Source]):
                 list of topics that match given criteria.
         """
-        last_page_size = page_size
-        result = []
-        while last_page_size == page_size:
-            response = self._call_api(
-                api=self._client.sources.list_sources,
-                params={
-                    'min_id': min_id,
-                    'count': page_size
-                }
-            )
-            for resp_item in response:
-                _source = _Source.from_response(resp_item)
-                result.append(_source.to_result())
-                self._set_cache_by_source(_source)
-                min_id = _source.source_id + 1
-            last_page_size = len(response)
-        return result
+        return list(self.iter_sources(min_id, page_size))
+
+    def iter_sources(self, min_id=0, page_size=10):
+        """Same as :meth:`get_sources`, but yields the sources as their pages
+        are received, see :meth:`_iter_pages`.
+        """
+        return self._iter_sources(
+            api=self._client.sources.list_sources,
+            params={},
+            min_id=min_id,
+            page_size=page_size
+        )
+
+    def _iter_sources(self, api, params, min_id, page_size):
+        for resp_item in self._iter_pages(
+            api=api,
+            params=params,
+            id_attr='source_id',
+            min_id=min_id,
+            page_size=page_size
+        ):
+            _source = _Source.from_response(resp_item)
+            self._set_cache_by_source(_source)
+            yield _source.to_result()
 
     def get_topics_by_source_id(self, source_id):
         """Get the list of topics of specified source id.
@@ -463,7 +744,8 @@ class SchematizerClient(object):
                 The latest enabled avro schema of given topic.  It returns None
                 if no such avro schema can be found.
         """
-        response = self._call_api(
+        response = self._call_api_unless_not_found(
+            not_found_cache_key=(_LATEST_SCHEMA_OF_TOPIC, topic_name),
             api=self._client.topics.get_latest_schema_by_topic_name,
             params={'topic_name': topic_name}
         )
@@ -796,7 +1078,8 @@ class SchematizerClient(object):
         source_name=None,
         created_after=None,
         min_id=0,
-        max_count=None
+        max_count=None,
+        page_size=None
     ):
         """Get all the topics that match specified criteria.  If no criterion
         is specified, it returns all the topics.
@@ -812,6 +1095,9 @@ class SchematizerClient(object):
             max_count (Optional[int]): Maximum number of topics to retrieve. It
                 must be a positive integer. If not specified, it returns all the
                 topics.
+            page_size (Optional[int]): Number of topics to retrieve per api
+                call, to avoid timeouts from the service.  Defaults to
+                `DEFAULT_PAGE_SIZE`.
 
         Returns:
             List[data_pipeline.schematizer_clientlib.models.topic.Topic]:
@@ -820,43 +1106,46 @@ class SchematizerClient(object):
 
         Remarks:
             The function internally paginates through the topics if the max_count
-            is too large to avoid timeout from the service.  The page size is set
-            to 20 right now.
+            is too large to avoid timeout from the service, see
+            :meth:`_iter_pages`.
+        """
+        return list(self.iter_topics_by_criteria(
+            namespace_name=namespace_name,
+            source_name=source_name,
+            created_after=created_after,
+            min_id=min_id,
+            max_count=max_count,
+            page_size=page_size
+        ))
+
+    def iter_topics_by_criteria(
+        self,
+        namespace_name=None,
+        source_name=None,
+        created_after=None,
+        min_id=0,
+        max_count=None,
+        page_size=None
+    ):
+        """Same as :meth:`get_topics_by_criteria`, but yields the topics as
+        their pages are received instead of returning them all at once.
         """
-        # The reason to set fixed page size internally is to make the pagination
-        # transparent to the users. We can set a reasonable page size that makes
-        # reasonable number of calls without causing timeout. This interface
-        # should be sufficient for most of our use cases, so we probably don't
-        # need to provide the interface for users to set the page size right now.
         max_count_specified = max_count is not None and max_count > 0
-        page_size = self.DEFAULT_PAGE_SIZE
-        should_get_more_topics = True
-        result = []
-        while should_get_more_topics:
-            response = self._call_api(
-                api=self._client.topics.get_topics_by_criteria,
-                params={
-                    'namespace': namespace_name,
-                    'source': source_name,
-                    'created_after': created_after,
-                    'min_id': min_id,
-                    'count': page_size
-                }
-            )
-            topic = None
-            for resp_item in response:
-                topic = _Topic.from_response(resp_item)
-                result.append(topic.to_result())
-                self._set_cache_by_topic(topic)
-                if max_count_specified and len(result) == max_count:
-                    should_get_more_topics = False
-                    break
-            if topic:
-                min_id = topic.topic_id + 1
-            should_get_more_topics = (
-                should_get_more_topics and len(response) >= page_size
-            )
-        return result
+        for resp_item in self._iter_pages(
+            api=self._client.topics.get_topics_by_criteria,
+            params={
+                'namespace': namespace_name,
+                'source': source_name,
+                'created_after': created_after
+            },
+            id_attr='topic_id',
+            min_id=min_id,
+            page_size=page_size or self.DEFAULT_PAGE_SIZE,
+            max_count=max_count if max_count_specified else None
+        ):
+            topic = _Topic.from_response(resp_item)
+            self._set_cache_by_topic(topic)
+            yield topic.to_result()
 
     def create_data_target(self, name, target_type, destination):
         """ Create and return newly created data target.
@@ -924,13 +1213,13 @@ class SchematizerClient(object):
         if _data_target:
             return _data_target
 
-        response = self._call_api(
+        return self._fetch_cache_miss(
+            entity_type=_DataTarget,
+            entity_key=data_target_id,
             api=self._client.data_targets.get_data_target_by_id,
-            params={'data_target_id': data_target_id}
+            params={'data_target_id': data_target_id},
+            set_cache=self._set_cache_by_data_target
         )
-        _data_target = _DataTarget.from_response(response)
-        self._set_cache_by_data_target(_data_target)
-        return _data_target
 
     def get_data_target_by_name(self, data_target_name):
         """Get the data target of specified name.
@@ -949,13 +1238,13 @@ class SchematizerClient(object):
         if _data_target:
             return _data_target
 
-        response = self._call_api(
+        return self._fetch_cache_miss(
+            entity_type=_DataTarget,
+            entity_key=data_target_name,
             api=self._client.data_targets.get_data_target_by_name,
-            params={'data_target_name': data_target_name}
+            params={'data_target_name': data_target_name},
+            set_cache=self._set_cache_by_data_target_name
         )
-        _data_target = _DataTarget.from_response(response)
-        self._set_cache_by_data_target_name(_data_target)
-        return _data_target
 
     def get_topics_by_data_target_id(self, data_target_id):
         """Get the list of topics associated to the specified data target id.
@@ -1141,13 +1430,13 @@ class SchematizerClient(object):
         if _consumer_group:
             return _consumer_group
 
-        response = self._call_api(
+        return self._fetch_cache_miss(
+            entity_type=_ConsumerGroup,
+            entity_key=consumer_group_id,
             api=self._client.consumer_groups.get_consumer_group_by_id,
-            params={'consumer_group_id': consumer_group_id}
+            params={'consumer_group_id': consumer_group_id},
+            set_cache=self._set_cache_by_consumer_group
         )
-        _consumer_group = _ConsumerGroup.from_response(response)
-        self._set_cache_by_consumer_group(_consumer_group)
-        return _consumer_group
 
     def create_consumer_group_data_source(
         self,
@@ -1217,6 +1506,12 @@ class SchematizerClient(object):
         """ Create and return a new list of topic names built from topics,
         filtered by whether a topic's most recent schema has a primary_key
 
+        The schemas of a topic all have the primary keys of the topic, so the
+        topics already cached, such as those returned by
+        :meth:`get_topics_by_criteria`, are filtered without any request.  The
+        latest schemas of the others are requested concurrently, by up to
+        `schematizer_client_max_concurrent_requests` threads.
+
         Args:
             topics (list[str]): List of topic names
 
@@ -1224,16 +1519,29 @@ class SchematizerClient(object):
             Newly created list of topic names filtered by if the corresponding
             topics have primary_keys in their most recent schemas
         """
-        pkey_topics = []
-        for topic in topics:
-            try:
-                schema = self.get_latest_schema_by_topic_name(topic)
-                if schema.primary_keys:
-                    pkey_topics.append(topic)
-            except HTTPNotFound:
-                # List of topics may include topics not in schematizer
-                pass
-        return pkey_topics
+        topic_to_primary_keys = {}
+        uncached_topics = []
+        for topic in set(topics):
+            _topic = self._cache.get_value(_Topic, topic)
+            if _topic:
+                topic_to_primary_keys[topic] = _topic.primary_keys
+            else:
+                uncached_topics.append(topic)
+        topic_to_primary_keys.update(zip(
+            uncached_topics,
+            self._map_concurrently(
+                self._get_latest_schema_primary_keys,
+                uncached_topics
+            )
+        ))
+        return [topic for topic in topics if topic_to_primary_keys[topic]]
+
+    def _get_latest_schema_primary_keys(self, topic_name):
+        try:
+            return self.get_latest_schema_by_topic_name(topic_name).primary_keys
+        except HTTPNotFound:
+            # List of topics may include topics not in schematizer
+            return None
 
     def get_schema_migration(self, new_schema, target_schema_type, old_schema=None):
         """ Get a list of of SQL statements needed to migrate to a desired avro schema
@@ -1285,6 +1593,132 @@ class SchematizerClient(object):
     def _get_api_result(self, request):
         return request.result()
 
+    def _iter_pages(
+        self,
+        api,
+        params,
+        id_attr,
+        min_id,
+        page_size,
+        max_count=None
+    ):
+        """Yields up to `max_count` items of a paginated api in ascending
+        order of id, while up to `schematizer_client_max_concurrent_requests`
+        upcoming pages are requested concurrently.
+
+        The pages are requested by id cursor, and the upcoming ones can't be
+        known before the current one is received, so they are requested
+        speculatively, each starting `page_size` ids after the previous one.
+        A full page holds every item up to its last id, so the items of a page
+        are always received by the time it's consumed.  When the ids are
+        sparse, the pages already covered by a previous one are dropped, and
+        the following ones start after the last id received instead.
+
+        The upcoming pages are only requested once a full page with dense ids
+        has been received: the first page is requested alone, since there may
+        be no more items than it holds, and so is the page following one with
+        sparse ids, since the speculative pages would mostly be dropped.
+        """
+        prefetch_count = max(
+            get_config().schematizer_client_max_concurrent_requests,
+            1
+        )
+        executor = ThreadPoolExecutor(max_workers=prefetch_count)
+        pending_pages = deque()
+        next_page_min_id = min_id
+        remaining_count = max_count
+        pending_page_count = 1
+        try:
+            while True:
+                # No more pages than needed for max_count items are requested
+                while len(pending_pages) < pending_page_count and (
+                    remaining_count is None or
+                    len(pending_pages) * page_size < remaining_count
+                ):
+                    page_params = dict(
+                        params,
+                        min_id=next_page_min_id,
+                        count=page_size
+                    )
+                    pending_pages.append((
+                        next_page_min_id,
+                        executor.submit(self._call_api, api, page_params)
+                    ))
+                    next_page_min_id += page_size
+                page_min_id, page = pending_pages.popleft()
+                response = page.result()
+                for resp_item in response:
+                    if getattr(resp_item, id_attr) < min_id:
+                        continue
+                    yield resp_item
+                    if remaining_count is not None:
+                        remaining_count -= 1
+                        if remaining_count == 0:
+                            return
+                # The number of items returned is less than page_size only
+                # when there are no more items to fetch from the Schematizer.
+                if len(response) < page_size:
+                    return
+                min_id = getattr(response[-1], id_attr) + 1
+                ids_dense = min_id == page_min_id + page_size
+                pending_page_count = prefetch_count if ids_dense else 1
+                while (pending_pages and
+                        pending_pages[0][0] + page_size <= min_id):
+                    pending_pages.popleft()[1].cancel()
+                next_page_min_id = max(next_page_min_id, min_id)
+        finally:
+            for _, page in pending_pages:
+                page.cancel()
+            executor.shutdown(wait=False)
+
+    def _fetch_cache_miss(self, entity_type, entity_key, api, params, set_cache):
+        """Requests an entity missing from the cache and caches it.  Threads
+        missing the same entity concurrently wait for, and share, the same
+        request.
+        """
+        def fetch():
+            _entity = entity_type.from_response(
+                self._call_api_unless_not_found(
+                    not_found_cache_key=(entity_type.__name__, entity_key),
+                    api=api,
+                    params=params
+                )
+            )
+            set_cache(_entity)
+            return _entity
+
+        return self._single_flight.do(
+            (entity_type.__name__, entity_key),
+            fetch
+        )
+
+    def _call_api_unless_not_found(self, not_found_cache_key, api, params):
+        """Calls the api, unless it recently answered the same lookup with a
+        404, in which case the same HTTPNotFound error is raised again.
+        """
+        error = self._not_found_cache.get_error(not_found_cache_key)
+        if error is not None:
+            raise error
+        try:
+            return self._call_api(api=api, params=params)
+        except HTTPNotFound as e:
+            self._not_found_cache.set_error(not_found_cache_key, e)
+            raise
+
+    def _is_schema_cached(self, schema_id):
+        """Whether the schema, along with its topic and source, is cached, so
+        that looking it up doesn't make any request.
+        """
+        _schema = self._cache.get_value(_AvroSchema, schema_id)
+        return _schema is not None and self._is_topic_cached(_schema.topic.name)
+
+    def _is_topic_cached(self, topic_name):
+        _topic = self._cache.get_value(_Topic, topic_name)
+        return (
+            _topic is not None and
+            self._cache.get_value(_Source, _topic.source.source_id) is not None
+        )
+
     def _get_cached_schema(self, schema_id):
         _schema = self._cache.get_value(_AvroSchema, schema_id)
         if _schema:
@@ -1293,6 +1727,9 @@ class SchematizerClient(object):
 
     def _set_cache_by_schema(self, new_schema):
         self._cache.set_value(new_schema.schema_id, new_schema)
+        self._not_found_cache.discard(
+            (_AvroSchema.__name__, new_schema.schema_id)
+        )
         self._set_cache_by_topic(new_schema.topic)
 
     def _get_cached_topic(self, topic_name):
@@ -1303,6 +1740,10 @@ class SchematizerClient(object):
 
     def _set_cache_by_topic(self, new_topic):
         self._cache.set_value(new_topic.name, new_topic)
+        self._not_found_cache.discard((_Topic.__name__, new_topic.name))
+        self._not_found_cache.discard(
+            (_LATEST_SCHEMA_OF_TOPIC, new_topic.name)
+        )
         self._set_cache_by_source(new_topic.source)
 
     def _set_cache_by_source(self, new_source):
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import sqlite3
+from collections import namedtuple
+
+
+TimestampOffsetPoint = namedtuple('TimestampOffsetPoint', [
+    'topic',                # Topic the message was sampled from
+    'partition',            # Partition of the topic the message was from
+    'timestamp',            # Timestamp the message was published at
+    'offset'                # Offset of the message in the partition
+])
+
+
+class TimestampOffsetIndex(object):
+    """Sparse index of the offsets messages published at known timestamps
+    have, stored in a SQLite database so it can be shared by the processes
+    (or, through a shared file system, the hosts) seeking topics.
+
+    The index is filled by sampling the topics, see
+    :class:`data_pipeline.tools.timestamp_offset_indexer.TimestampOffsetIndexer`,
+    and narrows down the range of offsets searched for a timestamp by
+    :func:`data_pipeline._kafka_util.get_first_offsets_at_or_after_timestamps`.
+    Messages are assumed to be published in timestamp order within a
+    partition, which is what makes the index, and the search, valid.
+
+    **Example**::
+
+        with TimestampOffsetIndex('/var/lib/data_pipeline/offsets.db') as index:
+            consumer.seek_to_timestamp(
+                {'topic1': time.time() - 7200},
+                timestamp_offset_index=index
+            )
+
+    Args:
+        path (str): path of the SQLite database, created if it doesn't exist.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._connection = sqlite3.connect(path)
+        with self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS timestamp_offset_points ('
+                'topic TEXT NOT NULL, '
+                'partition INTEGER NOT NULL, '
+                'timestamp INTEGER NOT NULL, '
+                'offset INTEGER NOT NULL, '
+                'PRIMARY KEY (topic, partition, offset))'
+            )
+            self._connection.execute(
+                'CREATE INDEX IF NOT EXISTS timestamp_offset_points_timestamp '
+                'ON timestamp_offset_points (topic, partition, timestamp)'
+            )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def close(self):
+        self._connection.close()
+
+    def add_points(self, points):
+        """Adds sampled messages to the index.
+
+        Args:
+            points (iterable[TimestampOffsetPoint]): sampled messages.
+        """
+        with self._connection:
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO timestamp_offset_points '
+                '(topic, partition, timestamp, offset) VALUES (?, ?, ?, ?)',
+                points
+            )
+
+    def remove_points_before(self, timestamp):
+        """Removes the messages sampled before `timestamp`, to keep the index
+        from outgrowing the retention of the topics.
+        """
+        with self._connection:
+            self._connection.execute(
+                'DELETE FROM timestamp_offset_points WHERE timestamp < ?',
+                (timestamp,)
+            )
+
+    def get_offset_range(self, topic, partition, timestamp):
+        """Returns the range of offsets the first message published at or
+        after `timestamp` in the partition is in, according to the index.
+
+        Returns:
+            (Optional[int], Optional[int]): the offset after the last sampled
+            message published before `timestamp`, and the offset of the first
+            sampled message published at or after it.  Either is None if no
+            such message has been sampled.
+        """
+        low = self._connection.execute(
+            'SELECT MAX(offset) FROM timestamp_offset_points '
+            'WHERE topic = ? AND partition = ? AND timestamp < ?',
+            (topic, partition, timestamp)
+        ).fetchone()[0]
+        high = self._connection.execute(
+            'SELECT MIN(offset) FROM timestamp_offset_points '
+            'WHERE topic = ? AND partition = ? AND timestamp >= ?',
+            (topic, partition, timestamp)
+        ).fetchone()[0]
+        return (low + 1 if low is not None else None), high
@@ -28,6 +28,7 @@ from kafka_utils.util import offsets
 from kafka_utils.util.zookeeper import ZK
 
 from data_pipeline.config import get_config
+from data_pipeline.schematizer_clientlib.catalog_mirror import get_catalog_mirror
 from data_pipeline.schematizer_clientlib.schematizer import get_schematizer
 from data_pipeline.servlib.config_util import load_package_config
 from data_pipeline.tools.introspector.models import IntrospectorNamespace
@@ -49,6 +50,9 @@ class IntrospectorCommand(object):
         self.log = logging.getLogger(self.log_name)
         self._setup_logging()
         self.schematizer = get_schematizer()
+        self.catalog_mirror = get_catalog_mirror()
+        if self.catalog_mirror is not None:
+            self.catalog_mirror.sync()
 
     @classmethod
     def add_parser(cls, subparsers):
@@ -161,14 +165,27 @@ class IntrospectorCommand(object):
 
     def _topic_to_range_map_to_topics_list(self, topic_to_range_map):
         output = []
+        name_to_topic = self._get_topics_by_names(topic_to_range_map.keys())
         for topic, range_map in topic_to_range_map.iteritems():
-            try:
-                topic_result = self.schematizer.get_topic_by_name(topic)._asdict()
+            if topic in name_to_topic:
+                topic_result = name_to_topic[topic]._asdict()
                 topic_result['range_map'] = range_map
                 output.append(topic_result)
+        return output
+
+    def _get_topics_by_names(self, topic_names):
+        if self.catalog_mirror is not None:
+            return self.catalog_mirror.get_topics_by_names(topic_names)
+        name_to_topic = {}
+        for topic_name in topic_names:
+            try:
+                name_to_topic[topic_name] = self.schematizer.get_topic_by_name(
+                    topic_name
+                )
             except HTTPNotFound:
+                # Kafka topics may not be registered in the Schematizer
                 pass
-        return output
+        return name_to_topic
 
     @cached_property
     def _topics_with_messages_to_range_map(self):
@@ -268,6 +285,11 @@ class IntrospectorCommand(object):
             topics = self.schematizer.get_topics_by_source_id(
                 source_id
             )
+        elif self.catalog_mirror is not None:
+            topics = self.catalog_mirror.get_topics(
+                namespace_name=namespace_name,
+                source_name=source_name
+            )
         else:
             topics = self.schematizer.get_topics_by_criteria(
                 namespace_name=namespace_name,
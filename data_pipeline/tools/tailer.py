@@ -39,6 +39,7 @@ from data_pipeline.expected_frequency import ExpectedFrequency
 from data_pipeline.message import Message
 from data_pipeline.schematizer_clientlib.schematizer import get_schematizer
 from data_pipeline.servlib.config_util import load_default_config
+from data_pipeline.timestamp_offset_index import TimestampOffsetIndex
 from data_pipeline.tools.timestamp_to_offset_mapper import get_first_offset_at_or_after_start_timestamp
 
 logger = get_config().logger
@@ -211,6 +212,14 @@ class Tailer(Batch):
                 ' Formatted using epoch timestamp'
             )
         )
+        opt_group.add_option(
+            '--timestamp-offset-index',
+            default=None,
+            help=(
+                'If set, the --start-timestamp offsets are searched starting from the '
+                'offsets sampled in this index, see data_pipeline_timestamp_offset_indexer.'
+            )
+        )
         return opt_group
 
     @property
@@ -361,11 +370,20 @@ class Tailer(Batch):
         logger.info(
             "Getting starting offsets for {} based on --start-timestamp".format(no_offset_topics)
         )
-        start_timestamp_topic_to_offset_map = get_first_offset_at_or_after_start_timestamp(
-            self.kafka_client,
-            no_offset_topics,
-            start_timestamp
-        )
+        if self.options.timestamp_offset_index:
+            with TimestampOffsetIndex(self.options.timestamp_offset_index) as index:
+                start_timestamp_topic_to_offset_map = get_first_offset_at_or_after_start_timestamp(
+                    self.kafka_client,
+                    no_offset_topics,
+                    start_timestamp,
+                    timestamp_offset_index=index
+                )
+        else:
+            start_timestamp_topic_to_offset_map = get_first_offset_at_or_after_start_timestamp(
+                self.kafka_client,
+                no_offset_topics,
+                start_timestamp
+            )
         for topic, consumer_topic_state in start_timestamp_topic_to_offset_map.iteritems():
             self.topic_to_offsets_map[topic] = start_timestamp_topic_to_offset_map[topic]
 
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import signal
+import time
+from optparse import OptionGroup
+
+from kafka import KafkaClient
+from yelp_batch.batch import Batch
+from yelp_batch.batch import batch_command_line_options
+from yelp_batch.batch import batch_configure
+
+from data_pipeline import __version__
+from data_pipeline._kafka_util import get_last_message_timestamps
+from data_pipeline.config import get_config
+from data_pipeline.schematizer_clientlib.schematizer import get_schematizer
+from data_pipeline.servlib.config_util import load_default_config
+from data_pipeline.timestamp_offset_index import TimestampOffsetIndex
+from data_pipeline.timestamp_offset_index import TimestampOffsetPoint
+
+logger = get_config().logger
+
+
+class TimestampOffsetIndexer(Batch):
+    """TimestampOffsetIndexer periodically samples the offset and timestamp of
+    the last message of each partition of (a) topic(s) into a
+    :class:`data_pipeline.timestamp_offset_index.TimestampOffsetIndex`, which
+    the tailer (with --timestamp-offset-index) and
+    :meth:`data_pipeline.consumer.Consumer.seek_to_timestamp` use to resolve
+    timestamps to offsets.
+
+    A timestamp is resolved with a single fetch per partition when fewer
+    messages than fit in a fetch are published in a partition between two
+    samples, so busy topics need a shorter --sample-interval-seconds.
+    """
+    enable_error_emails = False
+
+    @property
+    def version(self):
+        """Overriding this so we'll get the clientlib version number when
+        the indexer is run with --version.
+        """
+        return "data_pipeline {}".format(__version__)
+
+    @batch_command_line_options
+    def _define_indexer_options(self, option_parser):
+        opt_group = OptionGroup(
+            option_parser,
+            'Data Pipeline Timestamp Offset Indexer options'
+        )
+        opt_group.add_option(
+            '--topic',
+            type='string',
+            action='append',
+            dest='topics',
+            default=[],
+            help=(
+                'The topic to index.  Can be specified multiple times to index '
+                'more than one topic.'
+            ),
+        )
+        opt_group.add_option(
+            '--namespace',
+            type='string',
+            help=(
+                'If given, the topics of the namespace are indexed, in addition '
+                'to any topics otherwise provided. (Example: refresh_primary.yelp)'
+            )
+        )
+        opt_group.add_option(
+            '--index-path',
+            type='string',
+            help='Path of the SQLite database of the index, created if missing.'
+        )
+        opt_group.add_option(
+            '--sample-interval-seconds',
+            type=float,
+            default=60,
+            help='Time between samples of the topics. (Default is %default)'
+        )
+        opt_group.add_option(
+            '--retention-seconds',
+            type=int,
+            default=7 * 24 * 60 * 60,
+            help=(
+                'Samples older than this are removed from the index, it should '
+                'match the retention of the topics. (Default is %default)'
+            )
+        )
+        opt_group.add_option(
+            '--config-file',
+            help=(
+                'If set, will use the provided configuration file to setup '
+                'the data pipeline tools. '
+                '(Default is %default)'
+            ),
+            default='/nail/srv/configs/data_pipeline_tools.yaml'
+        )
+        opt_group.add_option(
+            '--env-config-file',
+            help=(
+                'If set, will use the provided configuration file as the env '
+                'overrides file to setup the data pipeline tools. '
+                '(Default is %default)'
+            ),
+            default=None
+        )
+        return opt_group
+
+    @batch_configure
+    def _configure_tools(self):
+        load_default_config(
+            self.options.config_file,
+            self.options.env_config_file
+        )
+        if not self.options.index_path:
+            self.option_parser.error("--index-path must be specified.")
+        if not self.options.topics and not self.options.namespace:
+            self.option_parser.error(
+                "At least one topic or a namespace must be specified."
+            )
+        self.kafka_client = KafkaClient(get_config().cluster_config.broker_list)
+
+    @batch_configure
+    def _configure_signals(self):
+        self._running = True
+
+        def handle_signal(signum, frame):
+            self._running = False
+        signal.signal(signal.SIGTERM, handle_signal)
+        signal.signal(signal.SIGINT, handle_signal)
+
+    def _get_topics(self):
+        topics = set(self.options.topics)
+        if self.options.namespace:
+            topics.update(
+                str(topic.name) for topic in get_schematizer().get_topics_by_criteria(
+                    namespace_name=self.options.namespace
+                )
+            )
+        return list(topics)
+
+    def sample(self, index):
+        """Adds the last message of each partition of the topics to the index,
+        and removes the samples older than the retention.
+        """
+        # Topics may have been created, or partitions moved, since the last
+        # sample.
+        self.kafka_client.load_metadata_for_topics()
+        topic_to_last_message_timestamps = get_last_message_timestamps(
+            self.kafka_client,
+            self._get_topics()
+        )
+        index.add_points([
+            TimestampOffsetPoint(topic, partition, timestamp, offset)
+            for topic, partition_to_last_message in
+            topic_to_last_message_timestamps.iteritems()
+            for partition, (offset, timestamp) in partition_to_last_message.iteritems()
+        ])
+        index.remove_points_before(time.time() - self.options.retention_seconds)
+
+    def run(self):
+        logger.info("Starting to index {0} into {1}".format(
+            self._get_topics(),
+            self.options.index_path
+        ))
+        with TimestampOffsetIndex(self.options.index_path) as index:
+            while self._running:
+                self.sample(index)
+                time.sleep(self.options.sample_interval_seconds)
+
+
+if __name__ == '__main__':
+    TimestampOffsetIndexer().start()
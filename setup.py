@@ -48,6 +48,7 @@ setup(
         'data-pipeline-avro-util>=0.2.1',
         'enum34>=1.0.4',
         'frozendict==0.5',
+        'futures>=3.0.3',
         'kafka-python>0.9.4,<1.0.0',
         'kafka-utils>0.3.3',
         'psutil==4.2.0',
@@ -97,7 +98,8 @@ setup(
         'bin/data_pipeline_refresh_manager',
         'bin/data_pipeline_refresh_job',
         'bin/data_pipeline_compaction_setter',
-        'bin/data_pipeline_introspector'
+        'bin/data_pipeline_introspector',
+        'bin/data_pipeline_timestamp_offset_indexer'
     ],
     classifiers=[
         'Development Status :: 2 - Pre-Alpha',
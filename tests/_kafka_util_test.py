@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+from collections import namedtuple
+
+import mock
+import pytest
+from kafka.common import ConsumerFetchSizeTooSmall
+from kafka.common import FetchResponse
+from kafka.common import Message
+from kafka.common import OffsetAndMessage
+
+from data_pipeline._kafka_util import get_first_offsets_at_or_after_timestamps
+from data_pipeline._kafka_util import get_last_message_timestamps
+from data_pipeline.timestamp_offset_index import TimestampOffsetIndex
+from data_pipeline.timestamp_offset_index import TimestampOffsetPoint
+
+
+PartitionOffsets = namedtuple('PartitionOffsets', ['highmark', 'lowmark'])
+
+
+class TestGetFirstOffsetsAtOrAfterTimestamps(object):
+
+    @pytest.fixture
+    def topic_to_partition_timestamps(self):
+        # Timestamps of the messages of each partition, indexed by offset
+        return {
+            'topic1': {
+                0: [10, 20, 20, 30, 40, 50, 60, 70],
+                1: [5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19, 20],
+            },
+            'topic2': {
+                0: [],
+                1: [100, 200],
+            },
+            'topic3': {
+                0: range(1000),
+            },
+        }
+
+    @pytest.fixture
+    def envelope(self):
+        envelope = mock.Mock()
+        envelope.unpack.side_effect = lambda value: {'timestamp': value}
+        return envelope
+
+    @pytest.fixture
+    def kafka_client(self, topic_to_partition_timestamps):
+        def send_fetch_request(payloads, **kwargs):
+            return [
+                FetchResponse(
+                    payload.topic,
+                    payload.partition,
+                    0,
+                    len(topic_to_partition_timestamps[payload.topic][payload.partition]),
+                    self._get_messages(
+                        topic_to_partition_timestamps[payload.topic][payload.partition],
+                        payload.offset
+                    )
+                ) for payload in payloads
+            ]
+
+        kafka_client = mock.Mock()
+        kafka_client.send_fetch_request.side_effect = send_fetch_request
+        return kafka_client
+
+    def _get_messages(self, timestamps, offset):
+        # Compressed message sets start before the fetched offset, and only
+        # a few messages fit in a fetch.
+        start = max(offset - 1, 0)
+        for message_offset in range(start, min(offset + 3, len(timestamps))):
+            yield OffsetAndMessage(
+                message_offset,
+                Message(0, 0, None, timestamps[message_offset])
+            )
+
+    @pytest.yield_fixture(autouse=True)
+    def mock_get_topics_watermarks(self, topic_to_partition_timestamps):
+        def get_topics_watermarks(kafka_client, topics, raise_on_error):
+            return {
+                topic: {
+                    partition: PartitionOffsets(highmark=len(timestamps), lowmark=0)
+                    for partition, timestamps in
+                    topic_to_partition_timestamps[topic].iteritems()
+                } for topic in topics
+            }
+
+        with mock.patch(
+            'data_pipeline._kafka_util.get_topics_watermarks',
+            side_effect=get_topics_watermarks
+        ) as mock_get_topics_watermarks:
+            yield mock_get_topics_watermarks
+
+    def test_get_offsets(self, kafka_client, envelope):
+        actual = get_first_offsets_at_or_after_timestamps(
+            kafka_client,
+            {'topic1': 20, 'topic2': 150},
+            envelope=envelope
+        )
+        assert actual == {
+            'topic1': {0: 1, 1: 15},
+            'topic2': {0: 0, 1: 1},
+        }
+
+    def test_timestamp_after_last_message(self, kafka_client, envelope):
+        actual = get_first_offsets_at_or_after_timestamps(
+            kafka_client,
+            {'topic1': 1000},
+            envelope=envelope
+        )
+        assert actual == {'topic1': {0: 8, 1: 16}}
+
+    def test_partitions_probed_in_one_request_per_step(self, kafka_client, envelope):
+        get_first_offsets_at_or_after_timestamps(
+            kafka_client,
+            {'topic1': 12, 'topic2': 150},
+            envelope=envelope
+        )
+        # The largest partition has 16 messages, so the search takes at
+        # most log2(16) + 1 steps.
+        assert kafka_client.send_fetch_request.call_count <= 5
+
+    def test_index_narrows_search_to_one_fetch(self, kafka_client, envelope):
+        with TimestampOffsetIndex(':memory:') as index:
+            index.add_points([
+                TimestampOffsetPoint('topic3', 0, timestamp=500, offset=500),
+                TimestampOffsetPoint('topic3', 0, timestamp=536, offset=536),
+                TimestampOffsetPoint('topic3', 0, timestamp=539, offset=539),
+                TimestampOffsetPoint('topic3', 0, timestamp=600, offset=600),
+            ])
+            actual = get_first_offsets_at_or_after_timestamps(
+                kafka_client,
+                {'topic3': 538},
+                envelope=envelope,
+                timestamp_offset_index=index
+            )
+        assert actual == {'topic3': {0: 538}}
+        assert kafka_client.send_fetch_request.call_count == 1
+
+    def test_index_outside_of_watermarks_ignored(self, kafka_client, envelope):
+        with TimestampOffsetIndex(':memory:') as index:
+            index.add_points([
+                TimestampOffsetPoint('topic1', 0, timestamp=5, offset=-10),
+                TimestampOffsetPoint('topic1', 0, timestamp=100, offset=1000),
+            ])
+            actual = get_first_offsets_at_or_after_timestamps(
+                kafka_client,
+                {'topic1': 20},
+                envelope=envelope,
+                timestamp_offset_index=index
+            )
+        assert actual == {'topic1': {0: 1, 1: 15}}
+
+    def test_get_last_message_timestamps(self, kafka_client, envelope):
+        actual = get_last_message_timestamps(
+            kafka_client,
+            ['topic1', 'topic2'],
+            envelope=envelope
+        )
+        assert actual == {
+            'topic1': {0: (7, 70), 1: (15, 20)},
+            'topic2': {1: (1, 200)},
+        }
+        assert kafka_client.send_fetch_request.call_count == 1
+
+    def test_fetch_size_doubled_when_too_small(
+        self,
+        kafka_client,
+        envelope,
+        topic_to_partition_timestamps
+    ):
+        fetch_sizes = []
+        send_fetch_request = kafka_client.send_fetch_request.side_effect
+
+        def send_fetch_request_too_small(payloads, **kwargs):
+            responses = send_fetch_request(payloads, **kwargs)
+            fetch_sizes.append(payloads[0].max_bytes)
+            if len(fetch_sizes) == 1:
+                return [response._replace(
+                    messages=self._raise_fetch_size_too_small()
+                ) for response in responses]
+            return responses
+
+        kafka_client.send_fetch_request.side_effect = send_fetch_request_too_small
+        actual = get_first_offsets_at_or_after_timestamps(
+            kafka_client,
+            {'topic2': 150},
+            envelope=envelope,
+            fetch_size_bytes=100
+        )
+        assert actual == {'topic2': {0: 0, 1: 1}}
+        assert fetch_sizes[:2] == [100, 200]
+
+    def _raise_fetch_size_too_small(self):
+        raise ConsumerFetchSizeTooSmall()
+        yield
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import threading
+import time
+
+import mock
+import pytest
+from kafka.common import ConsumerTimeout
+
+from data_pipeline._message_prefetcher import MessagePrefetcher
+
+
+TIMEOUT = 5
+
+
+class TestMessagePrefetcher(object):
+
+    @pytest.fixture
+    def batches(self):
+        return [[0, 1, 2], [3, 4, 5], [6, 7, 8]]
+
+    @pytest.fixture
+    def consumer(self, batches):
+        remaining_batches = list(batches)
+
+        def get_next_kafka_messages(max_count, **kwargs):
+            if not remaining_batches:
+                time.sleep(0.01)
+                raise ConsumerTimeout()
+            return remaining_batches.pop(0)
+
+        consumer = mock.Mock(client_name='test_consumer')
+        consumer._get_next_kafka_messages.side_effect = get_next_kafka_messages
+        consumer._create_messages.side_effect = lambda messages: messages
+        return consumer
+
+    @pytest.yield_fixture
+    def prefetcher(self, consumer):
+        prefetcher = MessagePrefetcher(consumer, queue_size=1, batch_size=3)
+        yield prefetcher
+        prefetcher.stop()
+
+    def _get_messages(self, prefetcher, count):
+        return prefetcher.get_messages(
+            count,
+            blocking=True,
+            max_time=time.time() + TIMEOUT
+        )
+
+    def test_messages_returned_in_order(self, prefetcher):
+        prefetcher.start()
+        assert self._get_messages(prefetcher, 2) == [0, 1]
+        assert self._get_messages(prefetcher, 5) == [2, 3, 4, 5, 6]
+        assert self._get_messages(prefetcher, 5) == [7, 8]
+
+    def test_rebalance_discards_prefetched_messages(self, prefetcher, consumer):
+        first_messages_returned = threading.Event()
+        rebalanced = threading.Event()
+        fetch_next_kafka_messages = consumer._get_next_kafka_messages.side_effect
+
+        def get_next_kafka_messages(max_count, **kwargs):
+            if consumer._get_next_kafka_messages.call_count == 3:
+                # Rebalances happen while fetching, in the prefetch thread
+                first_messages_returned.wait()
+                prefetcher.discard_prefetched_messages()
+                rebalanced.set()
+            return fetch_next_kafka_messages(max_count, **kwargs)
+
+        consumer._get_next_kafka_messages.side_effect = get_next_kafka_messages
+        prefetcher.start()
+        assert self._get_messages(prefetcher, 1) == [0]
+        first_messages_returned.set()
+        rebalanced.wait()
+        assert self._get_messages(prefetcher, 3) == [6, 7, 8]
+
+    def test_messages_unpacked_by_caller(self, consumer):
+        prefetcher = MessagePrefetcher(
+            consumer,
+            queue_size=1,
+            batch_size=3,
+            unpack_messages=False
+        )
+        prefetcher.start()
+        try:
+            assert self._get_messages(prefetcher, 3) == [0, 1, 2]
+        finally:
+            prefetcher.stop()
+        consumer._create_messages.assert_called_once_with([0, 1, 2])
+
+    def test_messages_created_by_given_function(self, consumer):
+        prefetcher = MessagePrefetcher(
+            consumer,
+            queue_size=1,
+            batch_size=3,
+            unpack_messages=False
+        )
+        prefetcher.start()
+        try:
+            assert prefetcher.get_messages(
+                2,
+                blocking=True,
+                max_time=time.time() + TIMEOUT,
+                create_messages=lambda messages: [-m for m in messages]
+            ) == [0, -1]
+        finally:
+            prefetcher.stop()
+        assert consumer._create_messages.call_count == 0
+
+    def test_fetch_retried_after_error(self, prefetcher, consumer):
+        fetch_next_kafka_messages = consumer._get_next_kafka_messages.side_effect
+
+        def get_next_kafka_messages(max_count, **kwargs):
+            if consumer._get_next_kafka_messages.call_count == 1:
+                raise ValueError()
+            return fetch_next_kafka_messages(max_count, **kwargs)
+
+        consumer._get_next_kafka_messages.side_effect = get_next_kafka_messages
+        prefetcher.start()
+        with pytest.raises(ValueError):
+            self._get_messages(prefetcher, 1)
+        assert self._get_messages(prefetcher, 3) == [0, 1, 2]
+
+    def test_fetch_error_raised(self, prefetcher, consumer):
+        consumer._get_next_kafka_messages.side_effect = ValueError()
+        prefetcher.start()
+        with pytest.raises(ValueError):
+            self._get_messages(prefetcher, 1)
+        with pytest.raises(ValueError):
+            self._get_messages(prefetcher, 1)
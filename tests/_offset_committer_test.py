@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import threading
+import time
+
+import mock
+import pytest
+from kafka.common import FailedPayloadsError
+
+from data_pipeline._offset_committer import OffsetCommitter
+
+
+TIMEOUT = 5
+
+
+class TestOffsetCommitter(object):
+
+    @pytest.fixture
+    def sent_offsets(self):
+        return []
+
+    @pytest.fixture
+    def consumer(self, sent_offsets):
+        def send_offsets(topic_to_partition_offset_map, kafka_client):
+            sent_offsets.append(dict(topic_to_partition_offset_map))
+
+        consumer = mock.Mock(client_name='test_consumer')
+        consumer._send_offsets.side_effect = send_offsets
+        return consumer
+
+    @pytest.yield_fixture(autouse=True)
+    def mock_kafka_client(self):
+        with mock.patch(
+            'data_pipeline._offset_committer.KafkaClient'
+        ) as mock_kafka_client:
+            yield mock_kafka_client
+
+    @pytest.yield_fixture
+    def committer(self, consumer):
+        committer = OffsetCommitter(
+            consumer,
+            flush_interval_seconds=TIMEOUT * 10,
+            flush_count=3
+        )
+        committer.start()
+        yield committer
+        committer.stop()
+
+    def test_offsets_coalesced(self, committer, sent_offsets):
+        committer.commit_offsets({'topic1': {0: 10, 1: 5}})
+        committer.commit_offsets({'topic1': {0: 8}, 'topic2': {0: 1}})
+        committer.commit_offsets({'topic1': {0: 12}})
+        committer.flush()
+        assert sent_offsets == [{'topic1': {0: 12, 1: 5}, 'topic2': {0: 1}}]
+
+    def test_flush_count_triggers_flush(self, committer, sent_offsets):
+        sent = threading.Event()
+        committer.consumer._send_offsets.side_effect = (
+            lambda offsets, kafka_client: sent.set()
+        )
+        committer.commit_offsets({'topic1': {0: 10, 1: 5}})
+        assert not sent.wait(0.1)
+        committer.commit_offsets({'topic1': {2: 3}})
+        assert sent.wait(TIMEOUT)
+
+    def test_flush_interval_triggers_flush(self, consumer, sent_offsets):
+        committer = OffsetCommitter(
+            consumer,
+            flush_interval_seconds=0.01,
+            flush_count=100
+        )
+        sent = threading.Event()
+        consumer._send_offsets.side_effect = (
+            lambda offsets, kafka_client: sent.set()
+        )
+        committer.start()
+        try:
+            committer.commit_offsets({'topic1': {0: 10}})
+            assert sent.wait(TIMEOUT)
+        finally:
+            committer.stop()
+
+    def test_stop_flushes_pending_offsets(self, committer, sent_offsets):
+        committer.commit_offsets({'topic1': {0: 10}})
+        committer.stop()
+        assert sent_offsets == [{'topic1': {0: 10}}]
+
+    def test_failed_offsets_sent_with_next_flush(self, committer, sent_offsets):
+        error = FailedPayloadsError("Network flake!")
+        committer.consumer._send_offsets.side_effect = [error, None]
+        committer.commit_offsets({'topic1': {0: 10}})
+        with pytest.raises(FailedPayloadsError):
+            committer.flush()
+
+        committer.commit_offsets({'topic1': {0: 8}})
+        committer.flush()
+        assert committer.consumer._send_offsets.call_args[0][0] == {
+            'topic1': {0: 10}
+        }
+
+    def test_failed_offsets_counted_towards_flush_count(
+        self,
+        committer,
+        sent_offsets
+    ):
+        error = FailedPayloadsError("Network flake!")
+        committer.consumer._send_offsets.side_effect = [error, None]
+        committer.commit_offsets({'topic1': {0: 10, 1: 5}})
+        with pytest.raises(FailedPayloadsError):
+            committer.flush()
+
+        committer.commit_offsets({'topic2': {0: 1}})
+        self._wait_for(lambda: committer.consumer._send_offsets.call_count == 2)
+        assert committer.consumer._send_offsets.call_args[0][0] == {
+            'topic1': {0: 10, 1: 5},
+            'topic2': {0: 1}
+        }
+
+    def test_background_error_raised_on_next_commit(self, committer):
+        error = FailedPayloadsError("Network flake!")
+        sent = threading.Event()
+
+        def send_offsets(offsets, kafka_client):
+            sent.set()
+            raise error
+
+        committer.consumer._send_offsets.side_effect = send_offsets
+        committer.commit_offsets({'topic1': {0: 10, 1: 5, 2: 3}})
+        assert sent.wait(TIMEOUT)
+        self._wait_for(lambda: committer._error is not None)
+
+        committer.consumer._send_offsets.side_effect = None
+        with pytest.raises(FailedPayloadsError):
+            committer.commit_offsets({})
+
+    def test_pending_offsets_sent_by_flush_after_background_error(
+        self,
+        committer,
+        sent_offsets
+    ):
+        error = FailedPayloadsError("Network flake!")
+        sent = threading.Event()
+
+        def send_offsets(offsets, kafka_client):
+            sent.set()
+            raise error
+
+        committer.consumer._send_offsets.side_effect = send_offsets
+        committer.commit_offsets({'topic1': {0: 10, 1: 5, 2: 3}})
+        assert sent.wait(TIMEOUT)
+        self._wait_for(lambda: committer._error is not None)
+
+        committer.consumer._send_offsets.side_effect = None
+        with pytest.raises(FailedPayloadsError):
+            committer.flush()
+        assert committer.consumer._send_offsets.call_args[0][0] == {
+            'topic1': {0: 10, 1: 5, 2: 3}
+        }
+        assert committer._error is None
+
+    def _wait_for(self, condition):
+        deadline = time.time() + TIMEOUT
+        while not condition() and time.time() < deadline:
+            time.sleep(0.01)
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import pytest
+
+from data_pipeline._payload_decode_pool import PayloadDecodePool
+from data_pipeline.message import CreateMessage
+from data_pipeline.message import UpdateMessage
+
+
+@pytest.mark.usefixtures("containers")
+class TestPayloadDecodePool(object):
+
+    @pytest.yield_fixture
+    def decode_pool(self, registered_schema):
+        schema_id = registered_schema.schema_id
+        decode_pool = PayloadDecodePool(
+            processes=2,
+            reader_and_writer_schema_ids=[(schema_id, schema_id)]
+        )
+        yield decode_pool
+        decode_pool.close()
+
+    @pytest.fixture
+    def messages(self, registered_schema, payload, previous_payload):
+        messages = []
+        for i in range(PayloadDecodePool.MIN_CHUNK_SIZE * 3):
+            if i % 2:
+                messages.append(CreateMessage(
+                    schema_id=registered_schema.schema_id,
+                    payload=payload
+                ))
+            else:
+                messages.append(UpdateMessage(
+                    schema_id=registered_schema.schema_id,
+                    payload=previous_payload,
+                    previous_payload=payload
+                ))
+        return messages
+
+    def test_decode_messages(
+        self,
+        decode_pool,
+        messages,
+        example_payload_data,
+        example_previous_payload_data
+    ):
+        decode_pool.decode_messages(messages)
+
+        for i, message in enumerate(messages):
+            # The payload data is already set, so accessing it doesn't decode
+            # the payload in this process.
+            assert all(
+                avro_payload._payload_data is not None
+                for avro_payload in message._avro_payloads
+            )
+            if i % 2:
+                assert message.payload_data == example_payload_data
+            else:
+                assert message.payload_data == example_previous_payload_data
+                assert message.previous_payload_data == example_payload_data
+
+    def test_decode_few_messages_in_process(
+        self,
+        decode_pool,
+        messages,
+        example_payload_data
+    ):
+        decode_pool.pool.close()
+        messages = messages[1:2]
+
+        decode_pool.decode_messages(messages)
+
+        assert messages[0]._avro_payload._payload_data == example_payload_data
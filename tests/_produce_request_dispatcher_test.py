@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import mock
+import pytest
+from kafka.common import BrokerMetadata
+from kafka.common import ConnectionError
+from kafka.common import FailedPayloadsError
+from kafka.common import LeaderNotAvailableError
+from kafka.common import ProduceRequest
+from kafka.common import ProduceResponse
+
+from data_pipeline._produce_request_dispatcher import ProduceRequestDispatcher
+
+
+class TestProduceRequestDispatcher(object):
+
+    @property
+    def brokers(self):
+        return [
+            BrokerMetadata(nodeId=i, host=str('broker_{}'.format(i)), port=9092)
+            for i in range(3)
+        ]
+
+    @property
+    def requests(self):
+        return [
+            ProduceRequest(str('topic_{}'.format(i)), 0, [])
+            for i in range(6)
+        ]
+
+    @pytest.fixture
+    def kafka_client(self):
+        client = mock.Mock(client_id=str('test_client'), timeout=10)
+        client._get_leader_for_partition.side_effect = (
+            lambda topic, partition: self.brokers[int(topic[-1]) % 3]
+        )
+        return client
+
+    @pytest.yield_fixture
+    def dispatcher(self, kafka_client):
+        dispatcher = ProduceRequestDispatcher(kafka_client, thread_count=4)
+        yield dispatcher
+        dispatcher.close()
+
+    @pytest.yield_fixture
+    def patch_protocol(self):
+        # Encoded requests are the payloads themselves, so that the mocked
+        # connections can build the responses from them.
+        with mock.patch(
+            'data_pipeline._produce_request_dispatcher.KafkaProtocol'
+        ) as mock_protocol:
+            mock_protocol.encode_produce_request.side_effect = (
+                lambda payloads, **kwargs: payloads
+            )
+            mock_protocol.decode_produce_response.side_effect = lambda data: data
+            yield mock_protocol
+
+    @pytest.yield_fixture
+    def patch_connection(self, patch_protocol):
+        with mock.patch(
+            'data_pipeline._produce_request_dispatcher.KafkaConnection'
+        ) as mock_connection_class:
+            mock_connection_class.side_effect = self._create_connection
+            yield mock_connection_class
+
+    def _create_connection(self, host, port, timeout):
+        sent = {}
+        connection = mock.Mock(host=host)
+
+        def send(request_id, requests):
+            if host == 'broker_1':
+                raise ConnectionError()
+            sent[request_id] = requests
+
+        connection.send.side_effect = send
+        connection.recv.side_effect = lambda request_id: [
+            ProduceResponse(r.topic, r.partition, 0, 10) for r in sent[request_id]
+        ]
+        return connection
+
+    @pytest.mark.usefixtures('patch_connection')
+    def test_requests_grouped_by_leader(self, dispatcher, patch_protocol):
+        dispatcher.send_produce_requests(self.requests, acks=1)
+
+        sent_topics = sorted(
+            [r.topic for r in call[1]['payloads']]
+            for call in patch_protocol.encode_produce_request.call_args_list
+        )
+        assert sent_topics == [
+            ['topic_0', 'topic_3'],
+            ['topic_1', 'topic_4'],
+            ['topic_2', 'topic_5']
+        ]
+
+    @pytest.mark.usefixtures('patch_connection')
+    def test_broker_failure_only_fails_its_requests(self, dispatcher, kafka_client):
+        responses = dispatcher.send_produce_requests(self.requests, acks=1)
+
+        failed_topics = sorted(
+            r.payload.topic for r in responses
+            if isinstance(r, FailedPayloadsError)
+        )
+        succeeded_topics = sorted(
+            r.topic for r in responses if isinstance(r, ProduceResponse)
+        )
+        assert failed_topics == ['topic_1', 'topic_4']
+        assert succeeded_topics == ['topic_0', 'topic_2', 'topic_3', 'topic_5']
+        kafka_client.reset_topic_metadata.assert_called_once_with(
+            'topic_1',
+            'topic_4'
+        )
+
+    @pytest.mark.usefixtures('patch_connection')
+    def test_requests_without_leader_are_not_sent(self, dispatcher, kafka_client):
+        def get_leader(topic, partition):
+            if topic == 'topic_0':
+                raise LeaderNotAvailableError()
+            return self.brokers[0]
+        kafka_client._get_leader_for_partition.side_effect = get_leader
+
+        responses = dispatcher.send_produce_requests(self.requests, acks=1)
+
+        assert sorted(r.topic for r in responses) == [
+            'topic_{}'.format(i) for i in range(1, 6)
+        ]
+
+    @pytest.mark.usefixtures('patch_connection')
+    def test_no_response_without_acks(self, dispatcher):
+        # The topics led by broker_1, whose sends fail, are left out
+        requests = [
+            r for r in self.requests if r.topic not in ('topic_1', 'topic_4')
+        ]
+        assert dispatcher.send_produce_requests(requests, acks=0) == []
+
+    def test_connections_closed(self, dispatcher, patch_connection):
+        dispatcher.send_produce_requests(self.requests, acks=1)
+        connections = [
+            connection for connection in dispatcher._broker_connections.values()
+        ]
+        dispatcher.close()
+
+        assert len(connections) == 2
+        assert all(c.close.call_count == 1 for c in connections)
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import threading
+import time
+
+import mock
+import pytest
+
+from data_pipeline.async_producer import AsyncProducer
+from data_pipeline.expected_frequency import ExpectedFrequency
+from data_pipeline.message import CreateMessage
+from data_pipeline.testing_helpers.kafka_docker import capture_new_data_pipeline_messages
+
+
+@pytest.mark.usefixtures(
+    "configure_teams",
+    "patch_monitor_init_start_time_to_now"
+)
+class TestAsyncProducer(object):
+
+    @pytest.yield_fixture
+    def patch_monitor_init_start_time_to_now(self):
+        with mock.patch(
+            'data_pipeline.client._Monitor.get_monitor_window_start_timestamp',
+            return_value=int(time.time())
+        ) as patched_start_time:
+            yield patched_start_time
+
+    @pytest.fixture(scope="module", autouse=True)
+    def topic(self, registered_schema, containers):
+        topic_name = str(registered_schema.topic.name)
+        containers.create_kafka_topic(topic_name)
+        return topic_name
+
+    @pytest.yield_fixture
+    def async_producer(self, containers, team_name):
+        with AsyncProducer(
+            producer_name='producer_1',
+            team_name=team_name,
+            expected_frequency_seconds=ExpectedFrequency.constantly
+        ) as async_producer:
+            yield async_producer
+
+    @pytest.fixture
+    def messages(self, registered_schema, payload):
+        return [
+            CreateMessage(schema_id=registered_schema.schema_id, payload=payload)
+            for _ in range(5)
+        ]
+
+    def test_publish_and_flush(self, async_producer, messages):
+        with capture_new_data_pipeline_messages(messages[0].topic) as get_messages:
+            publish_futures = [
+                async_producer.publish(message) for message in messages
+            ]
+            async_producer.flush().result()
+
+            assert all(future.done() for future in publish_futures)
+            published_messages = get_messages()
+            assert [m.payload for m in published_messages] == [
+                m.payload for m in messages
+            ]
+
+    def test_publish_messages(self, async_producer, messages):
+        with capture_new_data_pipeline_messages(messages[0].topic) as get_messages:
+            async_producer.publish_messages(messages)
+            position_data = async_producer.get_checkpoint_position_data()
+            async_producer.flush().result()
+
+            assert position_data.result() is not None
+            assert len(get_messages()) == len(messages)
+
+    def test_calls_run_in_a_single_thread(self, async_producer, messages):
+        publish_threads = set()
+        real_publish = async_producer.producer.publish
+
+        def publish(message, timestamp=None):
+            publish_threads.add(threading.current_thread())
+            return real_publish(message, timestamp=timestamp)
+
+        with mock.patch.object(async_producer.producer, 'publish', side_effect=publish):
+            async_producer.publish_messages(messages)
+            async_producer.flush().result()
+
+        assert len(publish_threads) == 1
+        assert threading.current_thread() not in publish_threads
+
+    def test_error_raised_from_future(self, async_producer, messages):
+        with mock.patch.object(
+            async_producer.producer,
+            'flush',
+            side_effect=ValueError()
+        ):
+            with pytest.raises(ValueError):
+                async_producer.flush().result()
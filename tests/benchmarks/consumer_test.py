@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+from uuid import uuid4
+
+import pytest
+
+from data_pipeline.consumer import Consumer
+from data_pipeline.expected_frequency import ExpectedFrequency
+from data_pipeline.producer import Producer
+from data_pipeline.schematizer_clientlib.schematizer import _Cache
+
+
+@pytest.mark.usefixtures(
+    "configure_teams",
+    "config_containers_connections"
+)
+@pytest.mark.benchmark
+class TestBenchConsumer(object):
+
+    message_count = 1000
+    startup_topic_counts = [1, 10, 50]
+
+    @pytest.fixture
+    def topic(self, registered_schema):
+        return str(registered_schema.topic.name)
+
+    @pytest.yield_fixture
+    def dp_producer(self, team_name):
+        with Producer(
+            producer_name='producer_1',
+            team_name=team_name,
+            expected_frequency_seconds=ExpectedFrequency.constantly,
+            use_work_pool=False
+        ) as producer:
+            yield producer
+
+    @pytest.yield_fixture
+    def dp_consumer(self, team_name, topic):
+        with Consumer(
+            consumer_name='consumer_1',
+            team_name=team_name,
+            expected_frequency_seconds=ExpectedFrequency.constantly,
+            topic_to_consumer_topic_state_map={topic: None},
+            auto_offset_reset='largest'
+        ) as consumer:
+            yield consumer
+
+    @pytest.mark.parametrize('batch_size', [1, message_count])
+    def test_get_messages(
+        self,
+        benchmark,
+        dp_producer,
+        dp_consumer,
+        message,
+        batch_size
+    ):
+        # A batch size of 1 consumes the messages one by one, as
+        # `get_message` does, for comparison with the bulk fetch path.
+
+        def setup():
+            for _ in range(self.message_count):
+                dp_producer.publish(message)
+            dp_producer.flush()
+
+        def consume_messages():
+            messages = []
+            while len(messages) < self.message_count:
+                messages.extend(dp_consumer.get_messages(
+                    count=batch_size,
+                    blocking=True,
+                    timeout=10
+                ))
+            return messages
+
+        benchmark.pedantic(consume_messages, setup=setup, rounds=10)
+
+    @pytest.mark.parametrize('unpack_header', [False, True])
+    def test_get_raw_messages(
+        self,
+        benchmark,
+        dp_producer,
+        dp_consumer,
+        message,
+        unpack_header
+    ):
+        # Compared with test_get_messages, this is the cost of fetching the
+        # messages alone.
+
+        def setup():
+            for _ in range(self.message_count):
+                dp_producer.publish(message)
+            dp_producer.flush()
+
+        def consume_raw_messages():
+            messages = []
+            while len(messages) < self.message_count:
+                messages.extend(dp_consumer.get_raw_messages(
+                    count=self.message_count,
+                    blocking=True,
+                    timeout=10,
+                    unpack_header=unpack_header
+                ))
+            return messages
+
+        benchmark.pedantic(consume_raw_messages, setup=setup, rounds=10)
+
+    @pytest.fixture(scope='class')
+    def topics(self, containers, schematizer_client, example_schema, namespace):
+        # Each source of the namespace has its own topic.
+        topics = []
+        for _ in range(max(self.startup_topic_counts)):
+            topic = str(schematizer_client.register_schema(
+                namespace=namespace,
+                source='startup_source_{}'.format(uuid4()),
+                schema_str=example_schema,
+                source_owner_email='test@yelp.com',
+                contains_pii=False
+            ).topic.name)
+            containers.create_kafka_topic(topic)
+            topics.append(topic)
+        return topics
+
+    @pytest.mark.parametrize('topic_count', startup_topic_counts)
+    def test_startup(
+        self,
+        benchmark,
+        team_name,
+        schematizer_client,
+        topics,
+        topic_count
+    ):
+        def setup():
+            consumer = Consumer(
+                consumer_name='consumer_startup_{}'.format(topic_count),
+                team_name=team_name,
+                expected_frequency_seconds=ExpectedFrequency.constantly,
+                topic_to_consumer_topic_state_map={
+                    topic: None for topic in topics[:topic_count]
+                },
+                auto_offset_reset='largest'
+            )
+            # Each round starts from a cold schematizer cache, like a newly
+            # started process.
+            schematizer_client._cache = _Cache()
+            return (consumer,), {}
+
+        def start_consumer(consumer):
+            consumer.start()
+            consumer.stop()
+
+        benchmark.pedantic(start_consumer, setup=setup, rounds=5)
@@ -20,10 +20,15 @@ import time
 
 import mock
 import pytest
+import simplejson
 
+from data_pipeline.async_producer import AsyncProducer
 from data_pipeline.expected_frequency import ExpectedFrequency
+from data_pipeline.message import CreateMessage
 from data_pipeline.producer import Producer
+from data_pipeline.schematizer_clientlib.schematizer import get_schematizer
 from tests.factories.base_factory import MessageFactory
+from tests.helpers.config import reconfigure
 
 
 @pytest.mark.usefixtures(
@@ -62,3 +67,132 @@ class TestBenchProducer(object):
         #
         # Perform 2000 rounds to ensure 20 flushes.
         benchmark.pedantic(dp_producer.publish, setup=setup, rounds=2000)
+
+    @pytest.mark.parametrize('use_work_pool', [False, True])
+    def test_publish_to_kafka_latency_with_auto_flush(
+        self,
+        benchmark,
+        team_name,
+        use_work_pool
+    ):
+        flush_time_limit = 0.1
+        message_count = 200
+        publish_times = {}
+        published_times = {}
+
+        def record_published(position_data):
+            position_info = position_data.last_published_message_position_info
+            if position_info is None:
+                return
+            now = time.time()
+            for index in range(position_info['index'] + 1):
+                published_times.setdefault(index, now)
+
+        def publish_slowly():
+            with reconfigure(
+                kafka_producer_flush_time_limit_seconds=flush_time_limit
+            ), Producer(
+                producer_name='producer_1',
+                team_name=team_name,
+                expected_frequency_seconds=ExpectedFrequency.constantly,
+                use_work_pool=use_work_pool,
+                position_data_callback=record_published,
+                auto_flush=True
+            ) as producer:
+                for index in range(message_count):
+                    message = MessageFactory.create_message_with_payload_data()
+                    message.upstream_position_info = {'index': index}
+                    publish_times[index] = time.time()
+                    producer.publish(message)
+                    # Low volume producer: messages trickle in without the
+                    # caller ever calling wake.
+                    time.sleep(0.01)
+                time.sleep(flush_time_limit * 5)
+
+        benchmark.pedantic(publish_slowly, rounds=1)
+
+        latencies = sorted(
+            published_times[index] - publish_times[index]
+            for index in range(message_count)
+        )
+        p99_latency = latencies[int(len(latencies) * 0.99) - 1]
+        benchmark.extra_info['p99_publish_to_kafka_latency_seconds'] = p99_latency
+        # A message should never wait much longer than the flush time limit
+        # plus the time it takes to actually publish the batch.
+        assert p99_latency < flush_time_limit * 3
+
+    @pytest.fixture(scope='class')
+    def string_schema_id(self):
+        return get_schematizer().register_schema(
+            schema_str=simplejson.dumps({
+                'type': 'record',
+                'namespace': 'test_namespace',
+                'doc': 'test_doc',
+                'name': 'string_payload',
+                'fields': [{'type': 'string', 'name': 'data', 'doc': 'test_doc'}]
+            }),
+            namespace='test_namespace',
+            source='string_payload_source',
+            source_owner_email='test@yelp.com',
+            contains_pii=False
+        ).schema_id
+
+    @pytest.mark.parametrize('payload_size', [10, 1000, 100000])
+    @pytest.mark.parametrize('use_work_pool', [False, True])
+    def test_publish_and_flush_by_payload_size(
+        self,
+        benchmark,
+        team_name,
+        string_schema_id,
+        payload_size,
+        use_work_pool
+    ):
+        message_count = 1000
+        payload_data = {'data': 'x' * payload_size}
+
+        def setup():
+            messages = [
+                CreateMessage(schema_id=string_schema_id, payload_data=payload_data)
+                for _ in range(message_count)
+            ]
+            return [messages], {}
+
+        with Producer(
+            producer_name='producer_1',
+            team_name=team_name,
+            expected_frequency_seconds=ExpectedFrequency.constantly,
+            use_work_pool=use_work_pool,
+            schema_id_list=[string_schema_id]
+        ) as producer:
+
+            def publish_and_flush(messages):
+                for message in messages:
+                    producer.publish(message)
+                producer.flush()
+
+            benchmark.pedantic(publish_and_flush, setup=setup, rounds=10)
+
+    def test_async_publish_and_flush(self, benchmark, team_name):
+        message_count = 1000
+
+        def setup():
+            messages = [
+                MessageFactory.create_message_with_payload_data()
+                for _ in range(message_count)
+            ]
+            return [messages], {}
+
+        with AsyncProducer(
+            producer_name='producer_1',
+            team_name=team_name,
+            expected_frequency_seconds=ExpectedFrequency.constantly
+        ) as producer:
+
+            def publish_and_flush(messages):
+                publish_futures = [
+                    producer.publish(message) for message in messages
+                ]
+                producer.flush().result()
+                assert all(future.done() for future in publish_futures)
+
+            benchmark.pedantic(publish_and_flush, setup=setup, rounds=10)
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import threading
+import time
+
+import mock
+import pytest
+
+from data_pipeline.config import get_config
+from data_pipeline.schematizer_clientlib.schematizer import _Cache
+from tests.helpers.config import reconfigure
+from tests.helpers.fake_schematizer import FakeSchematizer
+
+
+@pytest.mark.usefixtures(
+    "config_containers_connections"
+)
+@pytest.mark.benchmark
+class TestBenchSchematizer(object):
+
+    @pytest.mark.parametrize('thread_count', [1, 10, 50])
+    def test_get_schema_by_id_miss_storm(
+        self,
+        benchmark,
+        schematizer_client,
+        registered_schema,
+        thread_count
+    ):
+        # All the threads see a schema missing from the cache at the same
+        # time, like the threads of a consumer when a new schema is rolled out.
+
+        def setup():
+            schematizer_client._cache = _Cache()
+            start = threading.Event()
+            threads = [
+                threading.Thread(
+                    target=get_schema_by_id,
+                    args=(start, registered_schema.schema_id)
+                ) for _ in range(thread_count)
+            ]
+            for thread in threads:
+                thread.start()
+            return (start, threads), {}
+
+        def get_schema_by_id(start, schema_id):
+            start.wait()
+            schematizer_client.get_schema_by_id(schema_id)
+
+        def miss_storm(start, threads):
+            start.set()
+            for thread in threads:
+                thread.join()
+
+        benchmark.pedantic(miss_storm, setup=setup, rounds=20)
+
+    @pytest.mark.parametrize('concurrent_requests', [1, 8])
+    def test_get_all_schemas_paginated(
+        self,
+        benchmark,
+        schematizer_client,
+        registered_schema,
+        concurrent_requests
+    ):
+        with reconfigure(
+            schematizer_client_max_concurrent_requests=concurrent_requests
+        ):
+            benchmark(
+                schematizer_client.get_schemas_created_after_date,
+                created_after=0,
+                page_size=10
+            )
+
+    @pytest.mark.parametrize(
+        'topics_listed',
+        [False, True],
+        ids=['uncached', 'listed']
+    )
+    def test_filter_topics_by_pkeys(
+        self,
+        benchmark,
+        schematizer_client,
+        registered_schema,
+        topics_listed
+    ):
+        # The compaction setter filters all the topics of the schematizer,
+        # which it has listed beforehand.
+        topic = schematizer_client._get_topic_by_name(registered_schema.topic.name)
+        topic_names = ['bench_topic_{}'.format(i) for i in range(10000)]
+
+        def setup():
+            schematizer_client._cache = _Cache()
+            if topics_listed:
+                for topic_name in topic_names:
+                    topic.name = topic_name
+                    schematizer_client._set_cache_by_topic(topic)
+            return (topic_names,), {}
+
+        def get_latest_schema_by_topic_name(topic_name):
+            # Round trip to the schematizer
+            time.sleep(0.001)
+            return registered_schema
+
+        with mock.patch.object(
+            schematizer_client,
+            'get_latest_schema_by_topic_name',
+            side_effect=get_latest_schema_by_topic_name
+        ):
+            benchmark.pedantic(
+                schematizer_client.filter_topics_by_pkeys,
+                setup=setup,
+                rounds=5
+            )
+
+
+@pytest.mark.benchmark
+class TestBenchSchematizerClientTransport(object):
+    """Measures the overhead of the schematizer client against a local
+    stand-in schematizer, so that the latency of an actual schematizer
+    doesn't drown it.
+    """
+
+    @pytest.yield_fixture
+    def fake_schematizer(self):
+        with FakeSchematizer() as fake_schematizer, reconfigure(
+            schematizer_host_and_port=fake_schematizer.host_and_port
+        ):
+            yield fake_schematizer
+
+    @pytest.yield_fixture(params=[False, True], ids=['downloaded', 'cached'])
+    def spec_path_config(self, request, fake_schematizer, tmpdir):
+        if not request.param:
+            yield
+            return
+        spec_path = str(tmpdir.join('swagger.json'))
+        with reconfigure(schematizer_client_swagger_spec_path=spec_path):
+            # Saves the spec before the measurements
+            get_config().schematizer_client
+            yield
+
+    def test_cold_start(self, benchmark, spec_path_config):
+        benchmark(lambda: get_config().schematizer_client)
+
+    @pytest.mark.parametrize('thread_count', [1, 10])
+    def test_steady_state_request(
+        self,
+        benchmark,
+        fake_schematizer,
+        thread_count
+    ):
+        client = get_config().schematizer_client
+
+        def get_schemas():
+            threads = [
+                threading.Thread(
+                    target=lambda: client.schemas.get_schema_by_id(
+                        schema_id=1
+                    ).result()
+                ) for _ in range(thread_count)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        # Opens the connections before the measurements
+        get_schemas()
+        benchmark(get_schemas)
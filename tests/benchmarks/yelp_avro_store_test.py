@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import gc
+
+import pytest
+
+from data_pipeline.helpers.yelp_avro_store import _AvroStringCache
+from data_pipeline.helpers.yelp_avro_store import _AvroStringStore
+from tests.helpers.config import reconfigure
+
+
+SCHEMA_VERSION_COUNT = 10000
+
+
+@pytest.mark.benchmark
+class TestBenchAvroStringStore(object):
+
+    @pytest.fixture(scope='class')
+    def schema_versions(self):
+        # Versions of a schema evolving one field at a time, like the schemas
+        # of a table altered often.
+        return [
+            {
+                'type': 'record',
+                'name': 'bench_record',
+                'namespace': 'bench_namespace',
+                'fields': [
+                    {'type': 'int', 'name': 'id'},
+                    {'type': ['null', 'string'], 'name': 'name', 'default': None},
+                    {'type': ['null', 'int'], 'name': 'field_{}'.format(version), 'default': None}
+                ]
+            } for version in range(SCHEMA_VERSION_COUNT)
+        ]
+
+    @pytest.mark.parametrize('max_size', [100, SCHEMA_VERSION_COUNT])
+    def test_readers_of_schema_versions(
+        self,
+        benchmark,
+        schema_versions,
+        max_size
+    ):
+        # Creates the readers of all the versions, and reports the number of
+        # objects the store retains once done, its steady state footprint.
+        store = _AvroStringStore()
+        retained_object_counts = []
+
+        def setup():
+            store._reader_cache = _AvroStringCache()
+            gc.collect()
+            return (len(gc.get_objects()),), {}
+
+        def get_readers(initial_object_count):
+            # Negative ids, to not collide with the ids of registered schemas
+            for schema_id, schema in enumerate(schema_versions, start=-SCHEMA_VERSION_COUNT):
+                store.get_reader(schema_id, schema_id, schema, schema)
+            gc.collect()
+            retained_object_counts.append(len(gc.get_objects()) - initial_object_count)
+
+        with reconfigure(avro_string_store_cache_max_size=max_size):
+            benchmark.pedantic(get_readers, setup=setup, rounds=3)
+        store._reader_cache = _AvroStringCache()
+        benchmark.extra_info['cached_reader_count'] = min(max_size, SCHEMA_VERSION_COUNT)
+        benchmark.extra_info['retained_object_count'] = max(retained_object_counts)
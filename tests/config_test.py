@@ -16,12 +16,15 @@
 from __future__ import absolute_import
 from __future__ import unicode_literals
 
+import os
+
 import pytest
 import staticconf
 
 from data_pipeline.config import get_config
 from data_pipeline.environment_configs import IS_OPEN_SOURCE_MODE
 from tests.helpers.config import reconfigure
+from tests.helpers.fake_schematizer import FakeSchematizer
 
 
 class TestConfigBase(object):
@@ -69,6 +72,45 @@ class TestConfigDefaults(TestConfigBase):
     def test_consumer_get_messages_timeout_default(self, config):
         assert config.consumer_get_messages_timeout_default == 0.1
 
+    def test_consumer_prefetch_batch_size(self, config):
+        assert config.consumer_prefetch_batch_size == 500
+
+    def test_consumer_commit_flush_interval_seconds(self, config):
+        assert config.consumer_commit_flush_interval_seconds == 1.0
+
+    def test_consumer_commit_flush_count(self, config):
+        assert config.consumer_commit_flush_count == 1000
+
+    def test_consumer_topic_lookup_pool_size(self, config):
+        assert config.consumer_topic_lookup_pool_size == 8
+
+    def test_schematizer_client_max_concurrent_requests(self, config):
+        assert config.schematizer_client_max_concurrent_requests == 8
+
+    def test_schematizer_client_connection_pool_size(self, config):
+        assert config.schematizer_client_connection_pool_size == 10
+
+    def test_schematizer_client_swagger_spec_path(self, config):
+        assert config.schematizer_client_swagger_spec_path is None
+
+    def test_schematizer_client_not_found_cache_ttl_seconds(self, config):
+        assert config.schematizer_client_not_found_cache_ttl_seconds == 60
+
+    def test_schematizer_client_not_found_cache_max_size(self, config):
+        assert config.schematizer_client_not_found_cache_max_size == 10000
+
+    def test_schematizer_client_cache_snapshot_path(self, config):
+        assert config.schematizer_client_cache_snapshot_path is None
+
+    def test_avro_string_store_cache_max_size(self, config):
+        assert config.avro_string_store_cache_max_size == 5000
+
+    def test_catalog_mirror_path(self, config):
+        assert config.catalog_mirror_path is None
+
+    def test_catalog_mirror_sync_interval_seconds(self, config):
+        assert config.catalog_mirror_sync_interval_seconds == 60
+
     def test_consumer_partitioner_cooldown_default(self, config):
         assert config.consumer_partitioner_cooldown_default == 0.5
 
@@ -105,6 +147,12 @@ class TestConfigDefaults(TestConfigBase):
     def test_kafka_producer_flush_time_limit_seconds(self, config):
         assert config.kafka_producer_flush_time_limit_seconds == 0.1
 
+    def test_kafka_producer_position_callback_max_delay_seconds(self, config):
+        assert config.kafka_producer_position_callback_max_delay_seconds == 10.0
+
+    def test_kafka_producer_dispatch_thread_count(self, config):
+        assert config.kafka_producer_dispatch_thread_count == 1
+
     def test_skip_position_info_update_when_not_set(self, config):
         assert not config.skip_position_info_update_when_not_set
 
@@ -199,6 +247,58 @@ class TestConfigurationOverrides(TestConfigBase):
         with reconfigure(consumer_get_messages_timeout_default=10.0):
             assert config.consumer_get_messages_timeout_default == 10.0
 
+    def test_consumer_prefetch_batch_size(self, config):
+        with reconfigure(consumer_prefetch_batch_size=10):
+            assert config.consumer_prefetch_batch_size == 10
+
+    def test_consumer_commit_flush_interval_seconds(self, config):
+        with reconfigure(consumer_commit_flush_interval_seconds=5.0):
+            assert config.consumer_commit_flush_interval_seconds == 5.0
+
+    def test_consumer_commit_flush_count(self, config):
+        with reconfigure(consumer_commit_flush_count=10):
+            assert config.consumer_commit_flush_count == 10
+
+    def test_consumer_topic_lookup_pool_size(self, config):
+        with reconfigure(consumer_topic_lookup_pool_size=2):
+            assert config.consumer_topic_lookup_pool_size == 2
+
+    def test_schematizer_client_max_concurrent_requests(self, config):
+        with reconfigure(schematizer_client_max_concurrent_requests=2):
+            assert config.schematizer_client_max_concurrent_requests == 2
+
+    def test_schematizer_client_connection_pool_size(self, config):
+        with reconfigure(schematizer_client_connection_pool_size=2):
+            assert config.schematizer_client_connection_pool_size == 2
+
+    def test_schematizer_client_swagger_spec_path(self, config):
+        with reconfigure(schematizer_client_swagger_spec_path='swagger.json'):
+            assert config.schematizer_client_swagger_spec_path == 'swagger.json'
+
+    def test_schematizer_client_not_found_cache_ttl_seconds(self, config):
+        with reconfigure(schematizer_client_not_found_cache_ttl_seconds=5.0):
+            assert config.schematizer_client_not_found_cache_ttl_seconds == 5.0
+
+    def test_schematizer_client_not_found_cache_max_size(self, config):
+        with reconfigure(schematizer_client_not_found_cache_max_size=10):
+            assert config.schematizer_client_not_found_cache_max_size == 10
+
+    def test_schematizer_client_cache_snapshot_path(self, config):
+        with reconfigure(schematizer_client_cache_snapshot_path='/some/path'):
+            assert config.schematizer_client_cache_snapshot_path == '/some/path'
+
+    def test_avro_string_store_cache_max_size(self, config):
+        with reconfigure(avro_string_store_cache_max_size=10):
+            assert config.avro_string_store_cache_max_size == 10
+
+    def test_catalog_mirror_path(self, config):
+        with reconfigure(catalog_mirror_path='/some/path'):
+            assert config.catalog_mirror_path == '/some/path'
+
+    def test_catalog_mirror_sync_interval_seconds(self, config):
+        with reconfigure(catalog_mirror_sync_interval_seconds=5.0):
+            assert config.catalog_mirror_sync_interval_seconds == 5.0
+
     def test_consumer_partitioner_cooldown_default(self, config):
         with reconfigure(consumer_partitioner_cooldown_default=10.0):
             assert config.consumer_partitioner_cooldown_default == 10.0
@@ -239,6 +339,14 @@ class TestConfigurationOverrides(TestConfigBase):
         with reconfigure(kafka_producer_flush_time_limit_seconds=3.2):
             assert config.kafka_producer_flush_time_limit_seconds == 3.2
 
+    def test_kafka_producer_position_callback_max_delay_seconds(self, config):
+        with reconfigure(kafka_producer_position_callback_max_delay_seconds=1.5):
+            assert config.kafka_producer_position_callback_max_delay_seconds == 1.5
+
+    def test_kafka_producer_dispatch_thread_count(self, config):
+        with reconfigure(kafka_producer_dispatch_thread_count=4):
+            assert config.kafka_producer_dispatch_thread_count == 4
+
     def test_skip_position_info_update_when_not_set(self, config):
         with reconfigure(skip_position_info_update_when_not_set=True):
             assert config.skip_position_info_update_when_not_set
@@ -250,3 +358,50 @@ class TestConfigurationOverrides(TestConfigBase):
     def test_force_recovery_from_publication_unensurable_error(self, config):
         with reconfigure(force_recovery_from_publication_unensurable_error=True):
             assert config.force_recovery_from_publication_unensurable_error
+
+
+class TestSchematizerClient(TestConfigBase):
+
+    @pytest.yield_fixture
+    def fake_schematizer(self):
+        with FakeSchematizer() as fake_schematizer, reconfigure(
+            schematizer_host_and_port=fake_schematizer.host_and_port,
+            schematizer_client_connection_pool_size=3
+        ):
+            yield fake_schematizer
+
+    @pytest.fixture
+    def spec_path(self, tmpdir):
+        return str(tmpdir.join('swagger.json'))
+
+    def test_spec_downloaded_by_default(self, config, fake_schematizer):
+        config.schematizer_client
+        config.schematizer_client
+        assert fake_schematizer.spec_request_count == 2
+
+    def test_spec_saved_and_loaded_from_path(
+        self,
+        config,
+        fake_schematizer,
+        spec_path
+    ):
+        with reconfigure(schematizer_client_swagger_spec_path=spec_path):
+            config.schematizer_client
+            assert fake_schematizer.spec_request_count == 1
+            assert os.path.exists(spec_path)
+
+            client = config.schematizer_client
+            assert fake_schematizer.spec_request_count == 1
+            result = client.schemas.get_schema_by_id(schema_id=1).result()
+            assert result['schema_id'] == 1
+
+    def test_connections_kept_alive(self, config, fake_schematizer):
+        client = config.schematizer_client
+        for schema_id in range(5):
+            client.schemas.get_schema_by_id(schema_id=schema_id).result()
+        # The spec download and the api requests share a single connection
+        assert fake_schematizer.connection_count == 1
+
+    def test_connection_pool_size(self, config, fake_schematizer):
+        session = config.schematizer_client.swagger_spec.http_client.session
+        assert session.get_adapter('http://schematizer')._pool_maxsize == 3
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import random
+
+import mock
+import pytest
+
+from data_pipeline.async_consumer import AsyncConsumer
+from data_pipeline.expected_frequency import ExpectedFrequency
+from data_pipeline.producer import Producer
+from tests.consumer.base_consumer_test import TIMEOUT
+from tests.helpers.mock_utils import attach_spy_on_func
+
+
+@pytest.mark.usefixtures("configure_teams")
+class TestAsyncConsumer(object):
+
+    @pytest.fixture(scope="module")
+    def topic(self, registered_schema, containers):
+        topic_name = str(registered_schema.topic.name)
+        containers.create_kafka_topic(topic_name)
+        return topic_name
+
+    @pytest.yield_fixture
+    def producer(self, team_name):
+        with Producer(
+            producer_name='producer_1',
+            team_name=team_name,
+            expected_frequency_seconds=ExpectedFrequency.constantly,
+            use_work_pool=False
+        ) as producer:
+            yield producer
+
+    @pytest.fixture
+    def publish_messages(self, producer):
+        def _publish_messages(message, count):
+            for _ in range(count):
+                producer.publish(message)
+            producer.flush()
+        return _publish_messages
+
+    @pytest.yield_fixture
+    def async_consumer(self, topic, team_name):
+        async_consumer = AsyncConsumer(
+            consumer_name='test_consumer_{}'.format(random.random()),
+            team_name=team_name,
+            expected_frequency_seconds=ExpectedFrequency.constantly,
+            topic_to_consumer_topic_state_map={topic: None},
+            auto_offset_reset='largest'
+        )
+        with mock.patch.object(
+            async_consumer.consumer,
+            '_get_topics_in_region_from_topic_name',
+            side_effect=[[topic]]
+        ), async_consumer:
+            yield async_consumer
+
+    def test_get_and_commit_messages(self, async_consumer, publish_messages, message):
+        publish_messages(message, count=3)
+        messages = async_consumer.get_messages(count=3, timeout=TIMEOUT).result()
+        assert len(messages) == 3
+        assert [m.payload for m in messages] == [message.payload] * 3
+
+        with attach_spy_on_func(
+            async_consumer.consumer.kafka_client,
+            'send_offset_commit_request'
+        ) as func_spy:
+            async_consumer.commit_messages(messages).result()
+            assert func_spy.call_count == 1
+
+    def test_get_message_none(self, async_consumer):
+        assert async_consumer.get_message(timeout=0.1).result() is None
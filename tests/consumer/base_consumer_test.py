@@ -25,6 +25,7 @@ from uuid import uuid4
 import mock
 import pytest
 from kafka import create_message
+from kafka.common import UnknownTopicOrPartitionError
 from yelp_kafka.producer import YelpKafkaSimpleProducer
 
 from data_pipeline.base_consumer import BaseConsumer
@@ -47,7 +48,9 @@ from data_pipeline.message import UpdateMessage
 from data_pipeline.producer import Producer
 from data_pipeline.schematizer_clientlib.models.data_source_type_enum \
     import DataSourceTypeEnum
+from data_pipeline.schematizer_clientlib.schematizer import _Cache
 from data_pipeline.schematizer_clientlib.schematizer import get_schematizer
+from tests.helpers.config import reconfigure
 from tests.helpers.mock_utils import attach_spy_on_func
 
 
@@ -434,27 +437,94 @@ class BaseConsumerTest(object):
                 **consumer_init_kwargs
             )
 
-    @pytest.mark.parametrize("cluster_type, discovery_method", [
-        ('scribe', 'yelp_kafka.discovery.get_region_logs_stream'),
-        ('datapipe', 'yelp_kafka.discovery.search_topic')
-    ])
-    def test_no_topics_in_cluster_name(
+    def test_no_topics_in_cluster_name(self, topic, consumer_init_kwargs):
+        consumer = BaseConsumer(
+            topic_to_consumer_topic_state_map={topic: None},
+            auto_offset_reset='largest',
+            **consumer_init_kwargs
+        )
+        consumer.cluster_type = 'scribe'
+        with mock.patch(
+            'yelp_kafka.discovery.get_region_logs_stream',
+            return_value=[]
+        ):
+            with pytest.raises(TopicNotFoundInRegionError):
+                consumer._get_topics_in_region_from_topic_name(topic)
+
+    def test_topic_not_in_cluster(self, topic, consumer_init_kwargs):
+        consumer = BaseConsumer(
+            topic_to_consumer_topic_state_map={topic: None},
+            auto_offset_reset='largest',
+            **consumer_init_kwargs
+        )
+        consumer.cluster_type = 'datapipe'
+        with mock.patch.object(
+            consumer.kafka_client,
+            'load_metadata_for_topics',
+            side_effect=UnknownTopicOrPartitionError
+        ) as mock_load_metadata, mock.patch(
+            'yelp_kafka.discovery.discover_topics'
+        ) as mock_discover_topics:
+            with pytest.raises(TopicNotFoundInRegionError):
+                consumer._get_topics_in_region_from_topic_name(topic)
+        # Only the metadata of the topic is loaded
+        mock_load_metadata.assert_called_once_with(topic)
+        assert mock_discover_topics.call_count == 0
+
+    def test_region_topics_discovered_once_for_all_topics(
         self,
-        cluster_type,
-        discovery_method,
         topic,
         consumer_init_kwargs
     ):
+        other_topic = str('other_{}'.format(topic))
         consumer = BaseConsumer(
             topic_to_consumer_topic_state_map={topic: None},
             auto_offset_reset='largest',
             **consumer_init_kwargs
         )
-        consumer.cluster_type = cluster_type
-        with mock.patch(discovery_method) as mock_discovery_method:
-            mock_discovery_method.return_value = []
-            with pytest.raises(TopicNotFoundInRegionError):
-                consumer._get_topics_in_region_from_topic_name(topic)
+        with mock.patch.object(
+            consumer,
+            '_determine_cluster_type_from_topics',
+            return_value='datapipe'
+        ), mock.patch(
+            'yelp_kafka.discovery.discover_topics',
+            return_value={topic: [0], other_topic: [0]}
+        ) as mock_discover_topics, mock.patch.object(
+            consumer.kafka_client,
+            'load_metadata_for_topics'
+        ) as mock_load_metadata:
+            consumer._set_topic_to_partition_map(
+                {topic: None, other_topic: None}
+            )
+            assert mock_discover_topics.call_count == 1
+            assert mock_load_metadata.call_count == 0
+            assert consumer.topic_to_partition_map == {
+                topic: None,
+                other_topic: None
+            }
+
+            # Outside of `_set_topic_to_partition_map` only the metadata of
+            # the topic is loaded
+            assert consumer._get_topics_in_region_from_topic_name(topic) == [
+                topic
+            ]
+            assert mock_discover_topics.call_count == 1
+            mock_load_metadata.assert_called_once_with(topic)
+
+    def test_topics_looked_up_concurrently(self, topic, consumer_init_kwargs):
+        consumer = BaseConsumer(
+            topic_to_consumer_topic_state_map={topic: None},
+            auto_offset_reset='largest',
+            **consumer_init_kwargs
+        )
+        # Each thread misses the cache of the shared schematizer client
+        with reconfigure(consumer_topic_lookup_pool_size=4), mock.patch.object(
+            consumer._schematizer,
+            '_cache',
+            _Cache()
+        ):
+            topics = consumer._get_topics_by_names([topic] * 4)
+        assert [actual.name for actual in topics] == [topic] * 4
 
     def test_base_consumer_with_cluster_name(
         self,
@@ -19,6 +19,7 @@ from __future__ import unicode_literals
 import random
 import time
 
+import mock
 import pytest
 
 from data_pipeline.consumer_source import FixedSchemas
@@ -31,6 +32,7 @@ from data_pipeline.consumer_source import TopicInSource
 from data_pipeline.consumer_source import TopicsInFixedNamespaces
 from data_pipeline.schematizer_clientlib.models.data_source_type_enum \
     import DataSourceTypeEnum
+from tests.helpers.config import reconfigure
 
 
 class ConsumerSourceTestBase(object):
@@ -346,6 +348,17 @@ class TestTopicsInFixedNamespaces(DynamicTopicSrcTests, NamespaceSrcSetupMixin):
             TopicsInFixedNamespaces('')
 
 
+class TestTopicsInFixedNamespacesFromCatalogMirror(TestTopicsInFixedNamespaces):
+
+    @pytest.yield_fixture(autouse=True)
+    def catalog_mirror_config(self, tmpdir):
+        with reconfigure(
+            catalog_mirror_path=str(tmpdir.join('catalog.db')),
+            catalog_mirror_sync_interval_seconds=0
+        ):
+            yield
+
+
 class TestTopicsInSource(DynamicTopicSrcTests, SourceSrcSetupMixin):
 
     @pytest.fixture
@@ -451,6 +464,42 @@ class TestNewTopicsOnlyInFixedNamespaces(NewTopicOnlySrcTests, NamespaceSrcSetup
             NewTopicsOnlyInFixedNamespaces()
 
 
+class TestNewTopicsOnlyInFixedNamespacesFromCatalogMirror(
+    TestNewTopicsOnlyInFixedNamespaces
+):
+
+    @pytest.yield_fixture(autouse=True)
+    def catalog_mirror_config(self, tmpdir):
+        with reconfigure(
+            catalog_mirror_path=str(tmpdir.join('catalog.db')),
+            catalog_mirror_sync_interval_seconds=0
+        ):
+            yield
+
+    def test_pick_up_new_topics_created_after_last_sync(
+        self,
+        consumer_source,
+        expected_source_topics,
+        foo_namespace,
+        _register_schema,
+    ):
+        time.sleep(1)
+        assert set(consumer_source.get_topics()) == expected_source_topics
+
+        time.sleep(1)
+        new_topic = _register_schema(
+            foo_namespace,
+            self.random_name('new_src')
+        ).topic.name
+        # The topic is missing from the mirror until it's synced again
+        with mock.patch.object(consumer_source.catalog_mirror, 'sync'):
+            time.sleep(1)
+            assert consumer_source.get_topics() == []
+
+        time.sleep(1)
+        assert consumer_source.get_topics() == [new_topic]
+
+
 class TestNewTopicOnlyInSource(NewTopicOnlySrcTests, SourceSrcSetupMixin):
 
     @pytest.fixture
@@ -18,6 +18,7 @@ from __future__ import unicode_literals
 
 import errno
 import random
+import threading
 import time
 from multiprocessing import Event
 from multiprocessing import Process
@@ -28,6 +29,7 @@ import mock
 import pytest
 from kafka.common import FailedPayloadsError
 
+from data_pipeline._payload_decode_pool import PayloadDecodePool
 from data_pipeline.base_consumer import ConsumerTopicState
 from data_pipeline.consumer import Consumer
 from data_pipeline.consumer_source import FixedSchemas
@@ -303,6 +305,223 @@ class TestConsumer(BaseConsumerTest):
 
             another_consumer.get_message(blocking=True, timeout=TIMEOUT)
 
+    def test_async_commit_messages(
+        self,
+        topic,
+        publish_messages,
+        consumer_init_kwargs,
+        message
+    ):
+        consumer_init_kwargs.update(
+            async_commit=True,
+            commit_flush_interval_seconds=TIMEOUT * 10
+        )
+        consumer = Consumer(
+            topic_to_consumer_topic_state_map={topic: None},
+            auto_offset_reset='largest',
+            **consumer_init_kwargs
+        )
+        with consumer:
+            publish_messages(message, count=4)
+            messages = consumer.get_messages(
+                count=2,
+                blocking=True,
+                timeout=TIMEOUT
+            )
+            assert len(messages) == 2
+            with attach_spy_on_func(
+                consumer.kafka_client,
+                'send_offset_commit_request'
+            ) as func_spy:
+                consumer.commit_messages(messages[:1])
+                consumer.commit_messages(messages)
+                # The offsets are coalesced, and not sent with the consumer's
+                # own kafka client.
+                consumer.flush_commits()
+                assert func_spy.call_count == 0
+
+        # The committed offsets are picked up by the next consumer
+        with Consumer(
+            topic_to_consumer_topic_state_map={topic: None},
+            **consumer_init_kwargs
+        ) as consumer:
+            next_messages = consumer.get_messages(
+                count=10,
+                blocking=True,
+                timeout=TIMEOUT
+            )
+            assert len(next_messages) == 2
+            assert next_messages[0].kafka_position_info.offset == (
+                messages[-1].kafka_position_info.offset + 1
+            )
+
+    def test_stopped_when_final_commit_fails(
+        self,
+        topic,
+        publish_messages,
+        consumer_init_kwargs,
+        message
+    ):
+        consumer_init_kwargs.update(
+            async_commit=True,
+            commit_flush_interval_seconds=TIMEOUT * 10
+        )
+        consumer = Consumer(
+            topic_to_consumer_topic_state_map={topic: None},
+            auto_offset_reset='largest',
+            **consumer_init_kwargs
+        )
+        consumer.start()
+        publish_messages(message, count=1)
+        messages = consumer.get_messages(count=1, blocking=True, timeout=TIMEOUT)
+        with mock.patch.object(
+            consumer,
+            '_send_offsets',
+            side_effect=FailedPayloadsError("Network flake!")
+        ), mock.patch.object(
+            consumer.kafka_client,
+            'close',
+            wraps=consumer.kafka_client.close
+        ) as close_spy:
+            consumer.commit_messages(messages)
+            with pytest.raises(FailedPayloadsError):
+                consumer.stop()
+        assert not consumer.running
+        assert close_spy.call_count == 1
+
+    def test_get_and_commit_raw_messages(
+        self,
+        topic,
+        publish_messages,
+        consumer_init_kwargs,
+        message
+    ):
+        consumer = Consumer(
+            topic_to_consumer_topic_state_map={topic: None},
+            auto_offset_reset='largest',
+            **consumer_init_kwargs
+        )
+        with consumer:
+            publish_messages(message, count=4)
+            raw_messages = consumer.get_raw_messages(
+                count=2,
+                blocking=True,
+                timeout=TIMEOUT,
+                unpack_header=True
+            )
+            assert len(raw_messages) == 2
+            for raw_message in raw_messages:
+                assert raw_message.topic == topic
+                assert raw_message.header['schema_id'] == message.schema_id
+                assert consumer._envelope.unpack(
+                    raw_message.packed_message
+                )['uuid'] == raw_message.header['uuid']
+            consumer.commit_messages(raw_messages)
+
+        with Consumer(
+            topic_to_consumer_topic_state_map={topic: None},
+            **consumer_init_kwargs
+        ) as consumer:
+            next_messages = consumer.get_messages(
+                count=10,
+                blocking=True,
+                timeout=TIMEOUT
+            )
+            assert len(next_messages) == 2
+            assert next_messages[0].kafka_position_info.offset == (
+                raw_messages[-1].offset + 1
+            )
+
+    def test_seek_to_timestamp(
+        self,
+        topic,
+        publish_messages,
+        consumer_instance,
+        message
+    ):
+        with consumer_instance as consumer:
+            publish_messages(message, count=2)
+            messages = consumer.get_messages(
+                count=10,
+                blocking=True,
+                timeout=TIMEOUT
+            )
+            assert len(messages) == 2
+            timestamp = messages[0].timestamp
+            position_info = messages[0].kafka_position_info
+
+            with mock.patch.object(
+                consumer,
+                '_get_topics_in_region_from_topic_name',
+                side_effect=lambda topic_name: [topic_name]
+            ):
+                topic_to_consumer_topic_state_map = consumer.seek_to_timestamp(
+                    {topic: timestamp}
+                )
+
+            seeked_offset = topic_to_consumer_topic_state_map[
+                topic
+            ].partition_offset_map[position_info.partition]
+            assert seeked_offset <= position_info.offset
+
+            seeked_messages = consumer.get_messages(
+                count=position_info.offset - seeked_offset + 2,
+                blocking=True,
+                timeout=TIMEOUT
+            )
+            assert all(m.timestamp >= timestamp for m in seeked_messages)
+            assert [
+                m.kafka_position_info.offset for m in seeked_messages[-2:]
+            ] == [m.kafka_position_info.offset for m in messages]
+
+    def test_reset_topics_without_restart(
+        self,
+        topic,
+        publish_messages,
+        consumer_instance,
+        message
+    ):
+        with consumer_instance as consumer:
+            publish_messages(message, count=2)
+            messages = consumer.get_messages(
+                count=10,
+                blocking=True,
+                timeout=TIMEOUT
+            )
+            assert len(messages) == 2
+
+            consumer_group = consumer.consumer_group
+            topic_map = {topic: ConsumerTopicState(
+                partition_offset_map={
+                    messages[0].kafka_position_info.partition:
+                        messages[0].kafka_position_info.offset - 1
+                },
+                last_seen_schema_id=None
+            )}
+            with attach_spy_on_func(consumer, 'stop') as stop_spy, mock.patch.object(
+                consumer,
+                '_get_topics_in_region_from_topic_name',
+                side_effect=[[x] for x in topic_map.keys()]
+            ):
+                start_time = time.time()
+                consumer.reset_topics(topic_to_consumer_topic_state_map=topic_map)
+                elapsed_time = time.time() - start_time
+
+            # The consumer group is repartitioned rather than restarted, so
+            # the pause is bound by the partitioner cooldown.
+            assert stop_spy.call_count == 0
+            assert consumer.consumer_group is consumer_group
+            assert elapsed_time < consumer.partitioner_cooldown + TIMEOUT
+            assert consumer.topic_to_partition_map.keys() == [topic]
+
+            messages = consumer.get_messages(
+                count=10,
+                blocking=True,
+                timeout=TIMEOUT
+            )
+            assert len(messages) == 2
+            assert all(m.payload == message.payload for m in messages)
+
     def test_get_messages_retries_on_IOError_EINTR(
         self,
         consumer_instance,
@@ -328,6 +547,180 @@ class TestConsumer(BaseConsumerTest):
                 assert len(messages) == 1
                 assert mock_consumer_group_next.call_count == 2
 
+    def test_get_messages_with_decode_pool(
+        self,
+        topic,
+        pii_topic,
+        consumer_init_kwargs,
+        publish_messages,
+        message
+    ):
+        consumer_init_kwargs['decode_pool_size'] = 2
+        message_count = PayloadDecodePool.MIN_CHUNK_SIZE * 2
+        with mock.patch.object(
+            Consumer,
+            '_get_topics_in_region_from_topic_name',
+            side_effect=[[topic], [pii_topic]]
+        ), Consumer(
+            topic_to_consumer_topic_state_map={topic: None, pii_topic: None},
+            auto_offset_reset='largest',
+            **consumer_init_kwargs
+        ) as consumer:
+            publish_messages(message, count=message_count)
+            messages = []
+            while len(messages) < message_count:
+                new_messages = consumer.get_messages(
+                    count=message_count,
+                    blocking=True,
+                    timeout=TIMEOUT
+                )
+                assert new_messages
+                messages.extend(new_messages)
+
+            assert [m.payload_data for m in messages] == [
+                message.payload_data
+            ] * message_count
+            offsets = [m.kafka_position_info.offset for m in messages]
+            assert offsets == sorted(offsets)
+
+    def test_get_messages_drains_fetched_message_set(
+        self,
+        consumer_instance,
+        publish_messages,
+        message
+    ):
+        with consumer_instance as consumer:
+            publish_messages(message, count=10)
+            with attach_spy_on_func(
+                consumer.consumer_group,
+                'next'
+            ) as next_spy, attach_spy_on_func(
+                consumer.registrar,
+                'update_schema_last_used_timestamp'
+            ) as registrar_spy:
+                messages = consumer.get_messages(
+                    count=10,
+                    blocking=True,
+                    timeout=TIMEOUT
+                )
+                assert len(messages) == 10
+                assert next_spy.call_count < 10
+                assert registrar_spy.call_count == 1
+
+    def test_new_schemas_looked_up_once(
+        self,
+        consumer_instance,
+        publish_messages,
+        message
+    ):
+        with consumer_instance as consumer:
+            publish_messages(message, count=2)
+            with attach_spy_on_func(
+                consumer._schematizer,
+                'get_schemas_by_ids'
+            ) as get_schemas_spy:
+                for _ in range(2):
+                    messages = consumer.get_messages(
+                        count=1,
+                        blocking=True,
+                        timeout=TIMEOUT
+                    )
+                    assert len(messages) == 1
+                assert get_schemas_spy.call_count == 1
+
+
+class TestPrefetchingConsumer(BaseConsumerTest):
+
+    @pytest.fixture
+    def consumer_init_kwargs(self, team_name):
+        return {
+            'consumer_name': 'test_consumer_{}'.format(random.random()),
+            'team_name': team_name,
+            'expected_frequency_seconds': ExpectedFrequency.constantly,
+            'prefetch_queue_size': 2,
+            'prefetch_batch_size': 2
+        }
+
+    @pytest.yield_fixture
+    def consumer_instance(self, topic, consumer_init_kwargs):
+        consumer = Consumer(
+            topic_to_consumer_topic_state_map={topic: None},
+            auto_offset_reset='largest',  # start from the tail of the topic,
+            **consumer_init_kwargs
+        )
+        with mock.patch.object(
+            consumer,
+            '_get_topics_in_region_from_topic_name',
+            side_effect=[[topic]]
+        ):
+            yield consumer
+
+    def test_prefetched_messages_not_committed(
+        self,
+        consumer_instance,
+        consumer_init_kwargs,
+        publish_messages,
+        message,
+        topic
+    ):
+        with consumer_instance as consumer:
+            publish_messages(message, count=4)
+            messages = consumer.get_messages(
+                count=2,
+                blocking=True,
+                timeout=TIMEOUT
+            )
+            assert len(messages) == 2
+            consumer.commit_messages(messages)
+
+        with mock.patch.object(
+            Consumer,
+            '_get_topics_in_region_from_topic_name',
+            return_value=[topic]
+        ), Consumer(
+            topic_to_consumer_topic_state_map={topic: None},
+            **consumer_init_kwargs
+        ) as consumer:
+            remaining_messages = consumer.get_messages(
+                count=2,
+                blocking=True,
+                timeout=TIMEOUT
+            )
+            assert [
+                m.kafka_position_info.offset for m in remaining_messages
+            ] == [
+                m.kafka_position_info.offset + 2 for m in messages
+            ]
+
+    def test_raw_messages_require_packed_prefetched_messages(
+        self,
+        consumer_instance
+    ):
+        with pytest.raises(ValueError):
+            consumer_instance.get_raw_messages(count=1)
+
+    def test_commit_waits_for_rebalance_callback(self, consumer_instance, topic):
+        callback_started = threading.Event()
+        callback_finished = threading.Event()
+
+        def post_rebalance_callback(partitions):
+            callback_started.set()
+            time.sleep(0.1)
+            callback_finished.set()
+
+        consumer_instance.post_rebalance_callback = post_rebalance_callback
+        # The rebalance callbacks are invoked from the prefetch thread
+        rebalance_thread = threading.Thread(
+            target=consumer_instance._apply_post_rebalance_callback_to_partition,
+            args=({topic: [0]},)
+        )
+        rebalance_thread.start()
+        callback_started.wait(TIMEOUT)
+        with mock.patch.object(consumer_instance, '_send_offsets'):
+            consumer_instance.commit_offsets({topic: {0: 1}})
+            assert callback_finished.is_set()
+        rebalance_thread.join()
+
 
 class TestRefreshTopics(RefreshNewTopicsTest):
 
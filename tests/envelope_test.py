@@ -102,3 +102,15 @@ class TestEnvelope(object):
     def test_pack_unpack_ascii(self, message, envelope, expected_unpacked_message):
         unpacked = envelope.unpack(envelope.pack(message, ascii_encoded=True))
         assert unpacked == expected_unpacked_message
+
+    @pytest.mark.parametrize('ascii_encoded', [False, True])
+    def test_pack_unpack_header(self, message, envelope, ascii_encoded):
+        header = envelope.unpack_header(
+            envelope.pack(message, ascii_encoded=ascii_encoded)
+        )
+        assert header == dict(
+            message_type=message.message_type.name,
+            schema_id=message.schema_id,
+            timestamp=message.timestamp,
+            uuid=message.uuid
+        )
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import re
+import threading
+from BaseHTTPServer import BaseHTTPRequestHandler
+from BaseHTTPServer import HTTPServer
+from SocketServer import ThreadingMixIn
+
+import simplejson
+
+
+SWAGGER_SPEC = {
+    'swagger': '2.0',
+    'info': {'title': 'Fake Schematizer', 'version': '1.0.0'},
+    'basePath': '/v1',
+    'produces': ['application/json'],
+    'paths': {
+        '/schemas/{schema_id}': {
+            'get': {
+                'tags': ['schemas'],
+                'operationId': 'get_schema_by_id',
+                'parameters': [{
+                    'name': 'schema_id',
+                    'in': 'path',
+                    'type': 'integer',
+                    'required': True
+                }],
+                'responses': {
+                    '200': {
+                        'description': 'The requested schema',
+                        'schema': {'type': 'object'}
+                    }
+                }
+            }
+        }
+    }
+}
+
+
+class _FakeSchematizerServer(ThreadingMixIn, HTTPServer):
+
+    daemon_threads = True
+
+    def __init__(self, *args, **kwargs):
+        HTTPServer.__init__(self, *args, **kwargs)
+        self.lock = threading.Lock()
+        self.spec_request_count = 0
+        self.request_count = 0
+        self.connection_count = 0
+
+
+class _FakeSchematizerRequestHandler(BaseHTTPRequestHandler):
+
+    # Keeps the connections alive between requests
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        with self.server.lock:
+            self.server.connection_count += 1
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.request_count += 1
+            if self.path == '/swagger.json':
+                self.server.spec_request_count += 1
+        match = re.match(r'^/v1/schemas/(\d+)$', self.path)
+        if self.path == '/swagger.json':
+            self._send_json(200, SWAGGER_SPEC)
+        elif match:
+            self._send_json(200, {'schema_id': int(match.group(1))})
+        else:
+            self._send_json(404, {'message': 'Not found'})
+
+    def _send_json(self, status, body):
+        content = simplejson.dumps(body)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeSchematizer(object):
+    """Local stand-in of the schematizer, which serves a minimal swagger spec
+    with the `schemas.get_schema_by_id` api, and counts the requests and
+    connections it gets.  It's used to measure the overhead of the schematizer
+    client itself, without the latency of an actual schematizer.
+
+    **Example**::
+
+        with FakeSchematizer() as fake_schematizer, reconfigure(
+            schematizer_host_and_port=fake_schematizer.host_and_port
+        ):
+            client = get_config().schematizer_client
+    """
+
+    def __init__(self):
+        self._server = _FakeSchematizerServer(
+            ('127.0.0.1', 0),
+            _FakeSchematizerRequestHandler
+        )
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+
+    @property
+    def host_and_port(self):
+        return '{0}:{1}'.format(*self._server.server_address)
+
+    @property
+    def spec_request_count(self):
+        return self._server.spec_request_count
+
+    @property
+    def request_count(self):
+        return self._server.request_count
+
+    @property
+    def connection_count(self):
+        return self._server.connection_count
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        return False
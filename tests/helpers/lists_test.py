@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+from data_pipeline.helpers.lists import split_into_pool_chunks
+
+
+class TestSplitIntoPoolChunks(object):
+
+    def test_chunks_not_smaller_than_min_chunk_size(self):
+        chunks = split_into_pool_chunks(range(120), pool_size=8, min_chunk_size=50)
+        assert [len(chunk) for chunk in chunks] == [50, 50, 20]
+
+    def test_chunks_spread_over_pool(self):
+        chunks = split_into_pool_chunks(range(1000), pool_size=2, min_chunk_size=50)
+        assert [len(chunk) for chunk in chunks] == [125] * 8
+        assert [item for chunk in chunks for item in chunk] == range(1000)
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import threading
+
+import mock
+import pytest
+
+from data_pipeline.helpers.single_flight import SingleFlight
+
+
+TIMEOUT = 5
+
+
+class TestSingleFlight(object):
+
+    thread_count = 50
+
+    @pytest.fixture
+    def single_flight(self):
+        return SingleFlight()
+
+    def _run_concurrently(self, target, thread_count):
+        start = threading.Event()
+        results = []
+        errors = []
+
+        def run():
+            start.wait()
+            try:
+                results.append(target())
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run) for _ in range(thread_count)]
+        for thread in threads:
+            thread.start()
+        start.set()
+        for thread in threads:
+            thread.join(TIMEOUT)
+        return results, errors
+
+    def _get_blocking_func(self, return_value=None, side_effect=None):
+        # The first call blocks until all the threads are waiting for it
+        release = threading.Event()
+
+        def call(*args):
+            release.wait(TIMEOUT)
+            if side_effect is not None:
+                raise side_effect
+            return return_value
+
+        return mock.Mock(side_effect=call), release
+
+    def test_concurrent_calls_coalesced(self, single_flight):
+        func, release = self._get_blocking_func(return_value=42)
+        threading.Timer(0.2, release.set).start()
+        results, errors = self._run_concurrently(
+            lambda: single_flight.do('key', func, 'arg'),
+            self.thread_count
+        )
+        assert results == [42] * self.thread_count
+        assert not errors
+        func.assert_called_once_with('arg')
+
+    def test_error_shared_by_concurrent_calls(self, single_flight):
+        func, release = self._get_blocking_func(side_effect=ValueError())
+        threading.Timer(0.2, release.set).start()
+        results, errors = self._run_concurrently(
+            lambda: single_flight.do('key', func),
+            self.thread_count
+        )
+        assert not results
+        assert len(errors) == self.thread_count
+        assert all(isinstance(error, ValueError) for error in errors)
+        assert func.call_count == 1
+
+    def test_calls_of_different_keys_not_coalesced(self, single_flight):
+        func = mock.Mock(side_effect=lambda key: key)
+        assert single_flight.do('key1', func, 'key1') == 'key1'
+        assert single_flight.do('key2', func, 'key2') == 'key2'
+        assert func.call_count == 2
+
+    def test_later_calls_not_coalesced(self, single_flight):
+        func = mock.Mock(return_value=42)
+        assert single_flight.do('key', func) == 42
+        assert single_flight.do('key', func) == 42
+        assert func.call_count == 2
+        assert not single_flight._key_to_flight
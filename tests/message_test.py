@@ -16,6 +16,7 @@
 from __future__ import absolute_import
 from __future__ import unicode_literals
 
+import pickle
 import warnings
 
 import mock
@@ -26,6 +27,7 @@ from kafka.common import OffsetAndMessage
 from data_pipeline import message as dp_message
 from data_pipeline._fast_uuid import FastUUID
 from data_pipeline.envelope import Envelope
+from data_pipeline.message import _create_from_pack_state
 from data_pipeline.message import create_from_offset_and_message
 from data_pipeline.message import CreateMessage
 from data_pipeline.message import InvalidOperation
@@ -311,6 +313,21 @@ class SharedMessageTest(object):
 
         assert message1 != message2
 
+    def test_pack_state_round_trip(self, valid_message_data):
+        message_data = self._make_message_data(
+            valid_message_data,
+            upstream_position_info={'offset': 10}
+        )
+        message = self.message_class(**message_data)
+        pack_state = pickle.loads(pickle.dumps(message._get_pack_state()))
+
+        restored_message = _create_from_pack_state(pack_state)
+
+        assert restored_message.upstream_position_info is None
+        message.upstream_position_info = None
+        assert restored_message == message
+        assert restored_message.avro_repr == message.avro_repr
+
     def test_message_str(self, message):
         actual = str(message)
         expected = {
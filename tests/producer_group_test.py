@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import multiprocessing
+import random
+import time
+from Queue import Queue
+
+import mock
+import pytest
+
+from data_pipeline.expected_frequency import ExpectedFrequency
+from data_pipeline.message import CreateMessage
+from data_pipeline.position_data import PositionData
+from data_pipeline.producer_group import _GroupPositionTracker
+from data_pipeline.producer_group import _PublishBatch
+from data_pipeline.producer_group import _WorkerError
+from data_pipeline.producer_group import ProducerGroup
+from data_pipeline.producer_group import ProducerGroupWorkerError
+from data_pipeline.testing_helpers.kafka_docker import capture_new_messages
+
+
+class TestGroupPositionTracker(object):
+
+    @pytest.fixture
+    def tracker(self):
+        return _GroupPositionTracker(worker_count=2)
+
+    def _create_message(self, topic, index):
+        return mock.Mock(topic=topic, upstream_position_info={'index': index})
+
+    def _position_data(self, topic_to_kafka_offset_map):
+        return PositionData(
+            last_published_message_position_info=None,
+            topic_to_last_position_info_map={},
+            topic_to_kafka_offset_map=topic_to_kafka_offset_map,
+            merged_upstream_position_info_map={}
+        )
+
+    def _dispatch(self, tracker, topic, index, worker_index):
+        message = self._create_message(topic, index)
+        return tracker.record_message_dispatched(message, worker_index)
+
+    def test_checkpoint_waits_for_slower_worker(self, tracker):
+        self._dispatch(tracker, str('topic_a'), 0, worker_index=0)
+        self._dispatch(tracker, str('topic_b'), 1, worker_index=1)
+        seq = self._dispatch(tracker, str('topic_a'), 2, worker_index=0)
+
+        advanced = tracker.record_worker_position(
+            0, seq, self._position_data({str('topic_a'): 2})
+        )
+
+        position_data = tracker.get_position_data()
+        assert advanced
+        assert position_data.last_published_message_position_info == {'index': 0}
+        # The second message of topic_a is published, but it isn't covered by
+        # the checkpoint until topic_b catches up.
+        assert position_data.topic_to_kafka_offset_map == {str('topic_a'): 1}
+
+    def test_checkpoint_catches_up(self, tracker):
+        self._dispatch(tracker, str('topic_a'), 0, worker_index=0)
+        b_seq = self._dispatch(tracker, str('topic_b'), 1, worker_index=1)
+        a_seq = self._dispatch(tracker, str('topic_a'), 2, worker_index=0)
+        tracker.record_worker_position(
+            0, a_seq, self._position_data({str('topic_a'): 2})
+        )
+
+        advanced = tracker.record_worker_position(
+            1, b_seq, self._position_data({str('topic_b'): 1})
+        )
+
+        position_data = tracker.get_position_data()
+        assert advanced
+        assert position_data.last_published_message_position_info == {'index': 2}
+        assert position_data.topic_to_kafka_offset_map == {
+            str('topic_a'): 2,
+            str('topic_b'): 1
+        }
+        assert position_data.topic_to_last_position_info_map == {
+            str('topic_a'): {'index': 2},
+            str('topic_b'): {'index': 1}
+        }
+
+    def test_no_advance_when_blocked(self, tracker):
+        self._dispatch(tracker, str('topic_b'), 0, worker_index=1)
+        seq = self._dispatch(tracker, str('topic_a'), 1, worker_index=0)
+
+        advanced = tracker.record_worker_position(
+            0, seq, self._position_data({str('topic_a'): 1})
+        )
+
+        position_data = tracker.get_position_data()
+        assert not advanced
+        assert position_data.last_published_message_position_info is None
+        assert position_data.topic_to_kafka_offset_map == {str('topic_a'): 0}
+
+
+class TestProducerGroupWithExitedWorker(object):
+
+    @pytest.fixture
+    def producer_group(self):
+        # The worker exited, leaving its command queue full.
+        producer_group = ProducerGroup(
+            producer_name='producer_group_1',
+            team_name='bam',
+            expected_frequency_seconds=ExpectedFrequency.constantly,
+            worker_count=1
+        )
+        producer_group._result_queue = Queue()
+        command_queue = Queue(maxsize=1)
+        command_queue.put(_PublishBatch([]))
+        producer_group._command_queues = [command_queue]
+        producer_group._workers = [
+            mock.Mock(is_alive=mock.Mock(return_value=False), exitcode=1)
+        ]
+        producer_group.running = True
+        return producer_group
+
+    def test_worker_error_raised_by_flush(self, producer_group):
+        producer_group._result_queue.put(_WorkerError(
+            worker_index=0,
+            formatted_traceback='Traceback: worker failed'
+        ))
+        with pytest.raises(ProducerGroupWorkerError) as e:
+            producer_group.flush()
+        assert 'Traceback: worker failed' in str(e.value)
+
+    def test_worker_exit_raised_by_publish(self, producer_group):
+        message = mock.Mock(topic=str('topic_a'))
+        with pytest.raises(ProducerGroupWorkerError) as e:
+            for _ in range(ProducerGroup.DISPATCH_BATCH_SIZE):
+                producer_group.publish(message)
+        assert 'exited with code 1' in str(e.value)
+
+
+@pytest.mark.usefixtures("configure_teams")
+class TestProducerGroup(object):
+
+    @pytest.yield_fixture(autouse=True)
+    def patch_monitor_init_start_time_to_now(self):
+        with mock.patch(
+            'data_pipeline.client._Monitor.get_monitor_window_start_timestamp',
+            return_value=int(time.time())
+        ) as patched_start_time:
+            yield patched_start_time
+
+    @pytest.fixture(scope='module')
+    def create_topic(self, schematizer_client, example_schema, containers):
+        def _create_topic():
+            schema = schematizer_client.register_schema(
+                namespace='test_namespace',
+                source='producer_group_source_{}'.format(random.random()),
+                schema_str=example_schema,
+                source_owner_email='test@yelp.com',
+                contains_pii=False
+            )
+            containers.create_kafka_topic(str(schema.topic.name))
+            return schema
+        return _create_topic
+
+    @pytest.fixture(scope='module')
+    def schemas(self, create_topic):
+        return [create_topic() for _ in range(3)]
+
+    @pytest.fixture
+    def callback(self):
+        return mock.Mock()
+
+    @pytest.yield_fixture
+    def producer_group(self, containers, team_name, callback):
+        with ProducerGroup(
+            producer_name='producer_group_1',
+            team_name=team_name,
+            expected_frequency_seconds=ExpectedFrequency.constantly,
+            worker_count=2,
+            position_data_callback=callback
+        ) as producer_group:
+            yield producer_group
+        assert len(multiprocessing.active_children()) == 0
+
+    def test_publish_across_topics(self, producer_group, schemas, payload, callback):
+        messages = [
+            CreateMessage(
+                schema_id=schemas[i % len(schemas)].schema_id,
+                payload=payload,
+                upstream_position_info={'index': i}
+            )
+            for i in range(30)
+        ]
+        topic_a, topic_b, topic_c = [str(schema.topic.name) for schema in schemas]
+        with capture_new_messages(
+            topic_a
+        ) as get_messages_a, capture_new_messages(
+            topic_b
+        ) as get_messages_b, capture_new_messages(
+            topic_c
+        ) as get_messages_c:
+            for message in messages:
+                producer_group.publish(message)
+            producer_group.flush()
+
+            assert len(get_messages_a()) == 10
+            assert len(get_messages_b()) == 10
+            assert len(get_messages_c()) == 10
+
+        position_data = producer_group.get_checkpoint_position_data()
+        assert position_data.last_published_message_position_info == {'index': 29}
+        assert position_data.topic_to_last_position_info_map == {
+            topic_a: {'index': 27},
+            topic_b: {'index': 28},
+            topic_c: {'index': 29}
+        }
+        assert callback.call_args[0][0] == position_data
+
+    def test_topic_is_owned_by_one_worker(self, producer_group):
+        assert producer_group._get_worker_index(str('a')) == 0
+        assert producer_group._get_worker_index(str('b')) == 1
+        assert producer_group._get_worker_index(str('c')) == 0
+        assert producer_group._get_worker_index(str('a')) == 0
@@ -18,6 +18,7 @@ from __future__ import unicode_literals
 
 import multiprocessing
 import random
+import threading
 import time
 
 import clog
@@ -37,6 +38,7 @@ from data_pipeline._clog_writer import ClogWriter
 from data_pipeline._encryption_helper import EncryptionHelper
 from data_pipeline._kafka_producer import _EnvelopeAndMessage
 from data_pipeline._kafka_producer import _prepare
+from data_pipeline._pooled_kafka_producer import PooledKafkaProducer
 from data_pipeline._retry_util import ExpBackoffPolicy
 from data_pipeline._retry_util import MaxRetryError
 from data_pipeline._retry_util import RetryPolicy
@@ -44,6 +46,7 @@ from data_pipeline.config import get_config
 from data_pipeline.envelope import Envelope
 from data_pipeline.environment_configs import IS_OPEN_SOURCE_MODE
 from data_pipeline.expected_frequency import ExpectedFrequency
+from data_pipeline.flush_policy import FlushPolicy
 from data_pipeline.message import create_from_offset_and_message
 from data_pipeline.message import CreateMessage
 from data_pipeline.message import Message
@@ -244,6 +247,24 @@ class TestProducer(TestProducerBase):
     def test_publish_payload_data_message(self, payload_data_message, producer):
         self._publish_and_assert_message(payload_data_message, producer)
 
+    def test_publish_more_than_a_chunk(self, create_message, producer):
+        # Large enough to be shipped to the work pool in multiple chunks
+        message_count = PooledKafkaProducer.MIN_CHUNK_SIZE * 3
+        messages = [
+            create_message(upstream_position_info={'index': i})
+            for i in range(message_count)
+        ]
+        with capture_new_data_pipeline_messages(messages[0].topic) as get_messages:
+            for message in messages:
+                producer.publish(message)
+            producer.flush()
+            published_messages = get_messages(count=message_count)
+
+        assert [m.uuid for m in published_messages] == [m.uuid for m in messages]
+        assert producer.get_checkpoint_position_data().last_published_message_position_info == {
+            'index': message_count - 1
+        }
+
     def _publish_and_assert_message(self, message, producer):
         messages = self._publish_message(message, producer)
 
@@ -500,6 +521,252 @@ class TestProducer(TestProducerBase):
         assert decoded_keys == expected_keys
 
 
+class TestProducerAutoFlush(TestProducerBase):
+
+    @property
+    def flush_time_limit(self):
+        return 0.2
+
+    @pytest.yield_fixture(autouse=True)
+    def setup_flush_time_limit(self):
+        with reconfigure(
+            kafka_producer_flush_time_limit_seconds=self.flush_time_limit
+        ):
+            yield
+
+    @pytest.fixture
+    def producer_instance(self, containers, producer_name, use_work_pool, team_name):
+        return Producer(
+            producer_name=producer_name,
+            team_name=team_name,
+            expected_frequency_seconds=ExpectedFrequency.constantly,
+            use_work_pool=use_work_pool,
+            auto_flush=True
+        )
+
+    def test_publish_without_wake(self, message, producer):
+        with capture_new_messages(message.topic) as get_messages:
+            producer.publish(message)
+            assert len(get_messages()) == 0
+
+            time.sleep(self.flush_time_limit * 5)
+            assert len(get_messages()) == 1
+
+    def test_position_data_callback_from_auto_flush_thread(
+        self,
+        create_message,
+        producer_name,
+        team_name
+    ):
+        callback_threads = []
+
+        def callback(position_data):
+            callback_threads.append(threading.current_thread().name)
+
+        upstream_info = {'offset': 'fake'}
+        with Producer(
+            producer_name=producer_name,
+            team_name=team_name,
+            expected_frequency_seconds=ExpectedFrequency.constantly,
+            position_data_callback=callback,
+            auto_flush=True
+        ) as producer:
+            producer.publish(create_message(upstream_position_info=upstream_info))
+            time.sleep(self.flush_time_limit * 5)
+            position_data = producer.get_checkpoint_position_data()
+
+        assert position_data.last_published_message_position_info == upstream_info
+        assert 'data_pipeline_producer_auto_flush' in callback_threads
+
+    def test_auto_flush_error_raised_on_next_call(self, message, producer):
+        with mock.patch.object(
+            producer._kafka_producer,
+            '_publish_produce_requests',
+            side_effect=RandomException()
+        ):
+            producer.publish(message)
+            time.sleep(self.flush_time_limit * 5)
+            with pytest.raises(RandomException):
+                producer.publish(message)
+
+    def test_auto_flush_resumed_after_error_raised(self, message, producer):
+        with capture_new_messages(message.topic) as get_messages:
+            with mock.patch.object(
+                producer._kafka_producer,
+                '_publish_produce_requests',
+                side_effect=RandomException()
+            ):
+                producer.publish(message)
+                time.sleep(self.flush_time_limit * 5)
+                with pytest.raises(RandomException):
+                    producer.wake()
+
+            producer.publish(message)
+            time.sleep(self.flush_time_limit * 5)
+            assert len(get_messages()) == 2
+
+    def test_message_buffered_when_auto_flush_error_raised(
+        self,
+        message,
+        producer
+    ):
+        with capture_new_messages(message.topic) as get_messages:
+            with mock.patch.object(
+                producer._kafka_producer,
+                '_publish_produce_requests',
+                side_effect=RandomException()
+            ):
+                producer.publish(message)
+                time.sleep(self.flush_time_limit * 5)
+                with pytest.raises(RandomException):
+                    producer.publish(message)
+
+            producer.flush()
+            assert len(get_messages()) == 2
+
+    def test_connections_closed_when_auto_flush_error_raised_on_close(
+        self,
+        message,
+        producer_instance
+    ):
+        kafka_producer = producer_instance._kafka_producer
+        with mock.patch.object(
+            kafka_producer,
+            '_publish_produce_requests',
+            side_effect=RandomException()
+        ):
+            producer_instance.publish(message)
+            time.sleep(self.flush_time_limit * 5)
+            with attach_spy_on_func(
+                kafka_producer._dispatcher,
+                'close'
+            ) as dispatcher_close_spy, attach_spy_on_func(
+                kafka_producer.kafka_client,
+                'close'
+            ) as kafka_client_close_spy:
+                with pytest.raises(RandomException):
+                    producer_instance.close()
+                assert dispatcher_close_spy.call_count == 1
+                assert kafka_client_close_spy.call_count == 1
+
+    def test_auto_flush_thread_stops_on_close(self, producer_instance):
+        with producer_instance as producer:
+            flush_thread = producer._kafka_producer._auto_flush_thread
+            assert flush_thread.is_alive()
+        assert not flush_thread.is_alive()
+
+
+class TestProducerFlushPolicies(TestProducerBase):
+
+    @pytest.yield_fixture(autouse=True)
+    def setup_default_lane(self):
+        with reconfigure(
+            kafka_producer_flush_time_limit_seconds=10,
+            kafka_producer_buffer_size=3
+        ):
+            yield
+
+    @pytest.fixture
+    def callback(self):
+        return mock.Mock()
+
+    @pytest.fixture
+    def producer_instance(
+        self,
+        containers,
+        producer_name,
+        use_work_pool,
+        team_name,
+        another_topic,
+        callback
+    ):
+        return Producer(
+            producer_name=producer_name,
+            team_name=team_name,
+            expected_frequency_seconds=ExpectedFrequency.constantly,
+            use_work_pool=use_work_pool,
+            position_data_callback=callback,
+            flush_policies=[FlushPolicy(
+                topics=[another_topic],
+                buffer_size=2,
+                time_limit_seconds=10,
+                priority=1
+            )]
+        )
+
+    @pytest.fixture
+    def another_message(self, another_schema, payload):
+        return CreateMessage(another_schema.schema_id, payload=payload)
+
+    def test_lane_flushed_independently(
+        self,
+        message,
+        another_message,
+        producer,
+        callback
+    ):
+        callback.reset_mock()
+        with capture_new_messages(
+            message.topic
+        ) as get_messages, capture_new_messages(
+            another_message.topic
+        ) as get_another_messages:
+            producer.publish(message)
+            producer.publish(another_message)
+            producer.publish(another_message)
+
+            assert len(get_another_messages()) == 2
+            assert len(get_messages()) == 0
+            # The position data can't be checkpointed while a lane holds
+            # messages
+            assert callback.call_count == 0
+
+            producer.flush()
+            assert len(get_messages()) == 1
+            assert callback.call_count == 1
+
+    def test_flush_includes_higher_priority_lanes(
+        self,
+        message,
+        another_message,
+        producer,
+        callback
+    ):
+        callback.reset_mock()
+        with capture_new_messages(
+            message.topic
+        ) as get_messages, capture_new_messages(
+            another_message.topic
+        ) as get_another_messages:
+            producer.publish(another_message)
+            for _ in range(3):
+                producer.publish(message)
+
+            assert len(get_messages()) == 3
+            assert len(get_another_messages()) == 1
+            assert callback.call_count == 1
+
+    def test_all_lanes_flushed_when_position_callback_overdue(
+        self,
+        message,
+        another_message,
+        producer,
+        callback
+    ):
+        callback.reset_mock()
+        with capture_new_messages(
+            message.topic
+        ) as get_messages, reconfigure(
+            kafka_producer_position_callback_max_delay_seconds=0
+        ):
+            producer.publish(message)
+            producer.publish(another_message)
+            producer.publish(another_message)
+
+            assert len(get_messages()) == 1
+            assert callback.call_count == 1
+
+
 class TestPublishMonitorMessage(TestProducerBase):
 
     @property
@@ -1084,6 +1351,12 @@ class TestPublishMessagesWithRetry(TestProducerBase):
     def patch_retry_policy(self, producer):
         producer._kafka_producer._publish_retry_policy = self.retry_policy
 
+    @pytest.fixture(autouse=True)
+    def send_through_kafka_client(self, producer):
+        # The tests mock the responses of the kafka client, so the requests
+        # shouldn't be dispatched to the brokers directly.
+        producer._kafka_producer._dispatcher.thread_count = 1
+
     @pytest.fixture(autouse=True)
     def set_topic_offsets_to_latest(self, producer, message, another_message):
         producer.publish(message)
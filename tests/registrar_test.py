@@ -18,6 +18,7 @@ from __future__ import unicode_literals
 
 import time
 
+import mock
 import pytest
 
 from data_pipeline.registrar import Registrar
@@ -58,6 +59,17 @@ class TestRegistration(object):
         expected = {1: None, 4: None, 11: None}
         assert schema_map == expected
 
+    def test_register_tracked_schema_ids_without_blocking(self, registrar):
+        with mock.patch.object(
+            registrar,
+            'publish_registration_messages'
+        ) as mock_publish:
+            registrar.register_tracked_schema_ids([1, 4], blocking=False)
+            registrar.stop()
+        assert registrar.schema_to_last_seen_time_map == {1: None, 4: None}
+        # Once in the background when registering, and once when stopping
+        assert mock_publish.call_count == 2
+
     def test_update_first_time_used_timestamp(self, schema_last_used_timestamp, registrar):
         """
         Test that updating a schema ID in Client that has not been used before
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import mock
+import pytest
+from bravado import exception as http_exc
+
+from data_pipeline.schematizer_clientlib.async_schematizer import AsyncSchematizerClient
+from data_pipeline.schematizer_clientlib.async_schematizer import get_async_schematizer
+from data_pipeline.schematizer_clientlib.schematizer import _Cache
+from tests.schematizer_clientlib.schematizer_test import SchematizerClientTestBase
+
+
+TIMEOUT = 10
+
+
+class TestAsyncSchematizerClient(SchematizerClientTestBase):
+
+    @pytest.fixture
+    def async_schematizer(self, containers):
+        return AsyncSchematizerClient()
+
+    @pytest.fixture(autouse=True, scope='class')
+    def biz_schema(self, yelp_namespace_name, biz_src_name):
+        return self._register_avro_schema(yelp_namespace_name, biz_src_name)
+
+    @pytest.yield_fixture
+    def empty_cache(self, schematizer):
+        with mock.patch.object(schematizer, '_cache', _Cache()):
+            yield
+
+    def test_get_async_schematizer(self, async_schematizer):
+        assert get_async_schematizer() is async_schematizer
+
+    def test_get_non_cached_schema_by_id(
+        self,
+        schematizer,
+        async_schematizer,
+        biz_schema,
+        empty_cache
+    ):
+        future = async_schematizer.get_schema_by_id(biz_schema.schema_id)
+        actual = future.result(timeout=TIMEOUT)
+        self._assert_schema_values(actual, biz_schema)
+
+    def test_get_cached_schema_by_id(
+        self,
+        schematizer,
+        async_schematizer,
+        biz_schema
+    ):
+        schematizer.get_schema_by_id(biz_schema.schema_id)
+        with self.attach_spy_on_api(
+            schematizer._client,
+            'schemas',
+            'get_schema_by_id'
+        ) as schema_api_spy:
+            future = async_schematizer.get_schema_by_id(biz_schema.schema_id)
+            assert future.done()
+            self._assert_schema_values(future.result(), biz_schema)
+            assert schema_api_spy.call_count == 0
+
+    def test_concurrent_misses(
+        self,
+        schematizer,
+        async_schematizer,
+        biz_schema,
+        empty_cache
+    ):
+        futures = [
+            async_schematizer.get_schema_by_id(biz_schema.schema_id)
+            for _ in range(5)
+        ]
+        for future in futures:
+            self._assert_schema_values(future.result(timeout=TIMEOUT), biz_schema)
+        assert schematizer._is_schema_cached(biz_schema.schema_id)
+
+    def test_get_topic_by_name(self, async_schematizer, biz_schema, empty_cache):
+        future = async_schematizer.get_topic_by_name(biz_schema.topic.name)
+        self._assert_topic_values(future.result(timeout=TIMEOUT), biz_schema.topic)
+
+    def test_get_missing_topic(self, async_schematizer):
+        future = async_schematizer.get_topic_by_name(self.get_new_name('missing_topic'))
+        with pytest.raises(http_exc.HTTPNotFound):
+            future.result(timeout=TIMEOUT)
+
+    def test_get_latest_schema_by_topic_name(
+        self,
+        schematizer,
+        async_schematizer,
+        biz_schema
+    ):
+        future = async_schematizer.get_latest_schema_by_topic_name(
+            biz_schema.topic.name
+        )
+        actual = future.result(timeout=TIMEOUT)
+        self._assert_schema_values(actual, biz_schema)
+        assert schematizer._is_schema_cached(biz_schema.schema_id)
+
+    def test_get_topics_by_criteria(
+        self,
+        schematizer,
+        async_schematizer,
+        yelp_namespace_name,
+        biz_schema,
+        empty_cache
+    ):
+        future = async_schematizer.get_topics_by_criteria(
+            namespace_name=yelp_namespace_name
+        )
+        actual = future.result(timeout=TIMEOUT)
+        assert [topic.name for topic in actual] == [biz_schema.topic.name]
+        assert schematizer._is_topic_cached(biz_schema.topic.name)
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import sqlite3
+import time
+
+import mock
+import pytest
+
+from data_pipeline.schematizer_clientlib.catalog_mirror import CatalogMirror
+from data_pipeline.schematizer_clientlib.catalog_mirror import get_catalog_mirror
+from tests.helpers.config import reconfigure
+
+
+@pytest.mark.usefixtures('containers')
+class TestCatalogMirror(object):
+
+    @pytest.fixture
+    def path(self, tmpdir):
+        return str(tmpdir.join('catalog.db'))
+
+    @pytest.yield_fixture
+    def mirror(self, path):
+        with CatalogMirror(path, sync_interval_seconds=60) as mirror:
+            yield mirror
+
+    @pytest.yield_fixture
+    def topics_spy(self, schematizer_client):
+        with mock.patch.object(
+            schematizer_client,
+            'iter_topics_by_criteria',
+            wraps=schematizer_client.iter_topics_by_criteria
+        ) as topics_spy:
+            yield topics_spy
+
+    def _register_schema(self, schematizer_client, namespace, source):
+        return schematizer_client.register_schema_from_schema_json(
+            namespace=namespace,
+            source=source,
+            schema_json={
+                'type': 'record',
+                'name': source,
+                'namespace': namespace,
+                'doc': 'test',
+                'fields': [{'type': 'int', 'doc': 'test', 'name': 'id'}]
+            },
+            source_owner_email='bam+test@yelp.com',
+            contains_pii=False
+        )
+
+    def test_sync(self, mirror, schematizer_client, registered_schema):
+        assert mirror.sync()
+        topic = schematizer_client.get_topic_by_name(
+            registered_schema.topic.name
+        )
+        assert mirror.get_topics_by_names([topic.name, 'bad_topic']) == {
+            topic.name: topic
+        }
+        assert mirror.get_topic_names_by_schema_ids(
+            [registered_schema.schema_id, 0]
+        ) == {registered_schema.schema_id: topic.name}
+
+    def test_get_topics(self, mirror, schematizer_client, namespace, source):
+        schema = self._register_schema(schematizer_client, namespace, source)
+        mirror.sync()
+        topics = mirror.get_topics(namespace_name=namespace, source_name=source)
+        assert schema.topic.name in [topic.name for topic in topics]
+        assert mirror.get_topics(namespace_name='bad_namespace') == []
+
+    def test_sync_shared_by_mirrors_of_same_path(
+        self,
+        mirror,
+        path,
+        registered_schema,
+        topics_spy
+    ):
+        assert mirror.sync()
+        with CatalogMirror(path, sync_interval_seconds=60) as other_mirror:
+            assert not other_mirror.sync()
+            assert registered_schema.topic.name in other_mirror.get_topics_by_names(
+                [registered_schema.topic.name]
+            )
+        assert topics_spy.call_count == 1
+
+    def test_sync_picks_up_new_topics(
+        self,
+        mirror,
+        schematizer_client,
+        namespace,
+        topics_spy
+    ):
+        mirror.sync()
+        schema = self._register_schema(
+            schematizer_client,
+            namespace,
+            'new_source'
+        )
+        assert mirror.get_topics_by_names([schema.topic.name]) == {}
+
+        assert mirror.sync(force=True)
+        assert schema.topic.name in mirror.get_topics_by_names(
+            [schema.topic.name]
+        )
+        # Only the topics created since the first sync are requested again
+        assert topics_spy.call_args[1]['created_after'] is not None
+
+    def test_database_not_locked_while_downloading(
+        self,
+        mirror,
+        path,
+        schematizer_client
+    ):
+        def iter_topics_by_criteria(**kwargs):
+            # Another process shares the mirror meanwhile
+            connection = sqlite3.connect(path, timeout=0, isolation_level=None)
+            connection.execute('BEGIN IMMEDIATE')
+            connection.execute('ROLLBACK')
+            connection.close()
+            return iter([])
+
+        with mock.patch.object(
+            schematizer_client,
+            'iter_topics_by_criteria',
+            side_effect=iter_topics_by_criteria
+        ):
+            assert mirror.sync()
+
+    def test_sync_skipped_if_synced_meanwhile(
+        self,
+        mirror,
+        path,
+        schematizer_client
+    ):
+        iter_topics_by_criteria = schematizer_client.iter_topics_by_criteria
+
+        def sync_other_mirror(**kwargs):
+            with CatalogMirror(path, sync_interval_seconds=60) as other_mirror:
+                with mock.patch.object(
+                    schematizer_client,
+                    'iter_topics_by_criteria',
+                    iter_topics_by_criteria
+                ):
+                    assert other_mirror.sync()
+            return iter([])
+
+        with mock.patch.object(
+            schematizer_client,
+            'iter_topics_by_criteria',
+            side_effect=sync_other_mirror
+        ):
+            assert not mirror.sync()
+
+    def test_mirror_usable_after_fork(self, mirror, registered_schema):
+        mirror.sync()
+        connection = mirror._connection
+        mirror._reset_after_fork()
+        assert mirror._connection is not connection
+        assert registered_schema.topic.name in mirror.get_topics_by_names(
+            [registered_schema.topic.name]
+        )
+
+    def test_get_sync_watermark(self, mirror):
+        assert mirror.get_sync_watermark() is None
+        synced_at = time.time()
+        mirror.sync()
+        watermark = mirror.get_sync_watermark()
+        assert watermark <= synced_at - CatalogMirror.SYNC_OVERLAP_SECONDS + 1
+        assert watermark >= long(synced_at) - CatalogMirror.SYNC_OVERLAP_SECONDS
+
+    def test_get_catalog_mirror(self, path):
+        assert get_catalog_mirror() is None
+        with reconfigure(catalog_mirror_path=path):
+            mirror = get_catalog_mirror()
+            assert mirror.path == path
+            assert get_catalog_mirror() is mirror
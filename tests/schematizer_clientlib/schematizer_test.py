@@ -17,6 +17,7 @@ from __future__ import absolute_import
 from __future__ import unicode_literals
 
 import random
+import threading
 import time
 from datetime import datetime
 
@@ -39,7 +40,10 @@ from data_pipeline.schematizer_clientlib.models.namespace import Namespace
 from data_pipeline.schematizer_clientlib.models.source import Source
 from data_pipeline.schematizer_clientlib.models.target_schema_type_enum import \
     TargetSchemaTypeEnum
+from data_pipeline.schematizer_clientlib.schematizer import _Cache
+from data_pipeline.schematizer_clientlib.schematizer import _NotFoundCache
 from data_pipeline.schematizer_clientlib.schematizer import SchematizerClient
+from tests.helpers.config import reconfigure
 
 
 class SchematizerClientTestBase(object):
@@ -297,6 +301,156 @@ class TestGetSchemaById(SchematizerClientTestBase):
             assert topic_api_spy.call_count == 0
             assert source_api_spy.call_count == 0
 
+    def test_concurrent_misses_share_one_request(self, schematizer, biz_schema):
+        thread_count = 20
+        start = threading.Event()
+        actual_schemas = []
+
+        def get_schema():
+            start.wait()
+            actual_schemas.append(
+                schematizer.get_schema_by_id(biz_schema.schema_id)
+            )
+
+        with mock.patch.object(
+            schematizer,
+            '_cache',
+            _Cache()
+        ), self.attach_spy_on_api(
+            schematizer._client,
+            'schemas',
+            'get_schema_by_id'
+        ) as api_spy:
+            get_schema_by_id = api_spy.side_effect
+
+            def slow_get_schema_by_id(*args, **kwargs):
+                # Gives all the threads the time to miss the cache
+                time.sleep(0.2)
+                return get_schema_by_id(*args, **kwargs)
+
+            api_spy.side_effect = slow_get_schema_by_id
+            threads = [
+                threading.Thread(target=get_schema) for _ in range(thread_count)
+            ]
+            for thread in threads:
+                thread.start()
+            start.set()
+            for thread in threads:
+                thread.join()
+            assert api_spy.call_count == 1
+
+        assert len(actual_schemas) == thread_count
+        for actual in actual_schemas:
+            self._assert_schema_values(actual, biz_schema)
+
+
+class TestGetSchemasByIds(SchematizerClientTestBase):
+
+    @pytest.fixture(autouse=True, scope='class')
+    def schemas(self, yelp_namespace_name, containers):
+        # The schemas are registered one after another, so their ids follow
+        # each other.
+        return [
+            self._register_avro_schema(
+                yelp_namespace_name,
+                self.get_new_name('source')
+            ) for _ in range(6)
+        ]
+
+    @pytest.yield_fixture
+    def schematizer(self, containers):
+        schematizer = SchematizerClient()
+        with mock.patch.object(schematizer, '_cache', _Cache()):
+            yield schematizer
+
+    @pytest.yield_fixture
+    def schema_api_spy(self, schematizer):
+        with self.attach_spy_on_api(
+            schematizer._client,
+            'schemas',
+            'get_schema_by_id'
+        ) as schema_api_spy:
+            yield schema_api_spy
+
+    @pytest.yield_fixture
+    def schemas_range_api_spy(self, schematizer):
+        with self.attach_spy_on_api(
+            schematizer._client,
+            'schemas',
+            'get_schemas_created_after'
+        ) as schemas_range_api_spy:
+            yield schemas_range_api_spy
+
+    def _assert_schemas(self, actual, expected_schemas):
+        assert set(actual) == {schema.schema_id for schema in expected_schemas}
+        for schema in expected_schemas:
+            self._assert_schema_values(actual[schema.schema_id], schema)
+
+    def test_close_ids_looked_up_in_one_request(
+        self,
+        schematizer,
+        schemas,
+        schema_api_spy,
+        schemas_range_api_spy
+    ):
+        actual = schematizer.get_schemas_by_ids(
+            [schema.schema_id for schema in schemas[1:4]]
+        )
+        self._assert_schemas(actual, schemas[1:4])
+        assert schemas_range_api_spy.call_count == 1
+        assert schema_api_spy.call_count == 0
+
+    def test_distant_ids_looked_up_concurrently(
+        self,
+        schematizer,
+        schemas,
+        schema_api_spy,
+        schemas_range_api_spy
+    ):
+        expected_schemas = [schemas[0], schemas[-1]]
+        actual = schematizer.get_schemas_by_ids(
+            [schema.schema_id for schema in expected_schemas]
+        )
+        self._assert_schemas(actual, expected_schemas)
+        assert schemas_range_api_spy.call_count == 0
+        assert schema_api_spy.call_count == 2
+
+    def test_ids_looked_up_by_topic(
+        self,
+        schematizer,
+        schemas,
+        schema_api_spy
+    ):
+        expected_schemas = [schemas[0], schemas[-1]]
+        with self.attach_spy_on_api(
+            schematizer._client,
+            'topics',
+            'list_schemas_by_topic_name'
+        ) as topic_api_spy:
+            actual = schematizer.get_schemas_by_ids(
+                [schema.schema_id for schema in expected_schemas],
+                topic_names=[
+                    schema.topic.name for schema in expected_schemas
+                ] + ['unknown_topic']
+            )
+            assert topic_api_spy.call_count == 3
+        self._assert_schemas(actual, expected_schemas)
+        assert schema_api_spy.call_count == 0
+
+    def test_cached_ids_not_looked_up(
+        self,
+        schematizer,
+        schemas,
+        schema_api_spy,
+        schemas_range_api_spy
+    ):
+        schematizer.get_schema_by_id(schemas[0].schema_id)
+        schema_api_spy.reset_mock()
+        actual = schematizer.get_schemas_by_ids([schemas[0].schema_id])
+        self._assert_schemas(actual, schemas[:1])
+        assert schemas_range_api_spy.call_count == 0
+        assert schema_api_spy.call_count == 0
+
 
 class TestGetSchemaElementsBySchemaId(SchematizerClientTestBase):
 
@@ -375,7 +529,9 @@ class TestGetSchemasCreatedAfterDate(SchematizerClientTestBase):
             schematizer._client,
             'schemas',
             'get_schemas_created_after'
-        ) as schemas_api_spy:
+        ) as schemas_api_spy, reconfigure(
+            schematizer_client_max_concurrent_requests=1
+        ):
             schemas = schematizer.get_schemas_created_after_date(
                 created_after=creation_timestamp,
                 min_id=min_id
@@ -397,7 +553,9 @@ class TestGetSchemasCreatedAfterDate(SchematizerClientTestBase):
             schematizer._client,
             'schemas',
             'get_schemas_created_after'
-        ) as schemas_api_spy:
+        ) as schemas_api_spy, reconfigure(
+            schematizer_client_max_concurrent_requests=1
+        ):
             schemas = schematizer.get_schemas_created_after_date(
                 created_after=creation_timestamp,
                 min_id=1,
@@ -415,7 +573,9 @@ class TestGetSchemasCreatedAfterDate(SchematizerClientTestBase):
             schematizer._client,
             'schemas',
             'get_schemas_created_after'
-        ) as api_spy:
+        ) as api_spy, reconfigure(
+            schematizer_client_max_concurrent_requests=1
+        ):
             schemas = schematizer.get_schemas_created_after_date(
                 creation_timestamp
             )
@@ -444,6 +604,43 @@ class TestGetSchemasCreatedAfterDate(SchematizerClientTestBase):
         )
         assert len(schemas) >= len(schemas_later)
 
+    def test_get_schemas_created_after_date_with_prefetched_pages(
+        self,
+        sorted_schemas,
+        schematizer
+    ):
+        creation_timestamp = self._get_creation_timestamp(
+            sorted_schemas[0].created_at
+        )
+        with reconfigure(schematizer_client_max_concurrent_requests=1):
+            expected = schematizer.get_schemas_created_after_date(
+                creation_timestamp,
+                page_size=1
+            )
+        with reconfigure(schematizer_client_max_concurrent_requests=4):
+            actual = schematizer.get_schemas_created_after_date(
+                creation_timestamp,
+                page_size=1
+            )
+        assert [schema.schema_id for schema in actual] == [
+            schema.schema_id for schema in expected
+        ]
+        assert set(schema.schema_id for schema in sorted_schemas).issubset(
+            schema.schema_id for schema in actual
+        )
+
+    def test_iter_schemas_created_after_date(self, sorted_schemas, schematizer):
+        creation_timestamp = self._get_creation_timestamp(
+            sorted_schemas[0].created_at
+        )
+        schemas = schematizer.iter_schemas_created_after_date(
+            creation_timestamp,
+            min_id=sorted_schemas[0].schema_id,
+            page_size=1
+        )
+        assert next(schemas).schema_id == sorted_schemas[0].schema_id
+        schemas.close()
+
     def test_get_schemas_created_after_date_cached(self, schematizer):
         created_after = self._get_created_after()
         creation_timestamp = self._get_creation_timestamp(created_after)
@@ -560,6 +757,28 @@ class TestGetSchemasByTopic(SchematizerClientTestBase):
             assert found_schema
             assert api_spy.call_count == 1
 
+    def test_get_schemas_by_topics(self, schematizer, biz_schema):
+        topic_name = biz_schema.topic.name
+        with reconfigure(schematizer_client_max_concurrent_requests=4):
+            actual = schematizer.get_schemas_by_topics([topic_name])
+        assert actual.keys() == [topic_name]
+        assert biz_schema.schema_id in [
+            schema.schema_id for schema in actual[topic_name]
+        ]
+
+    def test_get_schemas_by_topics_skips_failed_topics(
+        self,
+        schematizer,
+        biz_schema
+    ):
+        topic_name = biz_schema.topic.name
+        with reconfigure(schematizer_client_max_concurrent_requests=4):
+            actual = schematizer.get_schemas_by_topics(
+                [topic_name, 'bad_topic'],
+                skip_failed_topics=True
+            )
+        assert actual.keys() == [topic_name]
+
 
 class TestGetNamespaces(SchematizerClientTestBase):
 
@@ -623,6 +842,175 @@ class TestGetTopicByName(SchematizerClientTestBase):
             assert source_api_spy.call_count == 0
 
 
+class TestNotFoundCache(SchematizerClientTestBase):
+
+    @pytest.yield_fixture
+    def not_found_cache(self, schematizer):
+        not_found_cache = _NotFoundCache()
+        with mock.patch.object(
+            schematizer,
+            '_not_found_cache',
+            not_found_cache
+        ):
+            yield not_found_cache
+
+    @pytest.yield_fixture
+    def topic_api_spy(self, schematizer):
+        with self.attach_spy_on_api(
+            schematizer._client,
+            'topics',
+            'get_topic_by_topic_name'
+        ) as topic_api_spy:
+            yield topic_api_spy
+
+    def _get_missing_topic(self, schematizer, topic_name):
+        with pytest.raises(http_exc.HTTPNotFound):
+            schematizer.get_topic_by_name(topic_name)
+
+    def test_missing_topic_requested_once(
+        self,
+        schematizer,
+        not_found_cache,
+        topic_api_spy
+    ):
+        topic_name = self.get_new_name('missing_topic')
+        for _ in range(3):
+            self._get_missing_topic(schematizer, topic_name)
+        assert topic_api_spy.call_count == 1
+        assert not_found_cache.miss_count == 1
+        assert not_found_cache.hit_count == 2
+
+    def test_missing_topic_requested_again_when_expired(
+        self,
+        schematizer,
+        not_found_cache,
+        topic_api_spy
+    ):
+        topic_name = self.get_new_name('missing_topic')
+        with reconfigure(schematizer_client_not_found_cache_ttl_seconds=0):
+            self._get_missing_topic(schematizer, topic_name)
+            self._get_missing_topic(schematizer, topic_name)
+        assert topic_api_spy.call_count == 2
+
+    def test_least_recently_missing_topics_evicted(
+        self,
+        schematizer,
+        not_found_cache,
+        topic_api_spy
+    ):
+        topic_names = [self.get_new_name('missing_topic') for _ in range(3)]
+        with reconfigure(schematizer_client_not_found_cache_max_size=2):
+            for topic_name in topic_names:
+                self._get_missing_topic(schematizer, topic_name)
+            assert len(not_found_cache) == 2
+
+            self._get_missing_topic(schematizer, topic_names[-1])
+            assert topic_api_spy.call_count == 3
+            self._get_missing_topic(schematizer, topic_names[0])
+            assert topic_api_spy.call_count == 4
+
+    def test_filter_topics_by_pkeys_skips_missing_topics(
+        self,
+        schematizer,
+        not_found_cache
+    ):
+        topic_names = [self.get_new_name('missing_topic') for _ in range(3)]
+        with self.attach_spy_on_api(
+            schematizer._client,
+            'topics',
+            'get_latest_schema_by_topic_name'
+        ) as latest_schema_api_spy:
+            assert schematizer.filter_topics_by_pkeys(topic_names) == []
+            assert schematizer.filter_topics_by_pkeys(topic_names) == []
+            assert latest_schema_api_spy.call_count == 3
+
+
+class TestCacheSnapshot(SchematizerClientTestBase):
+
+    @pytest.fixture(autouse=True, scope='class')
+    def biz_schema(self, yelp_namespace_name, biz_src_name):
+        return self._register_avro_schema(yelp_namespace_name, biz_src_name)
+
+    @pytest.fixture
+    def snapshot_path(self, tmpdir):
+        return str(tmpdir.join('schematizer_cache'))
+
+    def test_schema_loaded_from_snapshot(
+        self,
+        schematizer,
+        biz_schema,
+        snapshot_path
+    ):
+        schematizer.get_schema_by_id(biz_schema.schema_id)
+        schematizer.save_cache_snapshot(snapshot_path)
+
+        with mock.patch.object(
+            schematizer,
+            '_cache',
+            _Cache()
+        ), self.attach_spy_on_api(
+            schematizer._client,
+            'schemas',
+            'get_schema_by_id'
+        ) as schema_api_spy, self.attach_spy_on_api(
+            schematizer._client,
+            'topics',
+            'get_topic_by_topic_name'
+        ) as topic_api_spy:
+            schematizer._load_cache_snapshot(snapshot_path)
+            actual = schematizer.get_schema_by_id(biz_schema.schema_id)
+            self._assert_schema_values(actual, biz_schema)
+            assert schema_api_spy.call_count == 0
+            assert topic_api_spy.call_count == 0
+
+    def test_snapshot_merged_with_existing_one(
+        self,
+        schematizer,
+        biz_schema,
+        snapshot_path
+    ):
+        schematizer.get_schema_by_id(biz_schema.schema_id)
+        schematizer.save_cache_snapshot(snapshot_path)
+        # Another process caching none of the schemas saves its own cache
+        with mock.patch.object(schematizer, '_cache', _Cache()):
+            schematizer.save_cache_snapshot(snapshot_path)
+
+        with mock.patch.object(
+            schematizer,
+            '_cache',
+            _Cache()
+        ), self.attach_spy_on_api(
+            schematizer._client,
+            'schemas',
+            'get_schema_by_id'
+        ) as schema_api_spy:
+            schematizer._load_cache_snapshot(snapshot_path)
+            actual = schematizer.get_schema_by_id(biz_schema.schema_id)
+            self._assert_schema_values(actual, biz_schema)
+            assert schema_api_spy.call_count == 0
+
+    def test_invalid_snapshot_ignored(
+        self,
+        schematizer,
+        biz_schema,
+        snapshot_path
+    ):
+        with open(snapshot_path, 'w') as snapshot_file:
+            snapshot_file.write('not a snapshot')
+
+        with mock.patch.object(schematizer, '_cache', _Cache()):
+            schematizer._load_cache_snapshot(snapshot_path)
+            actual = schematizer.get_schema_by_id(biz_schema.schema_id)
+            self._assert_schema_values(actual, biz_schema)
+
+    def test_client_usable_after_fork(self, schematizer, biz_schema):
+        schematizer.get_schema_by_id(biz_schema.schema_id)
+        with mock.patch.object(schematizer, '_cache', _Cache()):
+            schematizer._reset_after_fork()
+            actual = schematizer.get_schema_by_id(biz_schema.schema_id)
+            self._assert_schema_values(actual, biz_schema)
+
+
 class GetSourcesTestBase(SchematizerClientTestBase):
 
     @pytest.fixture(scope='class')
@@ -697,7 +1085,9 @@ class TestGetSources(GetSourcesTestBase):
             schematizer._client,
             'sources',
             'list_sources'
-        ) as sources_api_spy:
+        ) as sources_api_spy, reconfigure(
+            schematizer_client_max_concurrent_requests=1
+        ):
             actual_sources = schematizer.get_sources(
                 min_id=1,
                 page_size=1
@@ -801,6 +1191,21 @@ class TestGetSourcesByNamespace(GetSourcesTestBase):
         for actual_src, expected_resp in zip(actual, expected):
             self._assert_source_values(actual_src, expected_resp)
 
+    def test_iter_sources_by_namespace(
+        self,
+        schematizer,
+        yelp_namespace_name,
+        biz_src,
+        usr_src
+    ):
+        actual = list(schematizer.iter_sources_by_namespace(
+            yelp_namespace_name,
+            page_size=1
+        ))
+        assert actual == schematizer.get_sources_by_namespace(
+            yelp_namespace_name
+        )
+
     def test_get_sources_by_namespace_filter_by_page_size_and_min_id(
         self,
         schematizer,
@@ -1713,7 +2118,9 @@ class TestGetTopicsByCriteria(SchematizerClientTestBase):
             schematizer._client,
             'topics',
             'get_topics_by_criteria'
-        ) as topic_api_spy:
+        ) as topic_api_spy, reconfigure(
+            schematizer_client_max_concurrent_requests=1
+        ):
             actual = schematizer.get_topics_by_criteria(
                 namespace_name=namespace_name,
                 source_name=source_name
@@ -1723,6 +2130,73 @@ class TestGetTopicsByCriteria(SchematizerClientTestBase):
             # 2 api calls to the service.
             assert topic_api_spy.call_count == 2
 
+    def test_get_topics_with_prefetched_pages(self, schematizer):
+        namespace_name = self.get_new_name('dummy_namespace')
+        source_name = self.get_new_name('dummy_source')
+        expected_topics = []
+        for i in range(7):
+            schema_json = {
+                'type': 'enum',
+                'name': 'dummy_enum_{}'.format(i),
+                'symbols': ['a'],
+                'doc': 'dummy schema'
+            }
+            expected_topics.append(self._register_avro_schema(
+                namespace=namespace_name,
+                source=source_name,
+                schema_json=schema_json
+            ).topic)
+
+        with reconfigure(schematizer_client_max_concurrent_requests=4):
+            actual = schematizer.get_topics_by_criteria(
+                namespace_name=namespace_name,
+                source_name=source_name,
+                page_size=2
+            )
+            self._assert_topics_values(actual, expected_topics=expected_topics)
+
+            actual = schematizer.get_topics_by_criteria(
+                namespace_name=namespace_name,
+                source_name=source_name,
+                max_count=3,
+                page_size=2
+            )
+            self._assert_topics_values(
+                actual,
+                expected_topics=expected_topics[:3]
+            )
+
+    def test_get_topics_prefetches_no_pages_for_single_page(self, schematizer):
+        namespace_name = self.get_new_name('dummy_namespace')
+        source_name = self.get_new_name('dummy_source')
+        expected_topics = []
+        for i in range(3):
+            schema_json = {
+                'type': 'enum',
+                'name': 'dummy_enum_{}'.format(i),
+                'symbols': ['a'],
+                'doc': 'dummy schema'
+            }
+            expected_topics.append(self._register_avro_schema(
+                namespace=namespace_name,
+                source=source_name,
+                schema_json=schema_json
+            ).topic)
+
+        with self.attach_spy_on_api(
+            schematizer._client,
+            'topics',
+            'get_topics_by_criteria'
+        ) as topic_api_spy, reconfigure(
+            schematizer_client_max_concurrent_requests=8
+        ):
+            actual = schematizer.get_topics_by_criteria(
+                namespace_name=namespace_name,
+                source_name=source_name
+            )
+            self._assert_topics_values(actual, expected_topics=expected_topics)
+            assert topic_api_spy.call_count == 1
+
     def test_get_topics_with_id_greater_than_min_id(
         self,
         schematizer,
@@ -1848,6 +2322,42 @@ class TestFilterTopicsByPkeys(SchematizerClientTestBase):
         ]
         assert schematizer.filter_topics_by_pkeys(topics) == [pk_topic_resp.name]
 
+    def test_filter_topics_by_pkeys_keeps_order(
+        self,
+        schematizer,
+        biz_topic_resp,
+        pk_topic_resp
+    ):
+        topics = [
+            pk_topic_resp.name,
+            biz_topic_resp.name,
+            pk_topic_resp.name
+        ]
+        assert schematizer.filter_topics_by_pkeys(topics) == [
+            pk_topic_resp.name,
+            pk_topic_resp.name
+        ]
+
+    def test_filter_cached_topics_by_pkeys(
+        self,
+        schematizer,
+        biz_topic_resp,
+        pk_topic_resp
+    ):
+        schematizer.get_topic_by_name(biz_topic_resp.name)
+        schematizer.get_topic_by_name(pk_topic_resp.name)
+        topics = [
+            biz_topic_resp.name,
+            pk_topic_resp.name
+        ]
+        with self.attach_spy_on_api(
+            schematizer._client,
+            'topics',
+            'get_latest_schema_by_topic_name'
+        ) as latest_schema_api_spy:
+            assert schematizer.filter_topics_by_pkeys(topics) == [pk_topic_resp.name]
+            assert latest_schema_api_spy.call_count == 0
+
 
 class RegistrationTestBase(SchematizerClientTestBase):
 
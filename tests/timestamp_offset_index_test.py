@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import pytest
+
+from data_pipeline.timestamp_offset_index import TimestampOffsetIndex
+from data_pipeline.timestamp_offset_index import TimestampOffsetPoint
+
+
+class TestTimestampOffsetIndex(object):
+
+    @pytest.fixture
+    def index_path(self, tmpdir):
+        return str(tmpdir.join('timestamp_offset_index.db'))
+
+    @pytest.yield_fixture
+    def index(self, index_path):
+        with TimestampOffsetIndex(index_path) as index:
+            index.add_points([
+                TimestampOffsetPoint('topic1', 0, timestamp=100, offset=10),
+                TimestampOffsetPoint('topic1', 0, timestamp=200, offset=20),
+                TimestampOffsetPoint('topic1', 0, timestamp=300, offset=30),
+                TimestampOffsetPoint('topic1', 1, timestamp=150, offset=5),
+            ])
+            yield index
+
+    @pytest.mark.parametrize('timestamp, expected', [
+        (50, (None, 10)),
+        (100, (None, 10)),
+        (150, (11, 20)),
+        (200, (11, 20)),
+        (250, (21, 30)),
+        (350, (31, None)),
+    ])
+    def test_get_offset_range(self, index, timestamp, expected):
+        assert index.get_offset_range('topic1', 0, timestamp) == expected
+
+    def test_get_offset_range_of_unknown_partition(self, index):
+        assert index.get_offset_range('topic1', 2, 150) == (None, None)
+        assert index.get_offset_range('topic2', 0, 150) == (None, None)
+
+    def test_remove_points_before(self, index):
+        index.remove_points_before(200)
+        assert index.get_offset_range('topic1', 0, 150) == (None, 20)
+        assert index.get_offset_range('topic1', 1, 150) == (None, None)
+
+    def test_index_shared_through_file(self, index, index_path):
+        with TimestampOffsetIndex(index_path) as other_index:
+            assert other_index.get_offset_range('topic1', 0, 150) == (11, 20)
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import time
+
+import mock
+import pytest
+
+import data_pipeline
+from data_pipeline.timestamp_offset_index import TimestampOffsetIndex
+from data_pipeline.tools.timestamp_offset_indexer import TimestampOffsetIndexer
+
+
+class TestTimestampOffsetIndexer(object):
+
+    @pytest.fixture
+    def index_path(self, tmpdir):
+        return str(tmpdir.join('timestamp_offset_index.db'))
+
+    @pytest.fixture
+    def indexer(self, index_path):
+        indexer = TimestampOffsetIndexer()
+        with mock.patch.object(
+            data_pipeline.tools.timestamp_offset_indexer,
+            'load_default_config'
+        ), mock.patch.object(
+            data_pipeline.tools.timestamp_offset_indexer,
+            'KafkaClient'
+        ):
+            indexer.process_commandline_options([
+                '--topic', 'topic1',
+                '--index-path', index_path,
+                '--retention-seconds', '3600',
+            ])
+            indexer._call_configure_functions()
+        return indexer
+
+    def test_sample(self, indexer, index_path):
+        now = int(time.time())
+        with mock.patch.object(
+            data_pipeline.tools.timestamp_offset_indexer,
+            'get_last_message_timestamps',
+            return_value={'topic1': {0: (10, now), 1: (20, now - 10)}}
+        ) as mock_get_last_message_timestamps, TimestampOffsetIndex(
+            index_path
+        ) as index:
+            index.add_points([('topic1', 0, now - 7200, 1)])
+            indexer.sample(index)
+
+            assert mock_get_last_message_timestamps.call_args[0][1] == ['topic1']
+            assert index.get_offset_range('topic1', 0, now) == (None, 10)
+            assert index.get_offset_range('topic1', 1, now) == (21, None)
+            # Samples older than the retention are removed
+            assert index.get_offset_range('topic1', 0, now - 3600) == (None, 10)
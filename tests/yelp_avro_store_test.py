@@ -17,13 +17,17 @@ from __future__ import absolute_import
 from __future__ import unicode_literals
 
 import json
+import os
 
 import pytest
 from frozendict import frozendict
 
 from data_pipeline.config import get_config
 from data_pipeline.helpers.frozendict_json_encoder import FrozenDictEncoder
+from data_pipeline.helpers.yelp_avro_store import _AvroStringCache
 from data_pipeline.helpers.yelp_avro_store import _AvroStringStore
+from data_pipeline.helpers.yelp_avro_store import preload_schemas
+from tests.helpers.config import reconfigure
 
 
 class TestAvroStringStore(object):
@@ -123,3 +127,82 @@ class TestAvroStringStore(object):
         store = _AvroStringStore()
         store.get_reader(schema_id, schema_id, schema_types, schema_types)
         assert (schema_id, schema_id) in store._reader_cache
+
+    def test_preload_with_schemas(self, schema_types):
+        store = _AvroStringStore()
+        store.get_writer(6, schema_types)
+        store.get_reader(6, 6, schema_types, schema_types)
+        store.preload(schema_ids=[6], reader_and_writer_schema_ids=[(6, 6)])
+        assert 6 in store._writer_cache
+        assert (6, 6) in store._reader_cache
+
+    def test_readers_evicted(self, schema_types):
+        store = _AvroStringStore()
+        with reconfigure(avro_string_store_cache_max_size=2):
+            # Negative ids, to not collide with the ids of registered schemas
+            for schema_id in range(-15, -10):
+                store.get_reader(schema_id, schema_id, schema_types, schema_types)
+            assert len(store._reader_cache) == 2
+            assert (-11, -11) in store._reader_cache
+
+
+class TestAvroStringCache(object):
+
+    @pytest.yield_fixture(autouse=True)
+    def max_size(self):
+        with reconfigure(avro_string_store_cache_max_size=3):
+            yield 3
+
+    @pytest.fixture
+    def cache(self):
+        cache = _AvroStringCache()
+        for key in ('a', 'b', 'c'):
+            cache.set(key, key.upper())
+        return cache
+
+    def test_least_recently_used_evicted(self, cache):
+        assert cache.get('a') == 'A'
+        cache.set('d', 'D')
+        assert 'b' not in cache
+        assert all(key in cache for key in ('a', 'c', 'd'))
+        assert cache.eviction_count == 1
+
+    def test_unused_evicted_in_order(self, cache):
+        cache.set('d', 'D')
+        cache.set('e', 'E')
+        assert 'a' not in cache
+        assert 'b' not in cache
+        assert len(cache) == 3
+        assert cache.eviction_count == 2
+
+    def test_counts(self, cache):
+        cache.get('a')
+        cache.get('a')
+        cache.get('missing')
+        assert cache.hit_count == 2
+        assert cache.miss_count == 1
+        assert cache.eviction_count == 0
+
+
+@pytest.mark.usefixtures("containers")
+class TestPreloadSchemas(object):
+
+    def test_preload_schemas(self, registered_schema, tmpdir):
+        schema_id = registered_schema.schema_id
+        snapshot_path = str(tmpdir.join('schematizer_cache'))
+        with reconfigure(schematizer_client_cache_snapshot_path=snapshot_path):
+            preload_schemas([schema_id], [(schema_id, schema_id)])
+        store = _AvroStringStore()
+        assert schema_id in store._writer_cache
+        assert (schema_id, schema_id) in store._reader_cache
+        assert os.path.exists(snapshot_path)
+
+    def test_preload_missing_schemas(self):
+        missing_schema_id = 0
+        preload_schemas(
+            [missing_schema_id],
+            [(missing_schema_id, missing_schema_id)]
+        )
+        store = _AvroStringStore()
+        assert missing_schema_id not in store._writer_cache
+        assert (missing_schema_id, missing_schema_id) not in store._reader_cache